@@ -0,0 +1,145 @@
+# local cold / warm start benchmark for the handlers, no AWS account needed
+# every "container" is a fresh python process: it loads the handler file (import = Lambda's INIT
+# phase), then invokes it a number of times (the first one is the cold start), and the json log
+# lines from lambda_runtime.instrument are collected from its output.
+# the ssm handler talks to a tiny local stand-in for SSM's GetParametersByPath (AWS_ENDPOINT_URL), so
+# nothing is patched inside the handler process and it imports exactly what it would in Lambda.
+#
+#   python local_harness.py                      both handlers, 5 containers x 20 invocations
+#   python local_harness.py --importtime         + the slowest imports of a cold start (-X importtime)
+#
+# pipenv install boto3
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+CODE = os.path.dirname(HERE)
+HANDLERS = {
+    'ssm': os.path.join(CODE, 'ssm', 'handler.py'),
+    'api-gateway': os.path.join(CODE, 'api-gateway', 'lambda-code.py'),
+}
+
+CHILD = r'''
+import importlib.util, sys, uuid
+path, invocations = sys.argv[1], int(sys.argv[2])
+
+class Context:
+    function_name = "local"
+    memory_limit_in_mb = 128
+    def __init__(self):
+        self.aws_request_id = str(uuid.uuid4())
+
+spec = importlib.util.spec_from_file_location("handler", path)
+module = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(module)
+for _ in range(invocations):
+    module.lambda_handler({}, Context())
+'''
+
+
+def start_ssm(params):
+    # answers the json protocol call boto3 makes for get_parameters_by_path (one page, no paging)
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            request = json.loads(self.rfile.read(int(self.headers['Content-Length'])) or b'{}')
+            path = request.get('Path', '/')
+            found = [{'Name': name, 'Type': type_, 'Value': value, 'Version': 1}
+                     for name, (value, type_) in params.items() if name.startswith(path)]
+            body = json.dumps({'Parameters': found}).encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/x-amz-json-1.1')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f'http://127.0.0.1:{server.server_address[1]}'
+
+
+def run_container(handler_path, invocations, env, importtime=False):
+    # returns the invocation log records (+ the -X importtime lines when asked)
+    cmd = [sys.executable] + (['-X', 'importtime'] if importtime else []) + ['-c', CHILD, handler_path, str(invocations)]
+    env = dict(os.environ, **env)
+    env['PYTHONPATH'] = os.pathsep.join([os.path.join(HERE, 'python'), os.path.dirname(handler_path)])
+    proc = subprocess.run(cmd, env=env, capture_output=True, text=True, check=True)
+    records = []
+    for line in proc.stdout.splitlines():
+        if line.startswith('{') and '"type": "invocation"' in line:
+            records.append(json.loads(line))
+    return records, proc.stderr if importtime else None
+
+
+def slowest_imports(importtime_output, top=10):
+    # lines look like: "import time:   self [us] | cumulative | imported package"
+    rows = []
+    for line in importtime_output.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        _, cumulative_us, name = line[len('import time:'):].split('|')
+        if not name[1:].startswith(' '):  # only top level imports, nested ones are indented
+            rows.append((int(cumulative_us), name.strip()))
+    return sorted(rows, reverse=True)[:top]
+
+
+def _p(values, q):
+    values = sorted(values)
+    return values[min(int(q * len(values)), len(values) - 1)] if values else float('nan')
+
+
+def benchmark_cold_start(name, containers=5, invocations=20, env=None, importtime=False):
+    cold, warm = [], []
+    for i in range(containers):
+        records, imports = run_container(HANDLERS[name], invocations, env or {}, importtime and i == 0)
+        cold.append(records[0])
+        warm.extend(records[1:])
+        if imports:
+            print(f"  slowest imports of the {name} cold start (cumulative ms):")
+            for us, module in slowest_imports(imports):
+                print(f"    {us / 1000:8.1f}  {module}")
+
+    print(f"{name}: {containers} containers x {invocations} invocations")
+    print(f"  init (import of the handler)  p50 {_p([r['init_ms'] for r in cold], 0.5):8.2f} ms")
+    steps = {}
+    for r in cold:
+        for step, ms in {**r.get('init_steps', {}), **r.get('lazy_init', {})}.items():
+            steps.setdefault(step, []).append(ms)
+    for step, values in steps.items():
+        print(f"    {step:26}  p50 {statistics.median(values):8.2f} ms")
+    print(f"  cold invocation handler       p50 {_p([r['handler_ms'] for r in cold], 0.5):8.2f} ms")
+    print(f"  warm invocation handler       p50 {_p([r['handler_ms'] for r in warm], 0.5):8.2f} ms"
+          f"  p99 {_p([r['handler_ms'] for r in warm], 0.99):8.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--containers', type=int, default=5)
+    parser.add_argument('--invocations', type=int, default=20)
+    parser.add_argument('--importtime', action='store_true')
+    args = parser.parse_args()
+
+    benchmark_cold_start('api-gateway', args.containers, args.invocations, importtime=args.importtime)
+    server, endpoint = start_ssm({
+        '/my-app/dev/db-url': ('dev.db.example.com', 'String'),
+        '/my-app/dev/db-password': ('secret', 'SecureString'),
+    })
+    try:
+        env = {'DEV_OR_PROD': 'dev', 'AWS_ENDPOINT_URL': endpoint, 'AWS_ACCESS_KEY_ID': 'local',
+               'AWS_SECRET_ACCESS_KEY': 'local', 'AWS_DEFAULT_REGION': 'eu-west-3'}
+        benchmark_cold_start('ssm', args.containers, args.invocations, env, importtime=args.importtime)
+    finally:
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,236 @@
+# batch mode for SQS / Kinesis triggered handlers: write the code for one record, get a handler
+# for a whole batch that processes the records concurrently and reports partial failures
+#
+#   from lambda_batch import batch_handler, record_data
+#
+#   @instrument
+#   @batch_handler(max_workers=8)
+#   def lambda_handler(record, context):          # or async def, run on one event loop
+#       order = json.loads(record_data(record))
+#       ...                                         # raise to mark this record as failed
+#
+# the handler returns {"batchItemFailures": [{"itemIdentifier": ...}]}, enable
+# ReportBatchItemFailures on the event source mapping so Lambda only retries those (messageId for
+# SQS, the sequence number for Kinesis / DynamoDB streams). without it a single failure retries the
+# whole batch.
+#
+# ordering is kept where the source guarantees it: records of the same SQS FIFO message group /
+# Kinesis partition key run one after the other (different groups run concurrently), and once one
+# fails the rest of its group is not started and reported as failed too. Kinesis retries from the
+# lowest failed sequence number, so for it only the first failure of the batch is reported.
+# when the invocation is close to its timeout (context.get_remaining_time_in_millis() below
+# stop_before_ms) no new record is started, the remaining ones are reported as failed.
+
+import asyncio
+import base64
+import functools
+import inspect
+from concurrent.futures import ThreadPoolExecutor
+
+_pools = {}  # max_workers -> executor, kept for warm invocations
+
+
+def _pool(max_workers):
+    if max_workers not in _pools:
+        _pools[max_workers] = ThreadPoolExecutor(max_workers, thread_name_prefix='batch')
+    return _pools[max_workers]
+
+
+def event_source(record):
+    return record.get('eventSource') or record.get('EventSource') or ''
+
+
+def item_identifier(record):
+    source = event_source(record)
+    if source == 'aws:kinesis':
+        return record['kinesis']['sequenceNumber']
+    if source == 'aws:dynamodb':
+        return record['dynamodb']['SequenceNumber']
+    return record['messageId']  # aws:sqs
+
+
+def record_data(record):
+    # the payload as str: SQS body, base64 decoded Kinesis data
+    if event_source(record) == 'aws:kinesis':
+        return base64.b64decode(record['kinesis']['data']).decode()
+    return record['body']
+
+
+def _ordering_key(record):
+    # records with the same key must be processed in order, None = no ordering
+    source = event_source(record)
+    if source == 'aws:kinesis':
+        return record['kinesis'].get('partitionKey')
+    if source == 'aws:dynamodb':
+        return repr(sorted((record['dynamodb'].get('Keys') or {}).items()))
+    return (record.get('attributes') or {}).get('MessageGroupId')
+
+
+def _groups(records):
+    # list of lists of indexes, each list processed sequentially
+    groups, keyed = [], {}
+    for i, record in enumerate(records):
+        key = _ordering_key(record)
+        if key is None:
+            groups.append([i])
+        elif key in keyed:
+            keyed[key].append(i)
+        else:
+            keyed[key] = [i]
+            groups.append(keyed[key])
+    return groups
+
+
+def _time_left(context, stop_before_ms):
+    remaining = getattr(context, 'get_remaining_time_in_millis', None)
+    return remaining is None or stop_before_ms is None or remaining() > stop_before_ms
+
+
+def _run_threads(process, records, context, max_workers, stop_before_ms, errors):
+    def run_group(indexes):
+        for n, i in enumerate(indexes):
+            if not _time_left(context, stop_before_ms):
+                errors.update({j: TimeoutError('not started, invocation close to its timeout') for j in indexes[n:]})
+                return
+            try:
+                process(records[i], context)
+            except Exception as exc:
+                errors[i] = exc
+                errors.update({j: RuntimeError(f'skipped, record {i} of its group failed') for j in indexes[n + 1:]})
+                return
+
+    groups = _groups(records)
+    if max_workers <= 1 or len(groups) == 1:
+        for indexes in groups:
+            run_group(indexes)
+    else:
+        list(_pool(max_workers).map(run_group, groups))
+
+
+async def _run_async(process, records, context, max_workers, stop_before_ms, errors):
+    limit = asyncio.Semaphore(max_workers)
+
+    async def run_group(indexes):
+        for n, i in enumerate(indexes):
+            async with limit:
+                if not _time_left(context, stop_before_ms):
+                    errors.update({j: TimeoutError('not started, invocation close to its timeout') for j in indexes[n:]})
+                    return
+                try:
+                    await process(records[i], context)
+                except Exception as exc:
+                    errors[i] = exc
+                    errors.update({j: RuntimeError(f'skipped, record {i} of its group failed') for j in indexes[n + 1:]})
+                    return
+
+    await asyncio.gather(*(run_group(indexes) for indexes in _groups(records)))
+
+
+def process_batch(process, event, context=None, max_workers=8, stop_before_ms=2000, on_error=None):
+    # returns the partial batch response, process(record, context) is called once per record
+    records = event.get('Records') or []
+    errors = {}
+    if inspect.iscoroutinefunction(process):
+        asyncio.run(_run_async(process, records, context, max_workers, stop_before_ms, errors))
+    else:
+        _run_threads(process, records, context, max_workers, stop_before_ms, errors)
+
+    failed = sorted(errors)
+    if on_error is not None:
+        for i in failed:
+            on_error(records[i], errors[i])
+    if failed and event_source(records[failed[0]]) in ('aws:kinesis', 'aws:dynamodb'):
+        failed = failed[:1]  # the stream is retried from the lowest failed sequence number
+    return {'batchItemFailures': [{'itemIdentifier': item_identifier(records[i])} for i in failed]}
+
+
+def _log_error(record, exc):
+    print(f"record {item_identifier(record)} failed: {exc!r}")
+
+
+def batch_handler(process=None, *, max_workers=8, stop_before_ms=2000, on_error=_log_error):
+    # decorator, @batch_handler or @batch_handler(max_workers=...)
+    # max_workers: threads (or concurrent coroutines), size it to what the downstream can take
+    def decorate(process):
+        @functools.wraps(process)
+        def lambda_handler(event, context):
+            return process_batch(process, event, context, max_workers, stop_before_ms, on_error)
+        lambda_handler.process_record = process
+        return lambda_handler
+
+    return decorate(process) if process is not None else decorate
+
+
+####### synthetic events (tests / local runs) #######
+
+def sqs_event(bodies, group_ids=None):
+    group_ids = group_ids or [None] * len(bodies)
+    records = []
+    for i, (body, group) in enumerate(zip(bodies, group_ids)):
+        attributes = {'ApproximateReceiveCount': '1'}
+        if group is not None:
+            attributes['MessageGroupId'] = group
+        records.append({'messageId': f'msg-{i}', 'receiptHandle': f'handle-{i}', 'body': body,
+                        'attributes': attributes, 'eventSource': 'aws:sqs',
+                        'eventSourceARN': 'arn:aws:sqs:eu-west-3:123456789012:my-queue'})
+    return {'Records': records}
+
+
+def kinesis_event(payloads, partition_keys=None):
+    partition_keys = partition_keys or ['key'] * len(payloads)
+    records = []
+    for i, (payload, key) in enumerate(zip(payloads, partition_keys)):
+        sequence_number = str(49590338271490256608559692538361571095921575989136588898 + i)
+        records.append({'kinesis': {'partitionKey': key, 'sequenceNumber': sequence_number,
+                                    'data': base64.b64encode(payload.encode()).decode()},
+                        'eventSource': 'aws:kinesis', 'eventID': f'shardId-000000000000:{i}',
+                        'eventSourceARN': 'arn:aws:kinesis:eu-west-3:123456789012:stream/my-stream'})
+    return {'Records': records}
+
+
+class _Context:
+    def __init__(self, remaining_ms=60_000):
+        self.remaining_ms = remaining_ms
+
+    def get_remaining_time_in_millis(self):
+        return self.remaining_ms
+
+
+####### benchmark #######
+
+def benchmark_batch(records=500, io_ms=5, workers=(1, 4, 8, 16, 32)):
+    # each record waits io_ms (a call to a downstream service) and parses a small json body
+    import json
+    import time
+
+    def process(record, context):
+        json.loads(record_data(record))
+        time.sleep(io_ms / 1000)
+
+    async def process_async(record, context):
+        json.loads(record_data(record))
+        await asyncio.sleep(io_ms / 1000)
+
+    event = sqs_event([json.dumps({'order': i, 'items': list(range(10))}) for i in range(records)])
+
+    def run(label, handler):
+        start = time.perf_counter()
+        result = handler(event, _Context())
+        elapsed = time.perf_counter() - start
+        assert not result['batchItemFailures']
+        print(f"  {label:28} {elapsed * 1000:9.1f} ms  {records / elapsed:9,.0f} records/s")
+
+    print(f"{records} SQS records, {io_ms} ms of I/O each:")
+
+    def loop(event, context):  # what a handler processing one record at a time does
+        for record in event['Records']:
+            process(record, context)
+        return {'batchItemFailures': []}
+
+    run('one at a time (loop)', loop)
+    for n in workers:
+        run(f'batch_handler, {n} threads', batch_handler(process, max_workers=n))
+    for n in workers[-2:]:
+        run(f'batch_handler, asyncio {n}', batch_handler(process_async, max_workers=n))
+
+# benchmark_batch()
@@ -0,0 +1,105 @@
+# small runtime helper for our Lambda handlers: lazy init + cold start timings
+# deployed as a layer (zip the lambda-layer folder, python/ ends up on sys.path) or copied next
+# to the handler.
+#
+#   from lambda_runtime import instrument, lazy, timed_import
+#
+#   boto3 = timed_import('boto3')                          # import time recorded as an init step
+#   ssm = lazy(lambda: boto3.client('ssm'), 'ssm-client')  # created on first attribute access
+#
+#   @instrument
+#   def lambda_handler(event, context): ...
+#
+# every invocation prints one json log line (CloudWatch Logs Insights can query the fields):
+#   {"type": "invocation", "cold_start": true, "init_ms": 412.3, "init_steps": {"import boto3": 380.1},
+#    "lazy_init": {"ssm-client": 95.2}, "handler_ms": 130.8, ...}
+# cold_start is true for the first invocation of a container, init_ms is the time from loading this
+# module (top of the handler's imports) to that first invocation. init_steps / lazy_init list what
+# was imported / created since the previous log line, so deferred work shows up on the invocation
+# that paid for it.
+
+import functools
+import importlib
+import json
+import time
+from contextlib import contextmanager
+
+_loaded_at = time.perf_counter()
+_cold = True
+_steps_pending = {}  # init steps timed since the last log line
+_lazy_pending = {}  # lazy objects created since the last log line
+
+
+def _ms(seconds):
+    return round(seconds * 1000, 3)
+
+
+@contextmanager
+def init_step(name):
+    # time any block of module level setup: with init_step('load model'): ...
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        _steps_pending[name] = _ms(time.perf_counter() - start)
+
+
+def timed_import(name):
+    with init_step(f'import {name}'):
+        return importlib.import_module(name)
+
+
+class lazy:
+    # proxy that calls factory() on first use and then behaves like the created object
+
+    def __init__(self, factory, name=None):
+        self._factory = factory
+        self._name = name or getattr(factory, '__name__', 'lazy')
+        self._value = None
+        self._created = False
+
+    def _get(self):
+        if not self._created:
+            start = time.perf_counter()
+            self._value = self._factory()
+            self._created = True
+            _lazy_pending[self._name] = _ms(time.perf_counter() - start)
+        return self._value
+
+    def __getattr__(self, attr):
+        return getattr(self._get(), attr)
+
+    def __getitem__(self, key):
+        return self._get()[key]
+
+    def __call__(self, *args, **kwargs):
+        return self._get()(*args, **kwargs)
+
+    def __repr__(self):
+        state = repr(self._value) if self._created else 'not created yet'
+        return f'<lazy {self._name}: {state}>'
+
+
+def instrument(handler):
+    @functools.wraps(handler)
+    def wrapper(event, context):
+        global _cold
+        start = time.perf_counter()
+        cold, _cold = _cold, False
+        record = {'type': 'invocation', 'cold_start': cold}
+        if cold:
+            record['init_ms'] = _ms(start - _loaded_at)
+        if context is not None:
+            record['request_id'] = getattr(context, 'aws_request_id', None)
+        try:
+            return handler(event, context)
+        finally:
+            record['handler_ms'] = _ms(time.perf_counter() - start)
+            if _steps_pending:  # module level ones on a cold start, deferred ones when they run
+                record['init_steps'] = dict(_steps_pending)
+                _steps_pending.clear()
+            if _lazy_pending:
+                record['lazy_init'] = dict(_lazy_pending)
+                _lazy_pending.clear()
+            print(json.dumps(record))
+    return wrapper
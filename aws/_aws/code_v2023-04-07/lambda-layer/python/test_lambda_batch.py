@@ -0,0 +1,76 @@
+# batch_handler on synthetic SQS / Kinesis events
+# python -m pytest aws/_aws/code_v2023-04-07/lambda-layer/python
+
+import asyncio
+import threading
+
+from lambda_batch import batch_handler, kinesis_event, record_data, sqs_event
+
+
+class Context:
+    def __init__(self, remaining_ms=60_000):
+        self.remaining_ms = remaining_ms
+
+    def get_remaining_time_in_millis(self):
+        return self.remaining_ms
+
+
+def fail_on_bad(record, context):
+    if record_data(record).startswith('bad'):
+        raise ValueError(record_data(record))
+
+
+def _failed(result):
+    return [f['itemIdentifier'] for f in result['batchItemFailures']]
+
+
+def test_standard_queue_reports_only_failed_messages():
+    handler = batch_handler(fail_on_bad, on_error=None)
+    result = handler(sqs_event(['ok', 'bad 1', 'ok', 'ok', 'bad 2']), Context())
+    assert result == {'batchItemFailures': [{'itemIdentifier': 'msg-1'}, {'itemIdentifier': 'msg-4'}]}
+    assert handler({'Records': []}, None) == {'batchItemFailures': []}
+
+
+def test_async_record_function():
+    async def fail_on_bad_async(record, context):
+        await asyncio.sleep(0)
+        fail_on_bad(record, context)
+
+    result = batch_handler(fail_on_bad_async, on_error=None)(sqs_event(['ok', 'bad 1', 'ok', 'ok', 'bad 2']), Context())
+    assert _failed(result) == ['msg-1', 'msg-4']
+
+
+def test_fifo_group_stops_after_a_failure():
+    seen, lock = [], threading.Lock()
+
+    def record_seen(record, context):
+        with lock:
+            seen.append(record['messageId'])
+        fail_on_bad(record, context)
+
+    event = sqs_event(['ok', 'bad', 'ok', 'ok', 'ok'], group_ids=['a', 'a', 'a', 'b', 'b'])
+    result = batch_handler(record_seen, on_error=None)(event, Context())
+    assert _failed(result) == ['msg-1', 'msg-2']
+    assert 'msg-2' not in seen and {'msg-3', 'msg-4'} <= set(seen)
+    assert seen.index('msg-3') < seen.index('msg-4')
+
+
+def test_kinesis_reports_lowest_failed_sequence_number():
+    event = kinesis_event(['ok', 'ok', 'bad', 'ok', 'bad'], partition_keys=['a', 'b', 'c', 'd', 'e'])
+    result = batch_handler(fail_on_bad, on_error=None)(event, Context())
+    assert _failed(result) == [event['Records'][2]['kinesis']['sequenceNumber']]
+
+
+def test_close_to_timeout_nothing_started():
+    started = []
+    handler = batch_handler(lambda record, context: started.append(record), stop_before_ms=2000, on_error=None)
+    result = handler(sqs_event(['ok', 'ok']), Context(1000))
+    assert _failed(result) == ['msg-0', 'msg-1'] and not started
+
+
+def test_on_error_gets_every_failure():
+    errors = []
+    handler = batch_handler(fail_on_bad, on_error=lambda record, exc: errors.append((record['messageId'], exc)))
+    handler(sqs_event(['bad 1', 'ok', 'bad 2']), Context())
+    assert sorted(m for m, _ in errors) == ['msg-0', 'msg-2']
+    assert all(isinstance(exc, ValueError) for _, exc in errors)
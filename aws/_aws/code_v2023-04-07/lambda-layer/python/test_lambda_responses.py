@@ -0,0 +1,65 @@
+# StaticResponse: one strong ETag per content-coding, 304s for any of them
+# python -m pytest aws/_aws/code_v2023-04-07/lambda-layer/python
+
+import gzip
+
+from lambda_responses import StaticResponse, json_response
+
+BIG = {'items': [{'id': i, 'name': f'item {i}'} for i in range(500)]}
+
+
+def _event(**headers):
+    return {'headers': headers}
+
+
+def test_etag_per_coding():
+    static = StaticResponse(BIG)
+    plain = static(_event())
+    zipped = static(_event(**{'Accept-Encoding': 'gzip'}))
+    assert zipped['headers']['Content-Encoding'] == 'gzip'
+    assert zipped['headers']['ETag'] != plain['headers']['ETag']
+    assert zipped['headers']['ETag'] == plain['headers']['ETag'][:-1] + '-gzip"'
+    assert plain['headers']['Vary'] == zipped['headers']['Vary'] == 'Accept-Encoding'
+
+
+def test_not_modified_names_the_matching_variant():
+    static = StaticResponse(BIG)
+    gzip_etag = static.etags['gzip']
+    # the cache holds the gzip variant and revalidates it
+    response = static(_event(**{'Accept-Encoding': 'gzip', 'If-None-Match': gzip_etag}))
+    assert response['statusCode'] == 304 and response['body'] == ''
+    assert response['headers'] == {'ETag': gzip_etag, 'Vary': 'Accept-Encoding'}
+    # a cache holding several variants lists them all, W/ prefixes compare weakly
+    response = static(_event(**{'if-none-match': f'"other", W/{static.etag}'}))
+    assert response['headers']['ETag'] == static.etag
+    # '*' gets the 304 of the variant that would have been served
+    response = static(_event(**{'Accept-Encoding': 'gzip', 'If-None-Match': '*'}))
+    assert response['headers']['ETag'] == gzip_etag
+    assert static(_event(**{'If-None-Match': '"other"'}))['statusCode'] == 200
+
+
+def test_small_body_not_compressed():
+    static = StaticResponse('hello')
+    assert static.compressed == {} and list(static.etags) == ['identity']
+    response = static(_event(**{'Accept-Encoding': 'gzip', 'If-None-Match': static.etag}))
+    assert response['headers'] == {'ETag': static.etag}
+
+
+def test_json_response_body():
+    import base64
+    import json
+
+    response = json_response(BIG, event=_event(**{'Accept-Encoding': 'gzip'}))
+    assert response['isBase64Encoded']
+    assert json.loads(gzip.decompress(base64.b64decode(response['body']))) == BIG
+
+
+def test_errors_are_never_not_modified():
+    for status in (301, 404, 500):
+        error = StaticResponse({'error': 'boom'}, status=status)
+        response = error(_event(**{'If-None-Match': error.etag}))
+        assert response['statusCode'] == status and response['body']
+        assert error(_event(**{'If-None-Match': '*'}))['statusCode'] == status
+    big_error = json_response(BIG, status=503, event=_event(**{'If-None-Match': '*', 'Accept-Encoding': 'gzip'}))
+    assert big_error['statusCode'] == 503
+    assert StaticResponse('created', status=201)(_event(**{'If-None-Match': '*'}))['statusCode'] == 304
@@ -0,0 +1,79 @@
+# lazy / init_step / instrument and the json line printed per invocation
+# python -m pytest aws/_aws/code_v2023-04-07/lambda-layer/python
+
+import importlib
+import json
+from types import SimpleNamespace
+
+import pytest
+
+import lambda_runtime
+
+
+@pytest.fixture
+def rt():
+    # fresh module state: cold start flag, pending steps
+    return importlib.reload(lambda_runtime)
+
+
+def _records(capsys):
+    return [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+
+
+def test_lazy_runs_factory_once(rt):
+    calls = []
+
+    def factory():
+        calls.append(1)
+        return {'region': 'eu-west-1'}
+
+    client = rt.lazy(factory, 'client')
+    assert 'not created yet' in repr(client) and calls == []
+    assert client['region'] == 'eu-west-1'
+    assert client.get('region') == 'eu-west-1'
+    assert calls == [1]
+    assert rt.lazy(lambda: len, 'len')([1, 2]) == 2
+
+
+def test_cold_start_only_on_first_call(rt, capsys):
+    handler = rt.instrument(lambda event, context: event['n'])
+    context = SimpleNamespace(aws_request_id='req-1')
+    assert [handler({'n': n}, context) for n in range(3)] == [0, 1, 2]
+    records = _records(capsys)
+    assert [r['cold_start'] for r in records] == [True, False, False]
+    assert 'init_ms' in records[0] and 'init_ms' not in records[1]
+    assert all(r['type'] == 'invocation' and r['request_id'] == 'req-1' for r in records)
+    assert all(r['handler_ms'] >= 0 for r in records)
+
+
+def test_init_work_reported_once_on_the_invocation_that_paid_for_it(rt, capsys):
+    with rt.init_step('load config'):
+        pass
+    json_module = rt.timed_import('json')
+    client = rt.lazy(lambda: {'ok': True}, 'client')
+
+    @rt.instrument
+    def handler(event, context):
+        if event.get('use_client'):
+            return client['ok']
+        return json_module.dumps(event)
+
+    handler({}, None)
+    handler({'use_client': True}, None)
+    handler({'use_client': True}, None)
+    first, second, third = _records(capsys)
+    assert set(first['init_steps']) == {'load config', 'import json'}
+    assert 'lazy_init' not in first
+    assert 'init_steps' not in second and set(second['lazy_init']) == {'client'}
+    assert 'init_steps' not in third and 'lazy_init' not in third
+
+
+def test_log_line_when_handler_raises(rt, capsys):
+    @rt.instrument
+    def handler(event, context):
+        raise RuntimeError('boom')
+
+    with pytest.raises(RuntimeError, match='boom'):
+        handler({}, None)
+    (record,) = _records(capsys)
+    assert record['cold_start'] is True and 'handler_ms' in record
@@ -1,13 +1,19 @@
-import json
-import boto3
 import os
 
-ssm = boto3.client('ssm', region_name="eu-west-3")
-dev_or_prod = os.environ['DEV_OR_PROD']
+from lambda_runtime import instrument, lazy, timed_import
+from params import ParameterCache
 
+# nothing expensive at import: boto3 is imported and the client / environment read on first use
+# (the import and creation times show up in the cold start log line, see lambda_runtime.py)
+ssm = lazy(lambda: timed_import('boto3').client('ssm', region_name="eu-west-3"), 'ssm-client')
+# everything under /my-app/<env>/ in one get_parameters_by_path call, kept for warm invocations
+params = lazy(lambda: ParameterCache("/my-app/" + os.environ['DEV_OR_PROD'] + "/", client=ssm, ttl=300),
+              'ssm-parameters')
+
+@instrument
 def lambda_handler(event, context):
-    db_url = ssm.get_parameters(Names=["/my-app/" + dev_or_prod + "/db-url"])
-    print(db_url)   
-    db_password = ssm.get_parameters(Names=["/my-app/" + dev_or_prod + "/db-password"], WithDecryption=True)
+    db_url = params["db-url"]
+    print(db_url)
+    db_password = params["db-password"]  # SecureString, already decrypted
     print(db_password)
     return "worked!"
@@ -0,0 +1,93 @@
+# Parameter Store values for a Lambda, loaded once per container instead of once per request
+#
+# - one get_parameters_by_path call (paginated, 10 per page) for everything under the path,
+#   WithDecryption=True so SecureStrings are decrypted in the same call
+# - values are kept in module scope, so warm invocations of the same container reuse them
+# - after `refresh_after` seconds a background thread reloads them while the old values keep being
+#   served, after `ttl` seconds a request waits for a reload (stale values are never older than ttl)
+# - if a reload fails the old values are kept (and logged) until the next try
+#
+# IAM: the function role needs ssm:GetParametersByPath on arn:aws:ssm:<region>:<account>:parameter/my-app/<env>
+# (and kms:Decrypt on the key for SecureString values)
+
+import threading
+import time
+
+
+class ParameterCache:
+
+    def __init__(self, path, client=None, ttl=300, refresh_after=None, region_name=None, recursive=True):
+        self.path = path if path.endswith('/') else path + '/'
+        self.ttl = ttl
+        self.refresh_after = ttl * 0.8 if refresh_after is None else refresh_after
+        self.recursive = recursive
+        self.region_name = region_name
+        self._client = client
+        self._values = None
+        self._loaded_at = 0.0
+        self._lock = threading.Lock()
+        self._refreshing = False
+        self.calls = 0  # get_parameters_by_path requests made, for tests / metrics
+
+    @property
+    def client(self):
+        # created on first use, so importing the handler doesn't pay for it
+        if self._client is None:
+            import boto3
+
+            self._client = boto3.client('ssm', region_name=self.region_name)
+        return self._client
+
+    def _fetch(self):
+        values = {}
+        kwargs = {'Path': self.path, 'Recursive': self.recursive, 'WithDecryption': True}
+        while True:
+            self.calls += 1
+            response = self.client.get_parameters_by_path(**kwargs)
+            for param in response['Parameters']:
+                value = param['Value']
+                if param['Type'] == 'StringList':
+                    value = value.split(',')
+                values[param['Name'][len(self.path):]] = value
+            if 'NextToken' not in response:
+                return values
+            kwargs['NextToken'] = response['NextToken']
+
+    def _reload(self):
+        values = self._fetch()
+        self._values, self._loaded_at = values, time.monotonic()
+
+    def _background_reload(self):
+        try:
+            self._reload()
+        except Exception as e:  # keep serving the old values
+            print(f"parameter refresh for {self.path} failed: {e!r}")
+        finally:
+            self._refreshing = False
+
+    def all(self):
+        age = time.monotonic() - self._loaded_at
+        if self._values is None or age >= self.ttl:
+            with self._lock:
+                # another thread may have reloaded while we waited for the lock
+                if self._values is None or time.monotonic() - self._loaded_at >= self.ttl:
+                    self._reload()
+        elif age >= self.refresh_after and not self._refreshing:
+            with self._lock:
+                if not self._refreshing:
+                    self._refreshing = True
+                    threading.Thread(target=self._background_reload, daemon=True).start()
+        return self._values
+
+    def get(self, name, default=None):
+        # name relative to the path ('db-url') or the full name ('/my-app/dev/db-url')
+        if name.startswith(self.path):
+            name = name[len(self.path):]
+        return self.all().get(name, default)
+
+    def __getitem__(self, name):
+        value = self.get(name)
+        if value is None:
+            raise KeyError(f"{self.path}{name} not found in Parameter Store")
+        return value
+
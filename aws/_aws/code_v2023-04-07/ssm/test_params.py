@@ -0,0 +1,95 @@
+# ParameterCache against a stubbed SSM client (botocore Stubber) and moto's in-memory SSM
+# python -m pytest aws/_aws/code_v2023-04-07/ssm
+
+import time
+
+import boto3
+import pytest
+from botocore.stub import Stubber
+
+from params import ParameterCache
+
+PAGE_1 = {'Parameters': [{'Name': '/my-app/dev/db-url', 'Type': 'String', 'Value': 'dev.db.example.com'}],
+          'NextToken': 'page-2'}
+PAGE_2 = {'Parameters': [{'Name': '/my-app/dev/db-password', 'Type': 'SecureString', 'Value': 'secret'},
+                         {'Name': '/my-app/dev/hosts', 'Type': 'StringList', 'Value': 'a,b'}]}
+REQUEST = {'Path': '/my-app/dev/', 'Recursive': True, 'WithDecryption': True}
+
+
+def _stubbed_client():
+    client = boto3.client('ssm', region_name='eu-west-3', aws_access_key_id='x', aws_secret_access_key='x')
+    return client, Stubber(client)
+
+
+def _add_pages(stubber):
+    stubber.add_response('get_parameters_by_path', PAGE_1, REQUEST)
+    stubber.add_response('get_parameters_by_path', PAGE_2, dict(REQUEST, NextToken='page-2'))
+
+
+def _wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+def test_loaded_once_then_reloaded_after_ttl():
+    client, stubber = _stubbed_client()
+    _add_pages(stubber)  # initial load
+    _add_pages(stubber)  # reload after the ttl
+    with stubber:
+        cache = ParameterCache('/my-app/dev', client=client, ttl=0.2, refresh_after=10)
+        for _ in range(100):
+            assert cache['db-url'] == 'dev.db.example.com'
+            assert cache.get('/my-app/dev/db-password') == 'secret'
+        assert cache['hosts'] == ['a', 'b']
+        assert cache.calls == 2  # two pages, once for 100 invocations
+        time.sleep(0.25)
+        cache['db-url']
+        assert cache.calls == 4
+        stubber.assert_no_pending_responses()
+
+
+def test_missing_parameter():
+    client, stubber = _stubbed_client()
+    _add_pages(stubber)
+    with stubber:
+        cache = ParameterCache('/my-app/dev/', client=client)
+        assert cache.get('nope', 'default') == 'default'
+        with pytest.raises(KeyError):
+            cache['nope']
+
+
+def test_failed_background_refresh_keeps_old_values(capsys):
+    client, stubber = _stubbed_client()
+    _add_pages(stubber)
+    stubber.add_client_error('get_parameters_by_path', 'ThrottlingException')
+    with stubber:
+        cache = ParameterCache('/my-app/dev/', client=client, ttl=60, refresh_after=0.05)
+        assert cache['db-url'] == 'dev.db.example.com'
+        time.sleep(0.1)
+        assert cache['db-url'] == 'dev.db.example.com'  # starts the refresh, which fails
+        _wait_for(lambda: not cache._refreshing)
+        assert cache['db-password'] == 'secret'
+        stubber.assert_no_pending_responses()
+    assert 'ThrottlingException' in capsys.readouterr().out
+
+
+def test_background_refresh_with_moto():
+    from moto import mock_aws
+
+    with mock_aws():
+        client = boto3.client('ssm', region_name='eu-west-3')
+        client.put_parameter(Name='/my-app/dev/db-url', Value='dev.db.example.com', Type='String')
+        client.put_parameter(Name='/my-app/dev/db-password', Value='secret', Type='SecureString')
+        cache = ParameterCache('/my-app/dev/', client=client, ttl=60, refresh_after=0.1)
+        for _ in range(100):
+            assert cache['db-password'] == 'secret'
+        assert cache.calls == 1
+
+        client.put_parameter(Name='/my-app/dev/db-url', Value='new.db.example.com', Type='String', Overwrite=True)
+        time.sleep(0.15)
+        # past refresh_after but not the ttl: the old value is served while it reloads in the background
+        assert cache['db-url'] == 'dev.db.example.com'
+        _wait_for(lambda: cache['db-url'] == 'new.db.example.com')
+        assert cache.calls == 2
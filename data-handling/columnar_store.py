@@ -0,0 +1,251 @@
+# shared dataset layer for the data-handling scripts
+# convert a csv once into a columnar folder, after that every column opens memory-mapped:
+# nothing is parsed or copied at startup, pages are read from disk only when touched
+#
+#   convert_csv('people.csv', 'people.cols')                 # .npy per column (default)
+#   convert_csv('people.csv', 'people.arrow', fmt='arrow')   # one uncompressed Arrow IPC file
+#   ds = open_dataset('people.cols')
+#   ds['Salary']          -> numpy memmap (statsmodels, numpy, scipy take it as is)
+#   ds.to_pandas()        -> DataFrame backed by the mapped arrays
+#   ds.to_polars()        -> polars DataFrame on the same buffers
+#   ds.to_arrow()         -> pyarrow Table on the same buffers
+#
+# .npy format: numeric columns are stored as is (ints with missing values become float64 + NaN),
+# string columns are dictionary encoded: <col>.codes.npy (int32, -1 = missing) + <col>.labels.json
+#
+# the scripts are run from the repo root, so import it with
+#   import sys; sys.path.append('./data-handling'); from columnar_store import open_dataset
+# pipenv install numpy pandas polars pyarrow
+
+import json
+import os
+import time
+
+import numpy as np
+import pyarrow as pa
+
+from peak_memory import peak_rss
+
+META = 'dataset.json'
+
+
+def _widen(typ):
+    # next type to try for a column whose later blocks don't fit the type inferred from the first
+    if pa.types.is_integer(typ):
+        return pa.float64()
+    return pa.string()
+
+
+def _csv_to_arrow(csv_path, arrow_path, block_size):
+    # streaming read, only one block of the csv is in memory at a time
+    # the schema is inferred from the first block only, when a later block has a value that doesn't
+    # fit (an int column with a float further down, a number column with text) the column is widened
+    # (int -> float64 -> string) and the conversion starts over
+    import re
+
+    from pyarrow import csv
+
+    column_types = {}
+    while True:
+        reader = csv.open_csv(csv_path, read_options=csv.ReadOptions(block_size=block_size),
+                              convert_options=csv.ConvertOptions(strings_can_be_null=True,
+                                                                 column_types=column_types))
+        rows = 0
+        try:
+            with pa.OSFile(arrow_path, 'wb') as sink, pa.ipc.new_file(sink, reader.schema) as writer:
+                for batch in reader:
+                    writer.write_batch(batch)
+                    rows += batch.num_rows
+            return rows
+        except pa.ArrowInvalid as e:
+            found = re.match(r'In CSV column #(\d+): .*conversion error', str(e))
+            if not found:
+                raise
+            field = reader.schema.field(int(found.group(1)))
+            if pa.types.is_string(field.type):
+                raise
+            column_types[field.name] = _widen(field.type)
+
+
+def _column_to_npy(chunked, path_base, rows):
+    # writes one column of the arrow file, chunk by chunk, returns its metadata entry
+    typ = chunked.type
+    if pa.types.is_string(typ) or pa.types.is_large_string(typ):
+        codes = np.lib.format.open_memmap(path_base + '.codes.npy', mode='w+', dtype='int32', shape=(rows,))
+        labels, index, pos = [], {}, 0
+        for chunk in chunked.chunks:
+            encoded = chunk.dictionary_encode()
+            chunk_labels = encoded.dictionary.to_pylist()
+            remap = np.array([index.setdefault(label, len(index)) for label in chunk_labels] or [0], dtype='int32')
+            idx = encoded.indices.to_numpy(zero_copy_only=False)
+            valid = ~np.asarray(encoded.indices.is_null())
+            out = np.full(len(chunk), -1, dtype='int32')
+            out[valid] = remap[idx[valid].astype('int64')]
+            codes[pos:pos + len(chunk)] = out
+            pos += len(chunk)
+        labels = sorted(index, key=index.get)
+        codes.flush()
+        with open(path_base + '.labels.json', 'w') as f:
+            json.dump(labels, f)
+        return {'kind': 'category'}
+
+    has_nulls = chunked.null_count > 0
+    dtype = typ.to_pandas_dtype()
+    if has_nulls and not np.issubdtype(dtype, np.floating):
+        dtype = np.float64  # NaN for missing
+    out = np.lib.format.open_memmap(path_base + '.npy', mode='w+', dtype=dtype, shape=(rows,))
+    pos = 0
+    for chunk in chunked.chunks:
+        values = chunk.to_numpy(zero_copy_only=False)
+        out[pos:pos + len(chunk)] = values
+        pos += len(chunk)
+    out.flush()
+    return {'kind': 'numeric'}
+
+
+def convert_csv(csv_path, out_path, fmt='npy', block_size=64 << 20):
+    if fmt not in ('npy', 'arrow'):
+        raise ValueError(f"fmt must be 'npy' or 'arrow', got {fmt!r}")
+    os.makedirs(out_path, exist_ok=True)
+    arrow_path = os.path.join(out_path, 'data.arrow')
+    rows = _csv_to_arrow(csv_path, arrow_path, block_size)
+    meta = {'format': fmt, 'rows': rows, 'columns': {}}
+
+    if fmt == 'npy':
+        table = pa.ipc.open_file(pa.memory_map(arrow_path)).read_all()  # mapped, not loaded
+        for name in table.column_names:
+            meta['columns'][name] = _column_to_npy(table.column(name), os.path.join(out_path, name), rows)
+        del table
+        os.remove(arrow_path)
+    else:
+        meta['columns'] = {name: {} for name in pa.ipc.open_file(pa.memory_map(arrow_path)).schema.names}
+
+    with open(os.path.join(out_path, META), 'w') as f:
+        json.dump(meta, f)
+    return open_dataset(out_path)
+
+
+class ColumnarDataset:
+
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, META)) as f:
+            self.meta = json.load(f)
+        self.format = self.meta['format']
+        self.columns = list(self.meta['columns'])
+        self._table = None
+        self._cache = {}
+
+    def __len__(self):
+        return self.meta['rows']
+
+    def _arrow_table(self):
+        if self._table is None:
+            self._table = pa.ipc.open_file(pa.memory_map(os.path.join(self.path, 'data.arrow'))).read_all()
+        return self._table
+
+    def __getitem__(self, name):
+        # numeric column -> memmapped ndarray, string column -> pandas Categorical on mapped codes
+        if name not in self._cache:
+            if self.format == 'arrow':
+                column = self._arrow_table().column(name)
+                if column.num_chunks == 1 and column.null_count == 0 and pa.types.is_primitive(column.type):
+                    self._cache[name] = column.chunk(0).to_numpy()  # zero-copy view
+                else:
+                    self._cache[name] = column.to_numpy()  # needs a copy (several batches / nulls / strings)
+            elif self.meta['columns'][name]['kind'] == 'category':
+                import pandas as pd
+
+                codes = np.load(os.path.join(self.path, name + '.codes.npy'), mmap_mode='r')
+                with open(os.path.join(self.path, name + '.labels.json')) as f:
+                    labels = json.load(f)
+                self._cache[name] = pd.Categorical.from_codes(codes, categories=labels)
+            else:
+                self._cache[name] = np.load(os.path.join(self.path, name + '.npy'), mmap_mode='r')
+        return self._cache[name]
+
+    def to_arrow(self, columns=None):
+        columns = columns or self.columns
+        if self.format == 'arrow':
+            return self._arrow_table().select(columns)
+        arrays = []
+        for name in columns:
+            values = self[name]
+            if self.meta['columns'][name]['kind'] == 'category':
+                arrays.append(pa.DictionaryArray.from_arrays(
+                    pa.array(np.asarray(values.codes), mask=np.asarray(values.codes) < 0),
+                    pa.array(list(values.categories))))
+            else:
+                arrays.append(pa.array(np.asarray(values)))  # zero-copy for numeric numpy
+        return pa.table(arrays, names=columns)
+
+    def to_pandas(self, columns=None):
+        import pandas as pd
+
+        columns = columns or self.columns
+        if self.format == 'arrow':
+            return self.to_arrow(columns).to_pandas(split_blocks=True, self_destruct=False)
+        return pd.DataFrame({name: self[name] for name in columns}, copy=False)
+
+    def to_polars(self, columns=None):
+        import polars as pl
+
+        return pl.from_arrow(self.to_arrow(columns), rechunk=False)
+
+
+def open_dataset(path):
+    return ColumnarDataset(path)
+
+
+####### benchmark #######
+
+def _load_and_use(how, path, out):
+    # startup = time until the first real answer (mean salary per country here)
+    start = time.perf_counter()
+    if how == 'read_csv':
+        import pandas as pd
+
+        df = pd.read_csv(path)
+    else:
+        df = open_dataset(path).to_pandas()
+    loaded = time.perf_counter() - start
+    answer = df.groupby('Country', observed=True)['Salary'].mean()
+    out.put((loaded, time.perf_counter() - start, peak_rss(), len(answer)))
+
+
+def benchmark_loading(n_rows=10_000_000):
+    import multiprocessing
+    import tempfile
+
+    import pandas as pd
+
+    ctx = multiprocessing.get_context('spawn')  # fresh process per run, cold python and own peak RSS
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path = os.path.join(tmp, 'people.csv')
+        rng = np.random.default_rng(0)
+        countries = np.array(['USA', 'UK', 'France', 'Germany', 'China', 'Brazil', 'India'])
+        chunk = 1_000_000
+        for i in range(0, n_rows, chunk):
+            m = min(chunk, n_rows - i)
+            pd.DataFrame({
+                'Age': rng.integers(18, 70, m),
+                'Salary': rng.normal(60000, 15000, m).round(2),
+                'Country': countries[rng.integers(0, len(countries), m)],
+            }).to_csv(csv_path, mode='a' if i else 'w', header=not i, index=False)
+
+        start = time.perf_counter()
+        convert_csv(csv_path, os.path.join(tmp, 'people.cols'))
+        convert_csv(csv_path, os.path.join(tmp, 'people.arrow'), fmt='arrow')
+        print(f"one-off conversion of {n_rows:,} rows (both formats): {time.perf_counter() - start:.2f}s")
+
+        for label, how, path in (('pd.read_csv', 'read_csv', csv_path),
+                                 ('npy columns', 'open', os.path.join(tmp, 'people.cols')),
+                                 ('arrow ipc', 'open', os.path.join(tmp, 'people.arrow'))):
+            out = ctx.Queue()
+            child = ctx.Process(target=_load_and_use, args=(how, path, out))
+            child.start()
+            loaded, answered, peak, _ = out.get()
+            child.join()
+            print(f"{label:12} open {loaded:7.3f}s  first answer {answered:7.3f}s  peak RSS {peak / 1e6:8.1f} MB")
+
+# benchmark_loading()
@@ -0,0 +1,247 @@
+# clean / filter / aggregate for datasets bigger than memory
+# same call for both engines:
+#   engine='polars' -> scan_parquet / scan_csv (LazyFrame) collected with the streaming engine
+#   engine='pandas' -> reads the file in chunks (pyarrow batches for parquet, read_csv chunksize for csv)
+#                      and merges partial aggregates, so only one chunk is in memory at a time
+# only the needed columns are read (projection pushdown) and for parquet the filters are
+# pushed down to the reader too (row groups that can't match are skipped)
+# pipenv install pandas polars pyarrow
+
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+import polars as pl
+
+# aggregations that can be merged across chunks
+AGGS = ('sum', 'count', 'mean', 'min', 'max')
+OPS = ('==', '!=', '<', '<=', '>', '>=', 'in', 'not in')
+
+
+def _check(filters, aggs):
+    for col, op, value in filters:
+        if op not in OPS:
+            raise ValueError(f"unsupported filter op {op!r}, use one of {OPS}")
+    for col, agg in (aggs or {}).items():
+        if agg not in AGGS:
+            raise ValueError(f"unsupported aggregation {agg!r} for {col!r}, use one of {AGGS}")
+
+
+def _needed_columns(columns, filters, dropna, group_by, aggs):
+    if columns is None and not aggs:
+        return None
+    needed = list(columns or [])
+    for col in [c for c, _, _ in filters] + list(dropna) + list(group_by or []) + list(aggs or {}):
+        if col not in needed:
+            needed.append(col)
+    return needed
+
+
+####### polars #######
+
+def _polars_expr(col, op, value):
+    c = pl.col(col)
+    return {
+        '==': lambda: c == value, '!=': lambda: c != value,
+        '<': lambda: c < value, '<=': lambda: c <= value,
+        '>': lambda: c > value, '>=': lambda: c >= value,
+        'in': lambda: c.is_in(value), 'not in': lambda: ~c.is_in(value),
+    }[op]()
+
+
+def _polars_agg(col, agg):
+    c = pl.col(col)
+    return {'sum': c.sum(), 'count': c.count(), 'mean': c.mean(), 'min': c.min(), 'max': c.max()}[agg].alias(col)
+
+
+def _run_polars(path, columns, filters, dropna, group_by, aggs):
+    lf = pl.scan_parquet(path) if path.endswith('.parquet') else pl.scan_csv(path)
+    needed = _needed_columns(columns, filters, dropna, group_by, aggs)
+    if needed:
+        lf = lf.select(needed)
+    for col, op, value in filters:
+        lf = lf.filter(_polars_expr(col, op, value))
+    if dropna:
+        lf = lf.drop_nulls(list(dropna))
+    if aggs:
+        exprs = [_polars_agg(col, agg) for col, agg in aggs.items()]
+        lf = lf.group_by(group_by).agg(exprs).sort(group_by) if group_by else lf.select(exprs)
+    elif columns:
+        lf = lf.select(columns)
+    return lf.collect(engine='streaming').to_pandas()
+
+
+####### pandas (chunked) #######
+
+def _pandas_mask(df, col, op, value):
+    c = df[col]
+    return {
+        '==': lambda: c == value, '!=': lambda: c != value,
+        '<': lambda: c < value, '<=': lambda: c <= value,
+        '>': lambda: c > value, '>=': lambda: c >= value,
+        'in': lambda: c.isin(value), 'not in': lambda: ~c.isin(value),
+    }[op]()
+
+
+def _arrow_filter(filters):
+    import pyarrow.compute as pc
+
+    expr = None
+    for col, op, value in filters:
+        f = pc.field(col)
+        e = {
+            '==': lambda: f == value, '!=': lambda: f != value,
+            '<': lambda: f < value, '<=': lambda: f <= value,
+            '>': lambda: f > value, '>=': lambda: f >= value,
+            'in': lambda: f.isin(value), 'not in': lambda: ~f.isin(value),
+        }[op]()
+        expr = e if expr is None else expr & e
+    return expr
+
+
+def _iter_chunks(path, needed, filters, chunksize):
+    if path.endswith('.parquet'):
+        import pyarrow.dataset as ds
+
+        dataset = ds.dataset(path, format='parquet')
+        for batch in dataset.to_batches(columns=needed, filter=_arrow_filter(filters), batch_size=chunksize):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(path, usecols=needed, chunksize=chunksize)
+
+
+def _partial(df, group_by, aggs):
+    # per chunk: sum/count/min/max, mean is kept as sum + count and finished at the end
+    parts = {}
+    for col, agg in aggs.items():
+        for part in (('sum', 'count') if agg == 'mean' else (agg,)):
+            parts[f'{col}__{part}'] = (col, part)
+    if group_by:
+        return df.groupby(group_by, observed=True, dropna=False).agg(**parts)  # null keys are a group, like polars
+    return pd.DataFrame({name: [getattr(df[col], part)()] for name, (col, part) in parts.items()})
+
+
+def _merge_partials(partials, group_by, aggs):
+    combined = pd.concat(partials)
+    how = {}
+    for name in combined.columns:
+        part = name.rsplit('__', 1)[1]
+        how[name] = 'sum' if part in ('sum', 'count') else part
+    merged = combined.groupby(level=group_by, dropna=False).agg(how) if group_by else combined.agg(how).to_frame().T
+    out = pd.DataFrame(index=merged.index)
+    for col, agg in aggs.items():
+        if agg == 'mean':
+            out[col] = merged[f'{col}__sum'] / merged[f'{col}__count']
+        else:
+            out[col] = merged[f'{col}__{agg}']
+    # null group first, the same order as polars' sort
+    if not group_by:
+        return out.reset_index(drop=True)
+    return out.reset_index().sort_values(group_by, na_position='first', ignore_index=True)
+
+
+def _run_pandas(path, columns, filters, dropna, group_by, aggs, chunksize):
+    needed = _needed_columns(columns, filters, dropna, group_by, aggs)
+    pushed = path.endswith('.parquet')  # pyarrow already applied the filters
+    partials, frames = [], []
+    for df in _iter_chunks(path, needed, filters, chunksize):
+        if not pushed:
+            for col, op, value in filters:
+                df = df[_pandas_mask(df, col, op, value)]
+        if dropna:
+            df = df.dropna(subset=list(dropna))
+        if aggs:
+            partials.append(_partial(df, group_by, aggs))
+        else:
+            frames.append(df[columns] if columns else df)
+    if aggs:
+        return _merge_partials(partials, group_by, aggs)
+    return pd.concat(frames, ignore_index=True)
+
+
+def clean_filter_aggregate(path, columns=None, filters=(), dropna=(), group_by=None, aggs=None,
+                           engine='polars', chunksize=1_000_000):
+    # path: .parquet or .csv
+    # filters: [('Age', '>', 30), ('Country', 'in', ['UK', 'USA'])]
+    # dropna: columns that must not be null
+    # group_by + aggs: ['Country'], {'Salary': 'mean', 'Age': 'max'}
+    # without aggs the (filtered) rows come back, so keep that for results that fit in memory
+    _check(filters, aggs)
+    if isinstance(group_by, str):
+        group_by = [group_by]
+    if engine == 'polars':
+        return _run_polars(path, columns, filters, dropna, group_by, aggs)
+    if engine == 'pandas':
+        return _run_pandas(path, columns, filters, dropna, group_by, aggs, chunksize)
+    raise ValueError(f"engine must be 'polars' or 'pandas', got {engine!r}")
+
+
+####### benchmark #######
+
+# the parent dir, for peak_memory.py
+_DATA_HANDLING = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+
+
+def generate_dataset(path, n_rows=10_000_000, seed=0, chunk=1_000_000):
+    # Name/Age/Salary like panads_clean_filter, plus Country, with ~5% missing ages and salaries
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    rng = np.random.default_rng(seed)
+    countries = np.array(['USA', 'UK', 'France', 'Germany', 'China', 'Brazil', 'India'])
+    writer = None
+    for start in range(0, n_rows, chunk):
+        n = min(chunk, n_rows - start)
+        age = rng.integers(18, 70, n).astype('float64')
+        age[rng.random(n) < 0.05] = np.nan
+        salary = rng.normal(60000, 15000, n).round()
+        salary[rng.random(n) < 0.05] = np.nan
+        df = pd.DataFrame({
+            'Name': np.char.add('person', np.arange(start, start + n).astype(str)),
+            'Age': age,
+            'Salary': salary,
+            'Country': countries[rng.integers(0, len(countries), n)],
+        })
+        if path.endswith('.parquet'):
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            writer = writer or pq.ParquetWriter(path, table.schema)
+            writer.write_table(table)
+        else:
+            df.to_csv(path, mode='a' if start else 'w', header=not start, index=False)
+    if writer:
+        writer.close()
+
+
+def _timed_run(path, engine, out):
+    sys.path.append(_DATA_HANDLING)
+    from peak_memory import peak_rss
+
+    query = dict(filters=[('Age', '>=', 30)], dropna=['Salary'], group_by='Country',
+                 aggs={'Salary': 'mean', 'Age': 'max', 'Name': 'count'})
+    start = time.perf_counter()
+    result = clean_filter_aggregate(path, engine=engine, **query)
+    took = time.perf_counter() - start
+    out.put((took, peak_rss(), len(result)))
+
+
+def benchmark_engines(n_rows=10_000_000, formats=('parquet', 'csv')):
+    import multiprocessing
+    import tempfile
+
+    ctx = multiprocessing.get_context('spawn')  # fresh process per run so the peak memory is its own
+    with tempfile.TemporaryDirectory() as tmp:
+        for fmt in formats:
+            path = os.path.join(tmp, f'people.{fmt}')
+            generate_dataset(path, n_rows)
+            print(f"{fmt}: {os.path.getsize(path) / 1e6:.0f} MB on disk, {n_rows:,} rows")
+            for engine in ('pandas', 'polars'):
+                out = ctx.Queue()
+                child = ctx.Process(target=_timed_run, args=(path, engine, out))
+                child.start()
+                took, peak, groups = out.get()
+                child.join()
+                print(f"  {engine:7} {took:7.2f}s  peak RSS {peak / 1e6:8.1f} MB  ({groups} groups)")
+
+# benchmark_engines()
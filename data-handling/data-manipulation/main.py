@@ -24,11 +24,26 @@ def panads_clean_filter():
     
     # df = df.fillna("This is empty value")  # Insated of removing we can fill with some value to keep the data rows
     
+    # per column strategies, all vectorized, and dtypes shrunk after (see imputation.py)
+    from imputation import impute
+    df = impute(df, {'Age': 'mean', 'Salary': 'median'})
+    
     return df
     
 # print(panads_clean_filter())
 
 
+# same cleaning/filtering on a file that doesn't fit in memory (see lazy_clean.py)
+# engine can be 'polars' (LazyFrame + streaming) or 'pandas' (chunked)
+def clean_filter_big_file(path, engine='polars'):
+    from lazy_clean import clean_filter_aggregate
+
+    return clean_filter_aggregate(path, filters=[('Age', '>=', 30)], dropna=['Salary'],
+                                  group_by='Country', aggs={'Salary': 'mean', 'Age': 'max'}, engine=engine)
+
+# print(clean_filter_big_file('people.parquet'))
+
+
 def numpy_operations():
     
     arr = np.array([1, 2, 3, 4, 5])
@@ -37,6 +52,17 @@ def numpy_operations():
 # print(numpy_operations())
 
 
+# same numbers in one pass over chunks, for arrays that don't fit in memory (see online_stats.py)
+# the median is an estimate (KLL sketch), works on np.memmap too
+def numpy_operations_streaming(arr, chunk_size=10_000_000):
+    from online_stats import summarize
+
+    stats = summarize(arr, chunk_size)
+    return stats.mean, stats.median, stats.std(), stats.var()
+
+# print(numpy_operations_streaming(np.memmap('values.f64', dtype='float64', mode='r')))
+
+
 def polars_better_than_pandas():
     
     df = pl.DataFrame({'Name': ['John', 'Jane', 'Doe'], 'Age': [28, 34, None], 'Salary': [70000, None, 45000]})
@@ -0,0 +1,224 @@
+# single pass statistics for arrays that don't fit in memory (chunks, np.memmap, several processes)
+# numpy_operations (main.py) does np.mean, np.median, np.std, np.var = four passes over a fully
+# loaded array, here every chunk is read once:
+#   - mean / var / std / min / max with Welford's update (Chan's formula to add a whole chunk at once)
+#   - median / quantiles estimated with a KLL sketch (rank error ~1/k, memory ~k*log(n/k)),
+#     that costs a sort per chunk, pass quantiles=False when only the moments are needed
+# two OnlineStats can be merged, so chunks can be summarized in different processes
+# NaNs are skipped (like np.nanmean etc.)
+# pipenv install numpy
+
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+
+class KLLSketch:
+    # levels[h] holds items that each stand for 2**h original values, a level that gets too big
+    # is sorted and every other item (random offset) moves up one level
+
+    def __init__(self, k=256, seed=None):
+        self.k = k
+        self.n = 0
+        self.levels = [np.empty(0)]
+        self.rng = np.random.default_rng(seed)
+
+    def _capacity(self, h):
+        depth = len(self.levels) - h - 1
+        return max(2, int(np.ceil(self.k * (2 / 3) ** depth)))
+
+    def _compress(self):
+        h = 0
+        while h < len(self.levels):
+            buf = self.levels[h]
+            if buf.size > self._capacity(h):
+                if h + 1 == len(self.levels):
+                    self.levels.append(np.empty(0))
+                buf = np.sort(buf)
+                leftover = buf[:buf.size % 2]  # odd one out stays at this level
+                buf = buf[buf.size % 2:]
+                promoted = buf[self.rng.integers(2)::2]
+                self.levels[h + 1] = np.concatenate([self.levels[h + 1], promoted])
+                self.levels[h] = leftover
+            h += 1
+
+    def update(self, values):
+        values = np.asarray(values, dtype='float64').ravel()
+        values = values[~np.isnan(values)]
+        self.n += values.size
+        self.levels[0] = np.concatenate([self.levels[0], values])
+        self._compress()
+
+    def merge(self, other):
+        for h, buf in enumerate(other.levels):
+            if h == len(self.levels):
+                self.levels.append(np.empty(0))
+            self.levels[h] = np.concatenate([self.levels[h], buf])
+        self.n += other.n
+        self._compress()
+        return self
+
+    def quantile(self, q):
+        if not self.n:
+            return np.nan
+        items = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(buf.size, 2.0 ** h) for h, buf in enumerate(self.levels)])
+        order = np.argsort(items)
+        items, cum = items[order], np.cumsum(weights[order])
+        idx = np.searchsorted(cum, np.asarray(q) * cum[-1], side='left')
+        return items[np.minimum(idx, items.size - 1)]
+
+
+class OnlineStats:
+
+    def __init__(self, quantiles=True, k=256, seed=None):
+        self.n = 0
+        self._mean = 0.0
+        self._m2 = 0.0  # sum of squared differences from the mean
+        self.min = np.inf
+        self.max = -np.inf
+        self.sketch = KLLSketch(k, seed) if quantiles else None
+
+    def update(self, values):
+        values = np.asarray(values, dtype='float64').ravel()
+        values = values[~np.isnan(values)]
+        if not values.size:
+            return self
+        n_b = values.size
+        mean_b = values.mean()
+        m2_b = np.square(values - mean_b).sum()
+        self._combine(n_b, mean_b, m2_b)
+        self.min = min(self.min, values.min())
+        self.max = max(self.max, values.max())
+        if self.sketch is not None:
+            self.sketch.update(values)
+        return self
+
+    def _combine(self, n_b, mean_b, m2_b):
+        n = self.n + n_b
+        delta = mean_b - self._mean
+        self._mean += delta * n_b / n
+        self._m2 += m2_b + delta * delta * self.n * n_b / n
+        self.n = n
+
+    def merge(self, other):
+        if other.n:
+            self._combine(other.n, other._mean, other._m2)
+            self.min = min(self.min, other.min)
+            self.max = max(self.max, other.max)
+            if self.sketch is not None and other.sketch is not None:
+                self.sketch.merge(other.sketch)
+        return self
+
+    @property
+    def mean(self):
+        return self._mean if self.n else np.nan
+
+    def var(self, ddof=0):
+        return self._m2 / (self.n - ddof) if self.n > ddof else np.nan
+
+    def std(self, ddof=0):
+        return np.sqrt(self.var(ddof))
+
+    def quantile(self, q):
+        if self.sketch is None:
+            raise ValueError("created with quantiles=False")
+        return self.sketch.quantile(q)
+
+    @property
+    def median(self):
+        return self.quantile(0.5)
+
+
+def iter_chunks(arr, chunk_size=10_000_000, start=0, stop=None):
+    stop = len(arr) if stop is None else stop
+    for i in range(start, stop, chunk_size):
+        yield arr[i:min(i + chunk_size, stop)]
+
+
+def summarize(arr, chunk_size=10_000_000, quantiles=True, k=256):
+    # works on anything sliceable: ndarray, np.memmap, h5py dataset...
+    stats = OnlineStats(quantiles, k)
+    for chunk in iter_chunks(arr, chunk_size):
+        stats.update(chunk)
+    return stats
+
+
+def _summarize_range(path, dtype, start, stop, chunk_size, quantiles, k):
+    arr = np.memmap(path, dtype=dtype, mode='r')
+    stats = OnlineStats(quantiles, k, seed=start)
+    for chunk in iter_chunks(arr, chunk_size, start, stop):
+        stats.update(chunk)
+    return stats
+
+
+def summarize_memmap(path, dtype='float64', workers=None, chunk_size=10_000_000, quantiles=True, k=256):
+    # split a raw binary file (np.memmap / ndarray.tofile) across processes and merge the partials
+    workers = workers or os.cpu_count()
+    n = os.path.getsize(path) // np.dtype(dtype).itemsize
+    bounds = np.linspace(0, n, workers + 1).astype(int)
+    total = OnlineStats(quantiles, k)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        parts = [pool.submit(_summarize_range, path, dtype, int(a), int(b), chunk_size, quantiles, k)
+                 for a, b in zip(bounds[:-1], bounds[1:])]
+        for part in parts:
+            total.merge(part.result())
+    return total
+
+
+####### benchmark #######
+
+def _write_memmap(path, n, chunk_size=10_000_000, seed=0):
+    rng = np.random.default_rng(seed)
+    arr = np.memmap(path, dtype='float64', mode='w+', shape=(n,))
+    for i in range(0, n, chunk_size):
+        m = min(chunk_size, n - i)
+        arr[i:i + m] = rng.lognormal(3, 1, m)  # skewed, so mean != median
+    arr.flush()
+    del arr
+
+
+def benchmark_online_stats(n=1_000_000_000, workers=None, path=None):
+    # 1e9 float64 = 8 GB on disk, numpy's np.var on that memmap needs another 8 GB of RAM for x - mean
+    import tempfile
+
+    tmp = None
+    if path is None:
+        tmp = tempfile.TemporaryDirectory()
+        path = os.path.join(tmp.name, 'values.f64')
+    _write_memmap(path, n)
+    arr = np.memmap(path, dtype='float64', mode='r')
+
+    start = time.perf_counter()
+    exact = {'mean': np.mean(arr), 'std': np.std(arr), 'var': np.var(arr), 'min': arr.min(), 'max': arr.max()}
+    numpy_took = time.perf_counter() - start
+
+    start = time.perf_counter()
+    summarize_memmap(path, workers=workers, quantiles=False)
+    moments_took = time.perf_counter() - start
+
+    start = time.perf_counter()
+    stats = summarize_memmap(path, workers=workers)
+    online_took = time.perf_counter() - start
+
+    procs = workers or os.cpu_count()
+    print(f"numpy (4 passes):                {numpy_took:8.2f}s")
+    print(f"online moments, {procs} procs:       {moments_took:8.2f}s")
+    print(f"online moments + KLL, {procs} procs: {online_took:8.2f}s")
+    online = {'mean': stats.mean, 'std': stats.std(), 'var': stats.var(), 'min': stats.min, 'max': stats.max}
+    for name, value in exact.items():
+        print(f"  {name:5} exact {value:16.6f}  online {online[name]:16.6f}  rel err {abs(online[name] - value) / abs(value):.2e}")
+
+    # quantile accuracy as rank error: what fraction of the data is really below the estimate
+    for q in (0.01, 0.25, 0.5, 0.75, 0.99):
+        estimate = stats.quantile(q)
+        below = sum(np.count_nonzero(chunk <= estimate) for chunk in iter_chunks(arr))
+        print(f"  q={q:<5} estimate {estimate:12.4f}  true rank {below / n:.4f}  rank err {abs(below / n - q):.4f}")
+
+    del arr
+    if tmp is not None:
+        tmp.cleanup()
+
+# benchmark_online_stats(n=100_000_000)
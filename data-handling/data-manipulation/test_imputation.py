@@ -0,0 +1,39 @@
+# impute: pandas and polars frames get the same fills
+# python -m pytest data-handling/data-manipulation
+
+import numpy as np
+import pandas as pd
+import polars as pl
+import pytest
+
+from imputation import impute
+
+FRAME = pd.DataFrame({
+    'Country': ['UK', 'USA', None, 'UK', None, 'USA', None, 'UK'],
+    'Salary': [1.0, np.nan, 3.0, np.nan, np.nan, 6.0, 5.0, np.nan],
+    'Score': [np.nan, 0.5, np.nan, 0.25, np.nan, 1.0, np.nan, 0.75],
+})
+
+
+def _both(strategies):
+    ours = impute(FRAME, strategies, downcast=False).reset_index(drop=True)  # polars has no index
+    theirs = impute(pl.from_pandas(FRAME), strategies, downcast=False).to_pandas()
+    pd.testing.assert_frame_equal(ours, theirs, check_dtype=False)
+    return ours
+
+
+@pytest.mark.parametrize('strategy', ['group_mean', 'group_median'])
+def test_null_group_key_is_a_group(strategy):
+    out = _both({'Salary': (strategy, 'Country')})
+    assert out.loc[4, 'Salary'] == 4.0  # mean of the rows without a country
+
+
+def test_fills_see_earlier_fills():
+    # Country is filled first, the group mean is then taken over the filled keys
+    out = _both({'Country': ('constant', 'unknown'), 'Salary': ('group_mean', 'Country')})
+    assert out.loc[4, 'Salary'] == 4.0 and out.loc[4, 'Country'] == 'unknown'
+
+
+def test_other_strategies():
+    out = _both({'Score': 'ffill', 'Salary': 'median', 'Country': 'drop'})
+    assert out['Salary'].notna().all() and out['Country'].notna().all()
@@ -0,0 +1,40 @@
+# clean_filter_aggregate: the pandas (chunked) and polars engines give the same result
+# python -m pytest data-handling/data-manipulation
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from lazy_clean import clean_filter_aggregate
+
+
+@pytest.fixture(params=['parquet', 'csv'])
+def path(request, tmp_path):
+    rng = np.random.default_rng(0)
+    n = 500
+    df = pd.DataFrame({
+        'Country': rng.choice(np.array(['UK', 'USA', 'France', None], dtype=object), n),
+        'Team': rng.choice(np.array(['a', 'b', None], dtype=object), n),
+        'Age': np.where(rng.random(n) < 0.1, np.nan, rng.integers(18, 70, n)),
+        'Salary': np.where(rng.random(n) < 0.1, np.nan, rng.normal(60000, 15000, n).round()),
+    })
+    file = str(tmp_path / f'people.{request.param}')
+    df.to_parquet(file) if request.param == 'parquet' else df.to_csv(file, index=False)
+    return file
+
+
+@pytest.mark.parametrize('group_by', ['Country', ['Country', 'Team']])
+def test_engines_agree_with_null_keys(path, group_by):
+    query = dict(filters=[('Age', '>=', 30)], dropna=['Salary'], group_by=group_by,
+                 aggs={'Salary': 'mean', 'Age': 'max'})
+    polars = clean_filter_aggregate(path, engine='polars', **query)
+    chunked = clean_filter_aggregate(path, engine='pandas', chunksize=64, **query)
+    assert polars[group_by if isinstance(group_by, str) else group_by[0]].isna().any()
+    pd.testing.assert_frame_equal(polars, chunked, check_dtype=False)
+
+
+def test_engines_agree_without_groups(path):
+    query = dict(filters=[('Country', 'in', ['UK', 'USA'])], aggs={'Salary': 'sum', 'Age': 'count'})
+    pd.testing.assert_frame_equal(clean_filter_aggregate(path, engine='polars', **query),
+                                  clean_filter_aggregate(path, engine='pandas', chunksize=64, **query),
+                                  check_dtype=False)
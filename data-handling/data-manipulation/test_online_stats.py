@@ -0,0 +1,85 @@
+# OnlineStats / KLLSketch against the exact numpy results
+# python -m pytest data-handling/data-manipulation
+
+import numpy as np
+import pytest
+
+from online_stats import KLLSketch, OnlineStats, iter_chunks, summarize, summarize_memmap
+
+
+@pytest.fixture
+def values():
+    rng = np.random.default_rng(0)
+    return rng.lognormal(3, 1, 200_000)
+
+
+def _assert_moments(stats, expected):
+    assert stats.n == expected.size
+    np.testing.assert_allclose(stats.mean, expected.mean(), rtol=1e-12)
+    np.testing.assert_allclose(stats.var(), expected.var(), rtol=1e-10)
+    np.testing.assert_allclose(stats.var(ddof=1), expected.var(ddof=1), rtol=1e-10)
+    np.testing.assert_allclose(stats.std(), expected.std(), rtol=1e-10)
+    assert stats.min == expected.min() and stats.max == expected.max()
+
+
+def _rank_error(data, estimate, q):
+    return abs(np.count_nonzero(data <= estimate) / data.size - q)
+
+
+def test_moments_match_numpy(values):
+    _assert_moments(summarize(values, chunk_size=7_000, quantiles=False), values)
+
+
+def test_nans_and_empty_chunks(values):
+    with_nans = values.copy()
+    with_nans[::10] = np.nan
+    stats = OnlineStats(seed=0)
+    stats.update(np.empty(0))
+    for chunk in iter_chunks(with_nans, 5_000):
+        stats.update(chunk)
+        stats.update(np.array([np.nan, np.nan]))  # a chunk with nothing but NaNs
+    _assert_moments(stats, with_nans[~np.isnan(with_nans)])
+    assert stats.sketch.n == stats.n
+    np.testing.assert_allclose(stats.mean, np.nanmean(with_nans), rtol=1e-12)
+
+
+def test_empty():
+    stats = OnlineStats().update([])
+    assert stats.n == 0 and np.isnan(stats.mean) and np.isnan(stats.var()) and np.isnan(stats.median)
+    assert np.isnan(OnlineStats().update([1.0]).var(ddof=1))
+
+
+def test_merge_equals_one_pass(values):
+    one_pass = summarize(values, chunk_size=10_000)
+    parts = [summarize(chunk, chunk_size=10_000) for chunk in iter_chunks(values, 30_000)]
+    merged = OnlineStats().merge(OnlineStats())  # merging empty partials is a no-op
+    for part in parts:
+        merged.merge(part)
+    _assert_moments(merged, values)
+    np.testing.assert_allclose(merged.var(), one_pass.var(), rtol=1e-12)
+    assert merged.sketch.n == values.size
+    for q in (0.1, 0.5, 0.9):
+        assert _rank_error(values, merged.quantile(q), q) < 2 / 256
+
+
+@pytest.mark.parametrize('k', [64, 256])
+def test_kll_rank_error(values, k):
+    sketch = KLLSketch(k, seed=1)
+    for chunk in iter_chunks(values, 1_000):
+        sketch.update(chunk)
+    # memory stays ~k log(n/k), far below n
+    assert sum(buf.size for buf in sketch.levels) < 10 * k
+    for q in (0.01, 0.25, 0.5, 0.75, 0.99):
+        assert _rank_error(values, sketch.quantile(q), q) < 2 / k
+
+
+def test_summarize_memmap(tmp_path, values):
+    path = tmp_path / 'values.f64'
+    values.tofile(path)
+    stats = summarize_memmap(str(path), workers=2, chunk_size=25_000)
+    _assert_moments(stats, values)
+    assert _rank_error(values, stats.median, 0.5) < 2 / 256
+    moments_only = summarize_memmap(str(path), workers=2, chunk_size=25_000, quantiles=False)
+    _assert_moments(moments_only, values)
+    with pytest.raises(ValueError):
+        moments_only.quantile(0.5)
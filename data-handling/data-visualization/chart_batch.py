@@ -0,0 +1,161 @@
+# batch rendering of many line charts, headless
+# use_matplot_lib (main.py) used pyplot: every chart adds to pyplot's global figure manager and
+# nothing closes it, so a loop over thousands of charts keeps all of them in memory and redoes the
+# whole setup (figure, axes, ticks, labels) every time.
+# here a template Figure is built once per process on the Agg canvas (no pyplot at all), and each
+# chart only swaps the line data and the title before saving. charts are rendered in a process pool
+# in batches, the format comes from `fmt`: 'png', 'jpg' or 'svg'.
+#
+#   charts = [{'name': 'store-1', 'x': years, 'y': sales, 'title': 'Store 1'}, ...]   (any iterable)
+#   for path in render_batch(charts, 'out/', fmt='png'): ...
+#
+# pipenv install matplotlib pillow   (pillow for jpg)
+
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+from downsample import downsample, target_points
+
+FORMATS = ('png', 'jpg', 'svg')
+
+_template = None
+
+
+class LineChartTemplate:
+
+    def __init__(self, xlabel='', ylabel='', figsize=(6.4, 4.8), dpi=100, marker='o', linestyle='solid',
+                 linewidth=2, downsample_method='lttb'):
+        # downsample_method: 'lttb', 'minmax' or None, long series are reduced to what the width
+        # in pixels can show (see downsample.py)
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+        from matplotlib.figure import Figure
+
+        self.downsample_method = downsample_method
+        self.max_points = target_points(figsize[0], dpi)
+        self.fig = Figure(figsize=figsize, dpi=dpi)
+        FigureCanvasAgg(self.fig)  # attaches itself to the figure
+        self.ax = self.fig.add_subplot()
+        self.ax.set_xlabel(xlabel)
+        self.ax.set_ylabel(ylabel)
+        (self.line,) = self.ax.plot([], [], marker=marker, linestyle=linestyle, linewidth=linewidth)
+        self.title = self.ax.set_title('')
+
+    def render(self, x, y, path, title=''):
+        if self.downsample_method and len(x) > self.max_points:
+            x, y = downsample(x, y, self.max_points, self.downsample_method)
+        self.line.set_data(x, y)
+        self.ax.relim()
+        self.ax.autoscale_view()
+        self.title.set_text(title)
+        if path.endswith('.jpg'):
+            self.fig.savefig(path, pil_kwargs={'quality': 90})
+        else:
+            self.fig.savefig(path)
+        return path
+
+
+def _check_format(fmt):
+    if fmt not in FORMATS:
+        raise ValueError(f"fmt must be one of {FORMATS}, got {fmt!r}")
+
+
+def _init_worker(template_kwargs):
+    global _template
+    _template = LineChartTemplate(**template_kwargs)
+
+
+def _render_chunk(charts, out_dir, fmt):
+    # runs in the worker, one template per process, reused for every chart it gets
+    return [_template.render(c['x'], c['y'], os.path.join(out_dir, f"{c['name']}.{fmt}"), c.get('title', ''))
+            for c in charts]
+
+
+def render_batch(charts, out_dir, fmt='png', workers=None, chunk_size=50, max_pending=None, **template_kwargs):
+    # charts: iterable of dicts with name, x, y and optionally title, consumed lazily
+    # yields the written paths in input order, at most `max_pending` chunks are queued (backpressure)
+    _check_format(fmt)
+    os.makedirs(out_dir, exist_ok=True)
+    workers = workers or os.cpu_count()
+    max_pending = max_pending or workers * 2
+    charts = iter(charts)
+    pending = deque()
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(template_kwargs,)) as pool:
+        while chunk := list(islice(charts, chunk_size)):
+            pending.append(pool.submit(_render_chunk, chunk, out_dir, fmt))
+            if len(pending) >= max_pending:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
+
+
+####### benchmark #######
+
+# the parent dir, for peak_memory.py
+_DATA_HANDLING = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+
+
+def _charts(n, points=50, seed=0):
+    import numpy as np
+
+    rng = np.random.default_rng(seed)
+    x = np.arange(1950, 1950 + points)
+    for i in range(n):
+        yield {'name': f'chart-{i:05d}', 'x': x, 'y': rng.normal(0, 1, points).cumsum(), 'title': f'Sales {i}'}
+
+
+def _pyplot_loop(charts, out_dir, fmt):
+    # the old way: pyplot state, new figure per chart, closed here (otherwise it would not finish at all)
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+
+    for c in charts:
+        plt.figure()
+        plt.title(c['title'])
+        plt.xlabel('Year')
+        plt.ylabel('Sales')
+        plt.plot(c['x'], c['y'], marker='o', linestyle='solid', linewidth=2)
+        plt.savefig(os.path.join(out_dir, f"{c['name']}.{fmt}"))
+        plt.close()
+
+
+def _template_loop_rss(n, out_dir, fmt):
+    # in-process, so RSS can be followed while rendering
+    sys.path.append(_DATA_HANDLING)
+    from peak_memory import current_rss
+
+    template = LineChartTemplate(xlabel='Year', ylabel='Sales')
+    samples = []
+    for i, c in enumerate(_charts(n)):
+        template.render(c['x'], c['y'], os.path.join(out_dir, f"{c['name']}.{fmt}"), c['title'])
+        if i % (n // 10 or 1) == 0:
+            samples.append(current_rss())
+    return samples
+
+
+def benchmark_render(n=10_000, fmt='png', workers=None, pyplot_charts=500):
+    import tempfile
+
+    with tempfile.TemporaryDirectory() as tmp:
+        start = time.perf_counter()
+        _pyplot_loop(_charts(pyplot_charts), tmp, fmt)
+        took = time.perf_counter() - start
+        print(f"pyplot loop:              {pyplot_charts / took:7.1f} charts/sec  (on {pyplot_charts} charts)")
+
+        start = time.perf_counter()
+        samples = _template_loop_rss(n, tmp, fmt)
+        took = time.perf_counter() - start
+        print(f"template, 1 process:      {n / took:7.1f} charts/sec")
+        print("  RSS every 10%: " + " ".join(f"{s / 1e6:.0f}" for s in samples) + " MB")
+
+        start = time.perf_counter()
+        written = sum(1 for _ in render_batch(_charts(n), tmp, fmt, workers=workers, xlabel='Year', ylabel='Sales'))
+        took = time.perf_counter() - start
+        print(f"render_batch, {workers or os.cpu_count()} procs:   {written / took:7.1f} charts/sec")
+
+# benchmark_render()
@@ -0,0 +1,169 @@
+# reduce a long series to what the chart can actually show before handing it to a plotting library
+# a figure 6.4in wide at 100 dpi has 640 pixel columns, drawing 10M points into it costs render time
+# (matplotlib / seaborn) or megabytes of json (plotly) and looks the same as a few thousand points.
+#
+#   lttb(x, y, n_out)       Largest-Triangle-Three-Buckets: keeps the points that shape the line
+#                           (peaks, troughs), good default for line charts
+#   minmax(x, y, n_buckets) first/min/max/last point per x bucket (one bucket per pixel column):
+#                           the drawn envelope is the same as with all the points, good for noisy data
+#   target_points(width_in, dpi)  points worth drawing for a given figure width
+#   downsample(x, y, ...)   picks the method and the target, passes short series through unchanged
+#
+# x must be sorted (time series, index), numbers or datetime64. returns the selected x, y (numpy
+# arrays of the same dtypes, a datetime axis stays a datetime axis).
+# only for line / scatter series: the points are picked for their shape, so means, counts and
+# error bars computed from them are biased. bar charts aggregate the full data (bar_aggregate.py).
+# pipenv install numpy pandas
+
+import numpy as np
+
+METHODS = ('lttb', 'minmax')
+
+
+def target_points(width_in=6.4, dpi=100, per_pixel=2):
+    # 2 points per pixel column keeps the min and max of every column
+    return max(int(width_in * dpi * per_pixel), 3)
+
+
+def _numeric(x):
+    # float64 values to pick the points on, datetime64 / timedelta64 as integer ticks from the first
+    # one (differences are all that matter, and small numbers keep the prefix sums exact)
+    x = np.asarray(x)
+    if x.dtype.kind in 'mM':
+        ticks = x.view('i8')
+        return (ticks - ticks[0]).astype('float64') if len(ticks) else ticks.astype('float64')
+    return x.astype('float64', copy=False)
+
+
+def _lttb_index(x, y, n_out):
+    # indexes of the points LTTB keeps, x and y float64
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    # first and last point are kept, the rest is split into n_out - 2 buckets
+    every = (n - 2) / (n_out - 2)
+    edges = (np.floor(np.arange(n_out - 1) * every) + 1).astype(np.int64)
+    starts, ends = edges[:-1], edges[1:]
+    # mean of every bucket in one go (prefix sums), used as the third triangle corner
+    cx, cy = np.concatenate([[0.0], np.cumsum(x)]), np.concatenate([[0.0], np.cumsum(y)])
+    avg_x = (cx[ends] - cx[starts]) / (ends - starts)
+    avg_y = (cy[ends] - cy[starts]) / (ends - starts)
+    avg_x = np.append(avg_x[1:], x[-1])  # the bucket after the last one is the last point
+    avg_y = np.append(avg_y[1:], y[-1])
+
+    # each bucket depends on the point picked in the previous one, so this loop stays, but the
+    # triangle areas inside a bucket are one vector operation
+    picked = np.empty(n_out, dtype=np.int64)
+    picked[0], picked[-1] = 0, n - 1
+    a = 0
+    for i, (s, e) in enumerate(zip(starts, ends)):
+        ax_, ay_ = x[a], y[a]
+        area = np.abs((ax_ - avg_x[i]) * (y[s:e] - ay_) - (ax_ - x[s:e]) * (avg_y[i] - ay_))
+        a = s + int(np.argmax(area))
+        picked[i + 1] = a
+    return picked
+
+
+def _minmax_index(x, y, n_buckets):
+    # indexes of the first/min/max/last point of every bucket, x and y float64
+    n = len(x)
+    if 4 * n_buckets >= n:
+        return np.arange(n)
+
+    # buckets by x value, like pixel columns (uneven spacing in x is handled)
+    span = x[-1] - x[0]
+    bucket = ((x - x[0]) / span * n_buckets).astype(np.int64) if span > 0 else np.zeros(n, dtype=np.int64)
+    np.minimum(bucket, n_buckets - 1, out=bucket)
+    starts = np.flatnonzero(np.r_[True, bucket[1:] != bucket[:-1]])  # x sorted -> buckets are runs
+    ends = np.r_[starts[1:], n]
+    run = np.repeat(np.arange(len(starts)), ends - starts)
+
+    # index of the min / max inside each run: compare to the run's min/max, take the first hit
+    lows = np.minimum.reduceat(y, starts)
+    highs = np.maximum.reduceat(y, starts)
+    first_low = np.flatnonzero(y == lows[run])
+    first_high = np.flatnonzero(y == highs[run])
+    first_low = first_low[np.r_[True, run[first_low][1:] != run[first_low][:-1]]]
+    first_high = first_high[np.r_[True, run[first_high][1:] != run[first_high][:-1]]]
+
+    return np.unique(np.concatenate([starts, ends - 1, first_low, first_high]))  # sorted, in x order
+
+
+def lttb(x, y, n_out):
+    # the selected points keep the dtypes of x and y (datetime64 x stays datetime64)
+    x, y = np.asarray(x), np.asarray(y)
+    picked = _lttb_index(_numeric(x), y.astype('float64', copy=False), n_out)
+    return x[picked], y[picked]
+
+
+def minmax(x, y, n_buckets):
+    x, y = np.asarray(x), np.asarray(y)
+    keep = _minmax_index(_numeric(x), y.astype('float64', copy=False), n_buckets)
+    return x[keep], y[keep]
+
+
+def downsample(x, y, n_out=None, method='lttb', width_in=6.4, dpi=100):
+    # n_out defaults to what a figure of width_in x dpi can show
+    if method not in METHODS:
+        raise ValueError(f"method must be one of {METHODS}, got {method!r}")
+    n_out = n_out or target_points(width_in, dpi)
+    if len(x) <= n_out:
+        return np.asarray(x), np.asarray(y)
+    if method == 'lttb':
+        return lttb(x, y, n_out)
+    return minmax(x, y, max(n_out // 4, 1))  # up to 4 points per bucket
+
+
+def downsample_frame(df, x, y, n_out=None, method='lttb', width_in=6.4, dpi=100):
+    # same for a DataFrame (seaborn / plotly line charts take frames), other columns (hue, ...) are
+    # dropped, the kept rows are taken from the frame so x and y keep their dtypes (tz-aware too)
+    import pandas as pd
+
+    if method not in METHODS:
+        raise ValueError(f"method must be one of {METHODS}, got {method!r}")
+    n_out = n_out or target_points(width_in, dpi)
+    if len(df) <= n_out:
+        return df
+    df = df.sort_values(x) if not df[x].is_monotonic_increasing else df
+    col = df[x]
+    if pd.api.types.is_datetime64_any_dtype(col):
+        col = col.to_numpy(dtype='datetime64[ns]')  # tz-aware -> the same instants in UTC
+    xs, ys = _numeric(col), df[y].to_numpy(dtype='float64')
+    picked = _lttb_index(xs, ys, n_out) if method == 'lttb' else _minmax_index(xs, ys, max(n_out // 4, 1))
+    return df[[x, y]].iloc[picked].reset_index(drop=True)
+
+
+####### benchmark #######
+
+def benchmark_downsample(n=10_000_000, width_in=6.4, dpi=100, seed=0):
+    import os
+    import tempfile
+    import time
+
+    from chart_batch import LineChartTemplate
+
+    rng = np.random.default_rng(seed)
+    x = np.arange(n, dtype='float64')
+    y = rng.normal(0, 1, n).cumsum() + np.where(rng.random(n) < 1e-5, 50, 0)  # walk with rare spikes
+    target = target_points(width_in, dpi)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        chart = LineChartTemplate(figsize=(width_in, width_in * 0.75), dpi=dpi, marker='', downsample_method=None)
+        for label, method in (('raw', None), ('lttb', 'lttb'), ('minmax', 'minmax')):
+            start = time.perf_counter()
+            xs, ys = (x, y) if method is None else downsample(x, y, target, method)
+            reduced = time.perf_counter() - start
+            path = os.path.join(tmp, f'{label}.png')
+            chart.render(xs, ys, path, title=label)
+            total = time.perf_counter() - start
+
+            import plotly.graph_objects as go
+
+            start = time.perf_counter()
+            html = go.Figure(go.Scatter(x=xs, y=ys, mode='lines')).to_html(include_plotlyjs=False)
+            plotly_took = time.perf_counter() - start
+            print(f"{label:7} {len(xs):>10,} points  reduce {reduced:6.2f}s  matplotlib {total:6.2f}s "
+                  f"png {os.path.getsize(path) / 1e3:6.0f} KB  plotly html {len(html) / 1e6:7.2f} MB in {plotly_took:5.2f}s")
+
+# benchmark_downsample()
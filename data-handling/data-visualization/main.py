@@ -5,22 +5,19 @@
 ####### using matplotlib #######
 
 def use_matplot_lib():
-    import matplotlib
-    matplotlib.use('Agg')  # Set the backend to Agg for non-interactive plotting
-    import matplotlib.pyplot as plt
+    # Figure + Agg canvas directly instead of pyplot's global state, nothing is left open after saving
+    # for thousands of charts use render_batch from chart_batch.py (one template figure per process)
+    from chart_batch import LineChartTemplate
 
     years = [1950, 1960, 1970, 1980, 1990, 2000, 2010]
     sales = [300, 700, 2000, 3000, 5000, 8000, 12000]
     countries = ['USA', 'UK', 'France', 'Germany', 'China', 'Brazil', 'India']
     colors = ['red', 'blue', 'green', 'yellow', 'purple', 'orange', 'brown']
 
-    plt.title('Sales by Year')
-    plt.xlabel('Year')
-    plt.ylabel('Sales')
-    plt.plot(years, sales, marker='o', linestyle='solid', linewidth=2)
+    chart = LineChartTemplate(xlabel='Year', ylabel='Sales', marker='o', linestyle='solid', linewidth=2)
 
     #storing in current folder
-    plt.savefig('./data-handling/data-visualization/sales_by_year.jpg')  # Saves the plot as a PNG file
+    chart.render(years, sales, './data-handling/data-visualization/sales_by_year.jpg', title='Sales by Year')
 
 
     #advacne graph
@@ -52,7 +49,11 @@ def use_seaborn():
     df = pd.DataFrame(data)
 
     # Create a bar plot using Seaborn
-    sns.barplot(x='age', y='salary', data=df)
+    # sns.barplot(x='age', y='salary', data=df)
+    # same plot, but the bars and error bars are aggregated once (and cached) instead of bootstrapped
+    # by seaborn on every call, from the full frame, see bar_aggregate.py
+    from bar_aggregate import barplot
+    barplot(df, x='age', y='salary')
     
     # plt.title('Salary by Age')
     # plt.xlabel('Age')
@@ -66,7 +67,10 @@ def use_seaborn():
 # use_seaborn()
 
 
-def using_plotly():
+def using_plotly(html_path=None):
+    # html_path: write the chart to an html file instead of fig.show() (headless / batch jobs),
+    # plotly.min.js is written once next to it and shared by every chart in that folder
+    # for big series use line_figure / write_html_batch from plotly_export.py (WebGL, typed arrays)
     import plotly.express as px
     import pandas as pd
 
@@ -74,6 +78,9 @@ def using_plotly():
     df = pd.DataFrame(data)
 
     fig = px.bar(df, x='age', y='salary', title='Salary by Age')
+    if html_path:
+        from plotly_export import write_html
+        return write_html(fig, html_path)
     fig.show()
     
     
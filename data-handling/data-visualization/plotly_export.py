@@ -0,0 +1,102 @@
+# plotly charts written to html files in batch, no browser / notebook needed
+# using_plotly (main.py) calls fig.show(), that needs an interactive session and inlines the whole
+# plotly.js (~4.6 MB) plus every value as json text into the page. for headless jobs with big series:
+#   - WebGL traces (scattergl) above `webgl_threshold` points, the svg scatter gets slow past ~10k
+#   - values go out as numpy arrays, which plotly >= 6 writes as base64 typed arrays
+#     ({"dtype": "f8", "bdata": ...}) instead of decimal text; float32=True halves that again
+#     (fine for plotting, ~7 significant digits) and ints are stored in the smallest int type
+#   - bundle='directory' writes plotly.min.js once next to the html files and every page references
+#     it; bundle='inline' gives fully self-contained files, 'cdn' loads it from the internet
+#
+#   fig = line_figure(x, y, title='Sales')
+#   write_html_batch([('sales', fig), ...], 'out/')
+#
+# pipenv install plotly numpy pandas
+
+import os
+import time
+
+import numpy as np
+
+BUNDLES = {'directory': 'directory', 'inline': True, 'cdn': 'cdn'}
+
+
+def typed(values, float32=False):
+    # contiguous numpy array in the smallest reasonable dtype, so plotly encodes it as a typed array
+    arr = np.ascontiguousarray(values)
+    if arr.dtype.kind in 'iu' and arr.size:
+        lo, hi = arr.min(), arr.max()
+        for dtype in ('int8', 'int16', 'int32'):
+            info = np.iinfo(dtype)
+            if info.min <= lo and hi <= info.max:
+                return arr.astype(dtype)
+        return arr
+    if arr.dtype.kind == 'f' and float32:
+        return arr.astype('float32')
+    return arr
+
+
+def line_figure(x, y, title=None, name=None, mode='lines', float32=False, webgl_threshold=1000, downsample=None):
+    # downsample: None, 'lttb' or 'minmax' (see downsample.py), WebGL can draw millions of points
+    # but the file still has to carry them
+    import plotly.graph_objects as go
+
+    if downsample:
+        from downsample import downsample as reduce_points
+
+        x, y = reduce_points(np.asarray(x), np.asarray(y), method=downsample)
+    trace = go.Scattergl if len(y) > webgl_threshold else go.Scatter
+    fig = go.Figure(trace(x=typed(x, float32), y=typed(y, float32), mode=mode, name=name))
+    if title:
+        fig.update_layout(title=title)
+    return fig
+
+
+def write_html(fig, path, bundle='directory'):
+    import plotly.io as pio
+
+    if bundle not in BUNDLES:
+        raise ValueError(f"bundle must be one of {tuple(BUNDLES)}, got {bundle!r}")
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    # validate=False: the figure was already validated when it was built
+    pio.write_html(fig, path, include_plotlyjs=BUNDLES[bundle], full_html=True, auto_open=False, validate=False)
+    return path
+
+
+def write_html_batch(figures, out_dir, bundle='directory'):
+    # figures: iterable of (name, figure), consumed lazily, yields the written paths
+    for name, fig in figures:
+        yield write_html(fig, os.path.join(out_dir, f'{name}.html'), bundle)
+
+
+####### benchmark #######
+
+def benchmark_export(n=1_000_000, n_charts=5, seed=0):
+    import tempfile
+
+    import pandas as pd
+    import plotly.express as px
+    import plotly.graph_objects as go
+
+    rng = np.random.default_rng(seed)
+    x = np.arange(n)
+    y = rng.normal(0, 1, n).cumsum()
+
+    def run(label, build, bundle):
+        with tempfile.TemporaryDirectory() as tmp:
+            start = time.perf_counter()
+            figures = ((f'chart-{i}', build()) for i in range(n_charts))
+            list(write_html_batch(figures, tmp, bundle))
+            took = time.perf_counter() - start
+            # everything in the folder, so the shared plotly.min.js is counted too (spread over the charts)
+            total = sum(os.path.getsize(os.path.join(tmp, f)) for f in os.listdir(tmp))
+        print(f"{label:36} {took / n_charts:6.2f}s/chart  {total / n_charts / 1e6:7.2f} MB/chart")
+
+    df = pd.DataFrame({'age': x, 'salary': y})
+    run('px.bar, inline js (current path)', lambda: px.bar(df, x='age', y='salary'), 'inline')
+    run('go.Scatter, json text lists', lambda: go.Figure(go.Scatter(x=x.tolist(), y=y.tolist())), 'inline')
+    run('scattergl, typed arrays, shared js', lambda: line_figure(x, y), 'directory')
+    run('  + float32', lambda: line_figure(x, y, float32=True), 'directory')
+    run('  + lttb downsampling', lambda: line_figure(x, y, downsample='lttb'), 'directory')
+
+# benchmark_export()
@@ -0,0 +1,97 @@
+# aggregate_bars: pandas vs polars engine, against sns.barplot, cache hits
+# python -m pytest data-handling/data-visualization
+
+import matplotlib
+
+matplotlib.use('Agg')
+
+import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
+import polars as pl
+import pytest
+import seaborn as sns
+
+import bar_aggregate
+from bar_aggregate import aggregate_bars
+
+
+@pytest.fixture
+def df():
+    rng = np.random.default_rng(0)
+    n = 3000
+    df = pd.DataFrame({
+        'age': rng.integers(2, 7, n) * 10.0,
+        'group': rng.choice(['a', 'b'], n),
+        'salary': rng.normal(50000, 12000, n),
+    })
+    df.loc[::50, 'age'] = np.nan  # rows without a bar
+    df.loc[::70, 'group'] = None
+    df.loc[::90, 'salary'] = np.nan
+    return df
+
+
+@pytest.fixture(autouse=True)
+def empty_cache():
+    bar_aggregate._cache.clear()
+
+
+@pytest.mark.parametrize('errorbar', [('ci', 95), ('se', 1), ('sd', 2), ('pi', 95), None])
+@pytest.mark.parametrize('hue', [None, 'group'])
+def test_engines_agree(df, errorbar, hue):
+    pandas = aggregate_bars(df, 'age', 'salary', hue, errorbar=errorbar, cache=False)
+    polars = aggregate_bars(pl.from_pandas(df), 'age', 'salary', hue, errorbar=errorbar, cache=False)
+    assert len(pandas) == (5 if hue is None else 10)  # null keys are no bar in either
+    assert pandas[['age'] + ([hue] if hue else [])].notna().all().all()
+    pd.testing.assert_frame_equal(pandas, polars, check_dtype=False)
+
+
+def test_median_and_sum(df):
+    for estimator in ('median', 'sum'):
+        pandas = aggregate_bars(df, 'age', 'salary', estimator=estimator, errorbar=('pi', 50), cache=False)
+        polars = aggregate_bars(df, 'age', 'salary', estimator=estimator, errorbar=('pi', 50), engine='polars',
+                                cache=False)
+        pd.testing.assert_frame_equal(pandas, polars, check_dtype=False)
+
+
+@pytest.mark.parametrize('errorbar', [('se', 1), ('sd', 1), ('pi', 95)])
+def test_matches_seaborn(df, errorbar):
+    fig, ax = plt.subplots()
+    sns.barplot(df, x='age', y='salary', errorbar=errorbar, ax=ax)
+    heights = [bar.get_height() for bar in ax.patches]
+    limits = [sorted(line.get_ydata()) for line in ax.lines]
+    plt.close(fig)
+
+    agg = aggregate_bars(df, 'age', 'salary', errorbar=errorbar, cache=False)  # sorted ages, like seaborn
+    np.testing.assert_allclose(agg['estimate'], heights, rtol=1e-12)
+    np.testing.assert_allclose(agg[['low', 'high']].to_numpy(), limits, rtol=1e-12)
+
+
+def test_invalid_spec(df):
+    with pytest.raises(ValueError):
+        aggregate_bars(df, 'age', 'salary', estimator='median', errorbar=('ci', 95))
+    with pytest.raises(ValueError):
+        aggregate_bars(df, 'age', 'salary', errorbar=('boot', 95))
+    with pytest.raises(ValueError):
+        aggregate_bars(df, 'age', 'salary', engine='duckdb')
+
+
+def test_cache_hits(df, tmp_path, monkeypatch):
+    calls = []
+    aggregate = bar_aggregate._aggregate_pandas
+    monkeypatch.setattr(bar_aggregate, '_aggregate_pandas', lambda *args: calls.append(args) or aggregate(*args))
+
+    first = aggregate_bars(df, 'age', 'salary', cache_dir=str(tmp_path))
+    first.loc[0, 'estimate'] = -1  # callers get a copy, the cached frame is untouched
+    again = aggregate_bars(df.copy(), 'age', 'salary', cache_dir=str(tmp_path))
+    assert len(calls) == 1 and again.loc[0, 'estimate'] != -1
+
+    aggregate_bars(df, 'age', 'salary', errorbar=('se', 1))  # other spec
+    changed = df.copy()
+    changed.loc[1, 'salary'] += 1  # other data
+    aggregate_bars(changed, 'age', 'salary')
+    assert len(calls) == 3
+
+    bar_aggregate._cache.clear()  # a new process: the disk cache still has it
+    pd.testing.assert_frame_equal(aggregate_bars(df, 'age', 'salary', cache_dir=str(tmp_path)), again)
+    assert len(calls) == 3
@@ -0,0 +1,43 @@
+# render_batch with a 2 process pool and a handful of charts
+# python -m pytest data-handling/data-visualization
+
+import os
+
+import numpy as np
+import pytest
+
+from chart_batch import FORMATS, render_batch
+
+MAGIC = {'png': b'\x89PNG', 'jpg': b'\xff\xd8\xff', 'svg': b'<?xml'}
+
+
+def _charts(n):
+    x = np.arange(1950, 1970)
+    return [{'name': f'chart-{i}', 'x': x, 'y': np.sin(x + i), 'title': f'Chart {i}'} for i in range(n)]
+
+
+@pytest.mark.parametrize('fmt', FORMATS)
+def test_every_format_in_input_order(tmp_path, fmt):
+    charts = _charts(7)
+    paths = list(render_batch(iter(charts), str(tmp_path), fmt=fmt, workers=2, chunk_size=2, max_pending=1,
+                              xlabel='Year', ylabel='Sales'))
+    assert paths == [os.path.join(str(tmp_path), f"chart-{i}.{fmt}") for i in range(7)]
+    for path in paths:
+        with open(path, 'rb') as f:
+            assert f.read(5).startswith(MAGIC[fmt])
+    if fmt == 'svg':
+        with open(paths[3], encoding='utf-8') as f:
+            assert 'Chart 3' in f.read()  # the title was swapped per chart
+
+
+def test_long_series_downsampled(tmp_path):
+    x = np.arange(200_000, dtype='float64')
+    charts = [{'name': 'long', 'x': x, 'y': np.sin(x / 1000)}]
+    [path] = render_batch(charts, str(tmp_path), workers=2)
+    assert os.path.getsize(path) > 0
+
+
+def test_invalid_format(tmp_path):
+    with pytest.raises(ValueError):
+        next(render_batch(_charts(1), str(tmp_path), fmt='gif'))
+    assert not os.listdir(tmp_path)
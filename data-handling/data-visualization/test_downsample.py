@@ -0,0 +1,119 @@
+# lttb / minmax against straightforward reference implementations, datetime x
+# python -m pytest data-handling/data-visualization
+
+import math
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from downsample import downsample, downsample_frame, lttb, minmax
+
+
+def reference_lttb(x, y, n_out):
+    # the original algorithm (Steinarsson 2013), one point at a time
+    n = len(x)
+    every = (n - 2) / (n_out - 2)
+    picked, a = [0], 0
+    for i in range(n_out - 2):
+        avg_start = int(math.floor((i + 1) * every)) + 1
+        avg_end = min(int(math.floor((i + 2) * every)) + 1, n)
+        avg_x = sum(x[avg_start:avg_end]) / (avg_end - avg_start)
+        avg_y = sum(y[avg_start:avg_end]) / (avg_end - avg_start)
+        best, best_area = None, -1.0
+        for j in range(int(math.floor(i * every)) + 1, int(math.floor((i + 1) * every)) + 1):
+            area = abs((x[a] - avg_x) * (y[j] - y[a]) - (x[a] - x[j]) * (avg_y - y[a]))
+            if area > best_area:
+                best, best_area = j, area
+        picked.append(best)
+        a = best
+    picked.append(n - 1)
+    return picked
+
+
+def reference_minmax(x, y, n_buckets):
+    span = x[-1] - x[0]
+    buckets = {}
+    for i in range(len(x)):
+        b = min(int((x[i] - x[0]) / span * n_buckets), n_buckets - 1)
+        buckets.setdefault(b, []).append(i)
+    keep = set()
+    for members in buckets.values():
+        values = [y[i] for i in members]
+        keep |= {members[0], members[-1], members[values.index(min(values))], members[values.index(max(values))]}
+    return sorted(keep)
+
+
+@pytest.fixture
+def walk():
+    rng = np.random.default_rng(0)
+    x = np.cumsum(rng.uniform(0.5, 1.5, 5000))  # uneven spacing
+    y = rng.normal(0, 1, 5000).cumsum() + np.where(rng.random(5000) < 1e-3, 30, 0)
+    return x, y
+
+
+@pytest.mark.parametrize('n_out', [3, 10, 257, 1000])
+def test_lttb_matches_reference(walk, n_out):
+    x, y = walk
+    xs, ys = lttb(x, y, n_out)
+    picked = reference_lttb(x.tolist(), y.tolist(), n_out)
+    np.testing.assert_array_equal(xs, x[picked])
+    np.testing.assert_array_equal(ys, y[picked])
+
+
+@pytest.mark.parametrize('n_buckets', [1, 7, 160, 1000])
+def test_minmax_matches_reference(walk, n_buckets):
+    x, y = walk
+    xs, ys = minmax(x, y, n_buckets)
+    keep = reference_minmax(x.tolist(), y.tolist(), n_buckets)
+    np.testing.assert_array_equal(xs, x[keep])
+    np.testing.assert_array_equal(ys, y[keep])
+
+
+def test_minmax_keeps_the_envelope(walk):
+    x, y = walk
+    _, ys = minmax(x, y, 100)
+    assert ys.min() == y.min() and ys.max() == y.max()
+
+
+@pytest.mark.parametrize('method', ['lttb', 'minmax'])
+def test_datetime_x_stays_datetime(method):
+    rng = np.random.default_rng(1)
+    t = pd.date_range('2020-01-01', periods=5000, freq='min').to_numpy()
+    y = rng.normal(0, 1, 5000).cumsum()
+    xs, ys = downsample(t, y, 400, method)
+    assert xs.dtype == t.dtype and len(xs) <= 400
+    # same points as on the numbers (minutes since the start)
+    minutes = np.arange(5000, dtype='float64')
+    xn, yn = downsample(minutes, y, 400, method)
+    np.testing.assert_array_equal(xs, t[xn.astype(np.int64)])
+    np.testing.assert_array_equal(ys, yn)
+
+
+def test_downsample_frame_keeps_dtypes():
+    rng = np.random.default_rng(2)
+    df = pd.DataFrame({'t': pd.date_range('2020-01-01', periods=5000, freq='min', tz='Europe/Paris'),
+                       'v': rng.normal(0, 1, 5000).astype('float32'), 'other': 1})
+    out = downsample_frame(df, 't', 'v', n_out=300)
+    assert list(out.columns) == ['t', 'v'] and len(out) == 300
+    assert out['t'].dtype == df['t'].dtype and out['v'].dtype == np.float32
+    assert out['t'].is_monotonic_increasing
+    short = df.head(100)
+    assert downsample_frame(short, 't', 'v', n_out=300) is short
+
+
+def test_short_series_and_bad_method():
+    x, y = np.arange(10), np.arange(10) * 2
+    xs, ys = downsample(x, y, 100)
+    np.testing.assert_array_equal(xs, x)
+    with pytest.raises(ValueError):
+        downsample(x, y, 5, method='mean')
+
+
+def test_rendered_ticks_are_dates(tmp_path):
+    from chart_batch import LineChartTemplate
+
+    t = pd.date_range('2020-01-01', periods=5000, freq='min').to_numpy()
+    chart = LineChartTemplate(marker='')
+    chart.render(t, np.arange(5000.0), str(tmp_path / 'c.png'))
+    assert chart.line.get_xdata().dtype.kind == 'M'
@@ -0,0 +1,87 @@
+# typed arrays, scattergl switch and the html files from write_html / write_html_batch
+# python -m pytest data-handling/data-visualization
+
+import base64
+import json
+import os
+import re
+
+import numpy as np
+import pytest
+
+from plotly_export import line_figure, typed, write_html, write_html_batch
+
+
+@pytest.mark.parametrize('values, dtype', [
+    ([0, 1, 127], 'int8'),
+    ([-129, 0], 'int16'),
+    ([0, 40_000], 'int32'),
+    ([0, 2 ** 40], 'int64'),
+    (np.array([0, 200], dtype='uint64'), 'int16'),
+])
+def test_typed_ints_use_smallest_dtype(values, dtype):
+    arr = typed(values)
+    assert arr.dtype == dtype
+    assert arr.tolist() == list(values)
+
+
+def test_typed_floats():
+    values = np.linspace(0, 1, 7)[::2]  # not contiguous
+    assert typed(values).dtype == 'float64' and typed(values).flags.c_contiguous
+    assert typed(values, float32=True).dtype == 'float32'
+    assert typed(np.array([], dtype='int64')).dtype == 'int64'
+
+
+def test_webgl_threshold():
+    x = np.arange(10)
+    assert line_figure(x, x, webgl_threshold=10).data[0].type == 'scatter'
+    assert line_figure(x, x, webgl_threshold=9).data[0].type == 'scattergl'
+
+
+def test_downsampled_figure():
+    x = np.arange(5000)
+    fig = line_figure(x, np.sin(x / 50), downsample='lttb')
+    assert len(fig.data[0].y) < 5000
+
+
+def _traces(path):
+    with open(path, encoding='utf-8') as f:
+        html = f.read()
+    # Plotly.newPlot("<div id>", [traces], {layout}, ...)
+    data = re.search(r'Plotly\.newPlot\(\s*"[^"]+",\s*(\[.*?\]),\s*\{', html, re.S).group(1)
+    return json.loads(data)
+
+
+@pytest.mark.parametrize('float32, dtype', [(False, 'f8'), (True, 'f4')])
+def test_values_are_written_as_bdata(tmp_path, float32, dtype):
+    x = np.arange(2000)
+    y = np.random.default_rng(0).normal(0, 1, 2000)
+    path = write_html(line_figure(x, y, float32=float32), str(tmp_path / 'chart.html'))
+    trace = _traces(path)[0]
+    assert trace['type'] == 'scattergl'
+    assert trace['x']['dtype'] == 'i2'
+    assert trace['y']['dtype'] == dtype
+    decoded = np.frombuffer(base64.b64decode(trace['y']['bdata']), dtype=dtype)
+    np.testing.assert_array_equal(decoded, y.astype(dtype))
+
+
+def test_directory_bundle_shares_one_plotly_js(tmp_path):
+    x = np.arange(20)
+    figures = ((f'chart-{i}', line_figure(x, x * i)) for i in range(3))
+    paths = list(write_html_batch(figures, str(tmp_path)))
+    assert paths == [str(tmp_path / f'chart-{i}.html') for i in range(3)]
+    assert sorted(os.listdir(tmp_path)) == ['chart-0.html', 'chart-1.html', 'chart-2.html', 'plotly.min.js']
+    for path in paths:
+        with open(path, encoding='utf-8') as f:
+            html = f.read()
+        assert re.search(r'<script[^>]* src="plotly.min.js"', html)
+        assert os.path.getsize(path) < 100_000  # plotly.js itself is not inlined
+
+
+def test_inline_bundle_and_bad_bundle(tmp_path):
+    fig = line_figure(np.arange(5), np.arange(5))
+    path = write_html(fig, str(tmp_path / 'inline.html'), bundle='inline')
+    assert os.listdir(tmp_path) == ['inline.html']
+    assert os.path.getsize(path) > 1_000_000
+    with pytest.raises(ValueError, match='bundle must be one of'):
+        write_html(fig, str(tmp_path / 'x.html'), bundle='local')
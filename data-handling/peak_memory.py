@@ -0,0 +1,39 @@
+# memory of the current process for the benchmarks, stdlib only so importing it doesn't add to
+# what it measures
+#   peak_rss()     peak, for the benchmarks that run each case in a spawned child
+#                  (columnar_store.py, data-manipulation/lazy_clean.py)
+#   current_rss()  resident now, to follow growth inside one process (data-visualization/chart_batch.py)
+#
+#   import sys; sys.path.append('./data-handling'); from peak_memory import peak_rss
+
+import sys
+
+
+def _proc_status(field):
+    # bytes of a VmXXX line of /proc/self/status, None without /proc (macOS)
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith(field + ':'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return None
+
+
+def peak_rss():
+    # bytes; VmHWM is reset by exec, ru_maxrss is not (a spawned child would report the parent's peak)
+    peak = _proc_status('VmHWM')
+    if peak is not None:
+        return peak
+    import resource
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024  # bytes on macOS, KiB elsewhere
+
+
+def current_rss():
+    # bytes; without /proc the peak so far is the closest stdlib gets (it only grows, so a leak
+    # still shows)
+    rss = _proc_status('VmRSS')
+    return rss if rss is not None else peak_rss()
@@ -0,0 +1,232 @@
+# many independent OLS regressions in one vectorized pass
+# linear_regression_using_statsmodels (main.py) fits one sm.OLS + summary() per call, with tens of
+# thousands of small per-segment models the python overhead per fit is most of the time.
+# here the design matrices are stacked into one (models, rows, params) array and solved with a
+# batched QR (numpy loops over the stack in C):
+#
+#   res = batch_ols(X, Y)              X: (models, n, p) or one shared (n, p), Y: (models, n)
+#   res.params / res.bse / res.tvalues / res.pvalues   -> (models, p) arrays, same names as statsmodels
+#
+#   batch_ols_by(df, 'Country', y='Salary', x=['Age'])  -> one regression per group, tidy DataFrame
+#
+# groups of different sizes are padded with zero rows: a zero row adds nothing to X'X or X'y, so
+# the fit is exact, only nobs / df_resid use the real row counts.
+# models whose design is rank deficient fall back to the pseudo-inverse (what sm.OLS does).
+# pipenv install numpy pandas scipy statsmodels
+
+import time
+
+import numpy as np
+import pandas as pd
+from scipy import stats
+
+
+class BatchOLSResult:
+
+    def __init__(self, params, bse, df_resid, ssr, rsquared, nobs, names=None):
+        self.params = params
+        self.bse = bse
+        self.df_resid = df_resid
+        self.nobs = nobs
+        self.ssr = ssr
+        self.rsquared = rsquared
+        self.names = names or [f'x{i}' for i in range(params.shape[1])]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            self.tvalues = params / bse
+        self.pvalues = 2 * stats.t.sf(np.abs(self.tvalues), df_resid[:, None])
+
+    def __len__(self):
+        return len(self.params)
+
+    def to_frame(self, index=None):
+        # long format, one row per (model, term), columns as in statsmodels' summary2()
+        index = pd.RangeIndex(len(self), name='model') if index is None else index
+        m, p = self.params.shape
+        model_index = index.repeat(p) if isinstance(index, pd.MultiIndex) else np.repeat(index, p)
+        frame = pd.DataFrame({
+            'term': np.tile(self.names, m),
+            'Coef.': self.params.ravel(),
+            'Std.Err.': self.bse.ravel(),
+            't': self.tvalues.ravel(),
+            'P>|t|': self.pvalues.ravel(),
+            'nobs': np.repeat(self.nobs, p),
+            'R-squared': np.repeat(self.rsquared, p),
+        }, index=pd.Index(model_index) if not isinstance(index, pd.MultiIndex) else model_index)
+        frame.index.names = index.names
+        return frame.set_index('term', append=True)
+
+
+def _with_constant(X, nobs=None):
+    ones = np.ones(X.shape[:-1] + (1,))
+    if nobs is not None:  # padded rows must stay all-zero
+        ones[np.arange(X.shape[-2]) >= nobs[:, None]] = 0
+    return np.concatenate([ones, X], axis=-1)
+
+
+def _solve_shared(X, Y):
+    # one design for every model: a single pseudo-inverse, then a matrix product for all of Y
+    pinv = np.linalg.pinv(X)
+    params = Y @ pinv.T
+    cov_unscaled = np.broadcast_to(pinv @ pinv.T, (len(Y),) + (X.shape[1],) * 2)
+    return params, cov_unscaled, np.full(len(Y), np.linalg.matrix_rank(X))
+
+
+def _solve_stacked(X, Y):
+    m, n, p = X.shape
+    params = np.empty((m, p))
+    cov_unscaled = np.empty((m, p, p))
+    rank = np.full(m, p)
+
+    if n < p:
+        # fewer (padded) rows than parameters: R isn't square, every model needs the pseudo-inverse
+        ok = np.zeros(m, dtype=bool)
+    else:
+        Q, R = np.linalg.qr(X)
+        diag = np.abs(np.diagonal(R, axis1=1, axis2=2))
+        tol = diag.max(axis=1, keepdims=True) * max(n, p) * np.finfo(float).eps
+        ok = (diag > tol).all(axis=1)
+    if ok.any():
+        R_inv = np.linalg.inv(R[ok])
+        params[ok] = np.einsum('mij,mj->mi', R_inv, np.einsum('mnp,mn->mp', Q[ok], Y[ok]))
+        cov_unscaled[ok] = R_inv @ R_inv.transpose(0, 2, 1)
+    if not ok.all():
+        bad = ~ok
+        pinv = np.linalg.pinv(X[bad])
+        params[bad] = np.einsum('mpn,mn->mp', pinv, Y[bad])
+        cov_unscaled[bad] = pinv @ pinv.transpose(0, 2, 1)
+        rank[bad] = np.linalg.matrix_rank(X[bad])
+    return params, cov_unscaled, rank
+
+
+def _fit(X, Y, nobs, has_constant):
+    # X (m, n, p) zero padded or (n, p) shared, Y (m, n), nobs (m,)
+    params, cov_unscaled, rank = _solve_shared(X, Y) if X.ndim == 2 else _solve_stacked(X, Y)
+    fitted = params @ X.T if X.ndim == 2 else np.einsum('mnp,mp->mn', X, params)
+    resid = Y - fitted  # padded rows: 0 - 0
+    ssr = np.einsum('mn,mn->m', resid, resid)
+    df_resid = (nobs - rank).astype(float)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        sigma2 = np.where(df_resid > 0, ssr / df_resid, np.nan)
+        bse = np.sqrt(sigma2[:, None] * np.diagonal(cov_unscaled, axis1=1, axis2=2))
+        y_sum = Y.sum(axis=1)
+        tss = np.einsum('mn,mn->m', Y, Y)
+        if has_constant:
+            tss = tss - y_sum * y_sum / nobs
+        rsquared = 1 - ssr / tss
+    return params, bse, df_resid, ssr, rsquared
+
+
+def batch_ols(X, Y, add_constant=True, names=None):
+    # X: (models, n, p) one design per model, or (n, p) / (n,) shared by all models
+    # Y: (models, n)
+    Y = np.atleast_2d(np.asarray(Y, dtype='float64'))
+    X = np.asarray(X, dtype='float64')
+    if X.ndim == 1:
+        X = X[:, None]
+    if X.ndim == 2 and X.shape[0] != Y.shape[1]:
+        raise ValueError(f"X has {X.shape[0]} rows but Y has {Y.shape[1]} columns")
+    if X.ndim == 3 and X.shape[:2] != Y.shape:
+        raise ValueError(f"X {X.shape} and Y {Y.shape} don't line up as (models, n, p) / (models, n)")
+    if add_constant:
+        X = _with_constant(X)
+        names = ['const'] + list(names) if names is not None else None
+    nobs = np.full(Y.shape[0], Y.shape[1])
+    return BatchOLSResult(*_fit(X, Y, nobs, add_constant), nobs=nobs, names=names)
+
+
+def _design(df, x, add_constant):
+    X = df[x].to_numpy(dtype='float64')
+    if add_constant:
+        X = np.column_stack([np.ones(len(X)), X])
+    return X
+
+
+def batch_ols_by(df, by, y, x, add_constant=True, batch_size=4096, dropna=True):
+    # one regression of y on x per group of `by`, returns the tidy frame of BatchOLSResult.to_frame()
+    # indexed by (group keys..., term)
+    x = [x] if isinstance(x, str) else list(x)
+    by = [by] if isinstance(by, str) else list(by)
+    if dropna:
+        df = df.dropna(subset=[y] + x)
+    groups = df.groupby(by, sort=True, observed=True)
+    codes = groups.ngroup().to_numpy()
+    keys = groups.size().index
+    counts = np.bincount(codes, minlength=len(keys))
+
+    # order groups by size so each batch pads to a similar length, and sort rows the same way
+    # so a batch of groups is a contiguous block of rows
+    by_size = np.argsort(counts, kind='stable')
+    rank_of = np.empty_like(by_size)
+    rank_of[by_size] = np.arange(len(by_size))
+    order = np.argsort(rank_of[codes], kind='stable')
+    X_all = _design(df, x, add_constant)[order]
+    Y_all = df[y].to_numpy(dtype='float64')[order]
+    sizes = counts[by_size]
+    starts = np.concatenate([[0], np.cumsum(sizes)])
+
+    parts = []
+    for a in range(0, len(keys), batch_size):
+        b = min(a + batch_size, len(keys))
+        nobs = sizes[a:b]
+        m, n = b - a, nobs.max()
+        rows = slice(starts[a], starts[b])
+        local = np.repeat(np.arange(m), nobs)
+        pos = np.arange(starts[a], starts[b]) - np.repeat(starts[a:b], nobs)
+        X = np.zeros((m, n, X_all.shape[1]))
+        Y = np.zeros((m, n))
+        X[local, pos] = X_all[rows]
+        Y[local, pos] = Y_all[rows]
+        parts.append(_fit(X, Y, nobs, add_constant))
+
+    params, bse, df_resid, ssr, rsquared = (np.concatenate(arrays) for arrays in zip(*parts))
+    names = (['const'] if add_constant else []) + x
+    result = BatchOLSResult(params, bse, df_resid, ssr, rsquared, sizes, names)
+    frame = result.to_frame(keys[by_size])
+    return frame.sort_index(level=list(range(len(by))), sort_remaining=False)
+
+
+####### benchmark #######
+
+def _statsmodels_loop(X, Y):
+    import statsmodels.api as sm
+
+    params, bse, pvalues = [], [], []
+    for i in range(len(Y)):
+        model = sm.OLS(Y[i], sm.add_constant(X[i])).fit()
+        params.append(model.params)
+        bse.append(model.bse)
+        pvalues.append(model.pvalues)
+    return np.array(params), np.array(bse), np.array(pvalues)
+
+
+def benchmark_batch_ols(n_models=20_000, n_rows=50, n_features=3, loop_models=2_000, seed=0):
+    rng = np.random.default_rng(seed)
+    X = rng.random((n_models, n_rows, n_features))
+    beta = rng.normal(0, 2, (n_models, n_features))
+    Y = np.einsum('mnp,mp->mn', X, beta) + 1 + rng.normal(0, 0.1, (n_models, n_rows))
+
+    start = time.perf_counter()
+    params, bse, pvalues = _statsmodels_loop(X[:loop_models], Y[:loop_models])
+    took = time.perf_counter() - start
+    print(f"sm.OLS loop:   {loop_models / took:12.0f} models/sec  (on {loop_models:,} models)")
+
+    start = time.perf_counter()
+    res = batch_ols(X, Y)
+    took = time.perf_counter() - start
+    print(f"batch_ols:     {n_models / took:12.0f} models/sec  (on {n_models:,} models)")
+    for name, ref in (('params', params), ('bse', bse), ('pvalues', pvalues)):
+        diff = np.abs(getattr(res, name)[:loop_models] - ref).max()
+        print(f"  max |batch - statsmodels| {name:8} {diff:.2e}")
+
+    # same data as a long frame, one segment per model
+    df = pd.DataFrame(X.reshape(-1, n_features), columns=[f'x{i}' for i in range(n_features)])
+    df['y'] = Y.ravel()
+    df['segment'] = np.repeat(np.arange(n_models), n_rows)
+    df = df.sample(frac=1, random_state=seed)  # segments interleaved, and drop a few rows so sizes differ
+    df = df.iloc[:int(len(df) * 0.95)]
+    start = time.perf_counter()
+    frame = batch_ols_by(df, 'segment', 'y', list(df.columns[:n_features]))
+    took = time.perf_counter() - start
+    print(f"batch_ols_by:  {n_models / took:12.0f} models/sec  ({len(frame):,} rows out)")
+
+# benchmark_batch_ols()
@@ -0,0 +1,302 @@
+# OLS that is updated with new data instead of refit on all of it
+# linear_regression_using_statsmodels (main.py) refits sm.OLS on the whole x, y every time. the
+# estimate only depends on a few sums though (sufficient statistics):
+#   n, the means of x and y, and the centered co-moments sum((x - mean_x)(x - mean_x)'),
+#   sum((x - mean_x)(y - mean_y)), sum((y - mean_y)**2)
+# so each chunk is folded into those once and thrown away (Chan's pairwise update, the same as
+# OnlineStats in data-manipulation/online_stats.py, just with a matrix for the x part):
+#   model.partial_fit(X, y)      add a chunk
+#   model.remove(X, y)           take a chunk back out (the update run backwards)
+#   a.merge(b)                   combine estimators fitted on different shards / processes
+#   SlidingWindowOLS(window=24)  only the last `window` chunks count, older chunks drop out
+# params / bse / tvalues / pvalues / rsquared match sm.OLS up to floating point, also for regressors
+# with a large offset (unix timestamps, y around 1e6): the raw X'X of those is so badly conditioned
+# that solving it directly loses every digit, the centered co-moments don't have that problem.
+# rank deficient systems are solved with the pseudo-inverse like sm.OLS does.
+# pipenv install numpy scipy statsmodels
+
+import time
+from collections import deque
+
+import numpy as np
+from scipy import stats
+
+
+class IncrementalOLS:
+
+    def __init__(self, add_constant=True):
+        self.add_constant = add_constant
+        self.n = 0
+        self.mean_x = None
+        self.mean_y = 0.0
+        self.cxx = None  # sum of (x - mean_x)(x - mean_x)'
+        self.cxy = None  # sum of (x - mean_x)(y - mean_y)
+        self.cyy = 0.0  # sum of (y - mean_y)**2
+
+    def _regressors(self, X):
+        X = np.asarray(X, dtype='float64')
+        return X[:, None] if X.ndim == 1 else X
+
+    def _design(self, X):
+        X = self._regressors(X)
+        return np.column_stack([np.ones(len(X)), X]) if self.add_constant else X
+
+    def _chunk(self, X, y):
+        # the statistics of one chunk, centered on the chunk's own means
+        X = self._regressors(X)
+        y = np.asarray(y, dtype='float64').ravel()
+        if len(X) != len(y):
+            raise ValueError(f"X has {len(X)} rows but y has {len(y)}")
+        if self.cxx is not None and X.shape[1] != len(self.mean_x):
+            raise ValueError(f"expected {len(self.mean_x)} regressors, got {X.shape[1]}")
+        chunk = IncrementalOLS(self.add_constant)
+        if len(y):
+            chunk.n = len(y)
+            chunk.mean_x, chunk.mean_y = X.mean(axis=0), y.mean()
+            Xc, yc = X - chunk.mean_x, y - chunk.mean_y
+            chunk.cxx, chunk.cxy, chunk.cyy = Xc.T @ Xc, Xc.T @ yc, yc @ yc
+        return chunk
+
+    def partial_fit(self, X, y):
+        return self.merge(self._chunk(X, y))
+
+    def remove(self, X, y):
+        # X, y must be rows that were added before
+        return self.subtract(self._chunk(X, y))
+
+    def merge(self, other):
+        if not other.n:
+            return self
+        if not self.n:
+            self.n, self.mean_x, self.mean_y = other.n, other.mean_x.copy(), other.mean_y
+            self.cxx, self.cxy, self.cyy = other.cxx.copy(), other.cxy.copy(), other.cyy
+            return self
+        n = self.n + other.n
+        dx, dy = other.mean_x - self.mean_x, other.mean_y - self.mean_y
+        weight = self.n * other.n / n
+        self.cxx = self.cxx + other.cxx + weight * np.outer(dx, dx)
+        self.cxy = self.cxy + other.cxy + weight * dx * dy
+        self.cyy = self.cyy + other.cyy + weight * dy * dy
+        self.mean_x = self.mean_x + dx * (other.n / n)
+        self.mean_y = self.mean_y + dy * (other.n / n)
+        self.n = n
+        return self
+
+    def subtract(self, other):
+        # inverse of merge: self was merged with other, take other back out
+        if not other.n:
+            return self
+        n = self.n - other.n
+        if n < 0:
+            raise ValueError(f"can't remove {other.n} rows from {self.n}")
+        if n == 0:
+            self.__init__(self.add_constant)
+            return self
+        mean_x = (self.n * self.mean_x - other.n * other.mean_x) / n
+        mean_y = (self.n * self.mean_y - other.n * other.mean_y) / n
+        dx, dy = other.mean_x - mean_x, other.mean_y - mean_y
+        weight = n * other.n / self.n
+        self.cxx = self.cxx - other.cxx - weight * np.outer(dx, dx)
+        self.cxy = self.cxy - other.cxy - weight * dx * dy
+        self.cyy = max(self.cyy - other.cyy - weight * dy * dy, 0.0)
+        self.n, self.mean_x, self.mean_y = n, mean_x, mean_y
+        return self
+
+    ####### estimates, computed from the sums on access #######
+
+    def _normal_equations(self):
+        # (A, b, tss): params solve A @ params = b, tss = total sum of squares for r squared
+        if self.cxx is None:
+            raise ValueError("no data, call partial_fit first")
+        if self.add_constant:
+            return self.cxx, self.cxy, self.cyy  # slopes only, the intercept follows from the means
+        # no constant: the raw cross products, rebuilt from the centered ones
+        return (self.cxx + self.n * np.outer(self.mean_x, self.mean_x),
+                self.cxy + self.n * self.mean_x * self.mean_y,
+                self.cyy + self.n * self.mean_y ** 2)
+
+    def _solve(self):
+        A, b, tss = self._normal_equations()
+        # scale to unit diagonal first so regressors of very different size don't drive the
+        # pseudo-inverse cutoff, then scale back
+        scale = np.sqrt(np.diag(A))
+        scale[scale == 0] = 1.0
+        scaled = A / np.outer(scale, scale)
+        eigenvalues, eigenvectors = np.linalg.eigh(scaled)
+        keep = eigenvalues > eigenvalues.max(initial=0) * len(A) * np.finfo(float).eps
+        inverse = (eigenvectors[:, keep] / eigenvalues[keep]) @ eigenvectors[:, keep].T / np.outer(scale, scale)
+        slopes = inverse @ b
+        ssr = max(tss - slopes @ b, 0.0)
+        null = eigenvectors[:, ~keep] / scale[:, None]  # directions the data doesn't determine
+        if self.add_constant:
+            # intercept = mean_y - mean_x @ slopes, and its (co)variance from the same inverse
+            inverse_mean = inverse @ self.mean_x
+            cov_unscaled = np.empty((len(slopes) + 1,) * 2)
+            cov_unscaled[0, 0] = 1 / self.n + self.mean_x @ inverse_mean
+            cov_unscaled[0, 1:] = cov_unscaled[1:, 0] = -inverse_mean
+            cov_unscaled[1:, 1:] = inverse
+            params = np.concatenate([[self.mean_y - self.mean_x @ slopes], slopes])
+            null = np.vstack([-self.mean_x @ null, null])
+        else:
+            params, cov_unscaled = slopes, inverse
+        if null.shape[1]:
+            # rank deficient: any solution fits equally well, pick the minimum norm one (and its
+            # covariance) like sm.OLS's pinv does by projecting the undetermined directions out
+            q = np.linalg.qr(null)[0]
+            project = np.eye(len(params)) - q @ q.T
+            params, cov_unscaled = project @ params, project @ cov_unscaled @ project
+        return params, cov_unscaled, len(params) - null.shape[1], ssr, tss
+
+    @property
+    def params(self):
+        return self._solve()[0]
+
+    def summary_arrays(self):
+        # everything at once, so the system is only solved once
+        params, cov_unscaled, rank, ssr, tss = self._solve()
+        df_resid = self.n - rank
+        sigma2 = ssr / df_resid if df_resid > 0 else np.nan
+        bse = np.sqrt(sigma2 * np.diag(cov_unscaled))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            tvalues = params / bse
+        return {
+            'params': params,
+            'bse': bse,
+            'tvalues': tvalues,
+            'pvalues': 2 * stats.t.sf(np.abs(tvalues), df_resid),
+            'df_resid': df_resid,
+            'ssr': ssr,
+            'rsquared': 1 - ssr / tss if tss > 0 else np.nan,
+            'nobs': self.n,
+        }
+
+    @property
+    def bse(self):
+        return self.summary_arrays()['bse']
+
+    @property
+    def pvalues(self):
+        return self.summary_arrays()['pvalues']
+
+    @property
+    def rsquared(self):
+        return self.summary_arrays()['rsquared']
+
+    def predict(self, X):
+        return self._design(X) @ self.params
+
+
+class SlidingWindowOLS:
+    # regression over the last `window` chunks, each chunk's statistics are kept so it can be
+    # subtracted when it falls out. every `refresh_every` evictions the totals are rebuilt from the
+    # kept chunks so rounding from repeated add/subtract doesn't pile up.
+    # rows can't be removed by hand here, they leave the window by themselves
+
+    def __init__(self, window, add_constant=True, refresh_every=1000):
+        self.window = window
+        self.add_constant = add_constant
+        self.refresh_every = refresh_every
+        self.chunks = deque()
+        self.total = IncrementalOLS(add_constant)
+        self._evictions = 0
+
+    def partial_fit(self, X, y):
+        chunk = self.total._chunk(X, y)
+        self.chunks.append(chunk)
+        self.total.merge(chunk)
+        while len(self.chunks) > self.window:
+            self.total.subtract(self.chunks.popleft())
+            self._evictions += 1
+        if self._evictions >= self.refresh_every:
+            self._rebuild()
+        return self
+
+    def _rebuild(self):
+        self.total = IncrementalOLS(self.add_constant)
+        for chunk in self.chunks:
+            self.total.merge(chunk)
+        self._evictions = 0
+
+    @property
+    def n(self):
+        return self.total.n
+
+    def summary_arrays(self):
+        return self.total.summary_arrays()
+
+    @property
+    def params(self):
+        return self.total.params
+
+    @property
+    def bse(self):
+        return self.total.bse
+
+    @property
+    def pvalues(self):
+        return self.total.pvalues
+
+    @property
+    def rsquared(self):
+        return self.total.rsquared
+
+    def predict(self, X):
+        return self.total.predict(X)
+
+
+####### check / benchmark #######
+
+def _reference(X, y):
+    import statsmodels.api as sm
+
+    return sm.OLS(y, sm.add_constant(X)).fit()
+
+
+def benchmark_incremental_ols(n_chunks=200, chunk_rows=10_000, n_features=5, window=50, seed=0):
+    rng = np.random.default_rng(seed)
+    beta = rng.normal(0, 1, n_features)
+    chunks = []
+    for _ in range(n_chunks):
+        X = rng.normal(0, 1, (chunk_rows, n_features))
+        chunks.append((X, X @ beta + 3 + rng.normal(0, 0.5, chunk_rows)))
+
+    # refit on everything seen so far, after every chunk (what main.py would have to do)
+    start = time.perf_counter()
+    for i in range(1, n_chunks + 1, max(n_chunks // 20, 1)):
+        _reference(np.concatenate([c[0] for c in chunks[:i]]), np.concatenate([c[1] for c in chunks[:i]]))
+    refit_took = (time.perf_counter() - start) / len(range(1, n_chunks + 1, max(n_chunks // 20, 1))) * n_chunks
+
+    start = time.perf_counter()
+    model = IncrementalOLS()
+    for X, y in chunks:
+        model.partial_fit(X, y)
+        model.summary_arrays()
+    incremental_took = time.perf_counter() - start
+    print(f"refit after every chunk (extrapolated): {refit_took:8.2f}s")
+    print(f"partial_fit + estimates every chunk:    {incremental_took:8.2f}s")
+
+    def compare(label, ours, X, y):
+        ref = _reference(X, y)
+        arrays = ours.summary_arrays()
+        diffs = {name: np.max(np.abs(arrays[name] - np.asarray(getattr(ref, name)))) for name in ('params', 'bse', 'pvalues')}
+        print(f"  {label:22} " + "  ".join(f"{name} {d:.1e}" for name, d in diffs.items()))
+
+    X_all, y_all = np.concatenate([c[0] for c in chunks]), np.concatenate([c[1] for c in chunks])
+    compare('all chunks', model, X_all, y_all)
+
+    # two shards fitted separately, then merged
+    half = n_chunks // 2
+    a, b = IncrementalOLS(), IncrementalOLS()
+    for X, y in chunks[:half]:
+        a.partial_fit(X, y)
+    for X, y in chunks[half:]:
+        b.partial_fit(X, y)
+    compare('merged shards', a.merge(b), X_all, y_all)
+
+    sliding = SlidingWindowOLS(window, refresh_every=window)
+    for X, y in chunks:
+        sliding.partial_fit(X, y)
+    last = chunks[-window:]
+    compare(f'last {window} chunks', sliding, np.concatenate([c[0] for c in last]), np.concatenate([c[1] for c in last]))
+
+# benchmark_incremental_ols()
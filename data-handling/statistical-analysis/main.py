@@ -19,6 +19,25 @@ def linear_regression_using_statsmodels(x, y):
     return model.summary()
 
 
+def linear_regressions_by_segment(df, by, y, x):
+    # one regression per segment in a single batched pass (see batch_ols.py),
+    # coefficients / std errors / p-values match sm.OLS per segment
+    from batch_ols import batch_ols_by
+
+    return batch_ols_by(df, by, y, x)
+
+
+def linear_regression_streaming(chunks, model=None):
+    # chunks: iterable of (x, y) as they arrive, pass the returned model back in to keep updating it
+    # instead of refitting on everything (see incremental_ols.py)
+    from incremental_ols import IncrementalOLS
+
+    model = model or IncrementalOLS()
+    for x_chunk, y_chunk in chunks:
+        model.partial_fit(x_chunk, y_chunk)
+    return model
+
+
 # sample data for regression
 x = np.random.rand(100)
 y = 2 * x + np.random.normal(0, 0.1, 100)
@@ -38,13 +57,27 @@ print(linear_regression_using_statsmodels(x, y))
 # print("Scipy T-test Results:")
 # print(f"t-statistic = {t_stat}, p-value = {p_value}")
 
+def permutation_test_mean_diff(group1, group2, n_resamples=10_000, seed=None):
+    # same question as the t-test without the normality assumption (see resampling.py)
+    from resampling import mean_diff, permutation_test
+
+    result = permutation_test((group1, group2), mean_diff, n_resamples, seed=seed)
+    return result['statistic'], result['pvalue']
+
 def correlation_using_pingouin(data):
     # Pingouin: Correlation
-    data = pd.DataFrame({'x': x, 'y': y})
     correlation = pg.corr(data['x'], data['y'])
     return correlation
 
+
+def correlation_matrix(data, method='pearson', top_k=None):
+    # all column pairs at once instead of one pg.corr per pair (see corr_matrix.py)
+    from corr_matrix import corr_matrix
+
+    return corr_matrix(data, method=method, top_k=top_k)
+
 data = pd.DataFrame({'x': x, 'y': y})
 correlation = correlation_using_pingouin(data)
 print("Pingouin Correlation Results:")
-print(f"r = {correlation['r'].values[0]}, p-val = {correlation['p-val'].values[0]}")
+pval = correlation['p-val'] if 'p-val' in correlation else correlation['p_val']  # renamed in newer pingouin
+print(f"r = {correlation['r'].values[0]}, p-val = {pval.values[0]}")
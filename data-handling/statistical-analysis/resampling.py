@@ -0,0 +1,184 @@
+# bootstrap confidence intervals and permutation tests, vectorized and spread over processes
+# a python loop that resamples, recomputes and appends once per iteration spends most of its time in
+# the interpreter. here a whole chunk of resamples is one index matrix (chunk, n): the data is
+# gathered with it in one go and the statistic is computed along the last axis for all rows at once.
+# chunks run in a process pool, each chunk gets its own RNG stream from SeedSequence(seed).spawn(),
+# so the result for a given seed is the same whatever the number of workers.
+#
+#   bootstrap((x,), mean)                                  CI for the mean of x
+#   bootstrap((x, y), pearson_r, paired=True)              CI for a correlation (rows resampled together)
+#   permutation_test((a, b), mean_diff)                    two independent groups, labels shuffled
+#   permutation_test((x, y), pearson_r, kind='pairings')   association test, y shuffled against x
+#
+# a statistic takes the resampled arrays and axis=-1 and returns one value per row (like numpy's
+# reductions, e.g. np.mean works as is). it has to be a module level function to reach the workers.
+# pipenv install numpy
+
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+_samples = None
+_statistic = None
+
+
+####### vectorized statistics #######
+
+def mean(x, axis=-1):
+    return np.mean(x, axis=axis)
+
+
+def median(x, axis=-1):
+    return np.median(x, axis=axis)
+
+
+def mean_diff(a, b, axis=-1):
+    return np.mean(a, axis=axis) - np.mean(b, axis=axis)
+
+
+def pearson_r(x, y, axis=-1):
+    x = x - x.mean(axis=axis, keepdims=True)
+    y = y - y.mean(axis=axis, keepdims=True)
+    return (x * y).sum(axis=axis) / np.sqrt((x * x).sum(axis=axis) * (y * y).sum(axis=axis))
+
+
+def slope(x, y, axis=-1):
+    # OLS slope of y on x (with intercept)
+    x = x - x.mean(axis=axis, keepdims=True)
+    y = y - y.mean(axis=axis, keepdims=True)
+    return (x * y).sum(axis=axis) / (x * x).sum(axis=axis)
+
+
+####### one chunk of resamples #######
+
+def _init(samples, statistic):
+    global _samples, _statistic
+    _samples, _statistic = samples, statistic
+
+
+def _bootstrap_chunk(seed, size, paired):
+    rng = np.random.default_rng(seed)
+    if paired:
+        idx = rng.integers(0, len(_samples[0]), (size, len(_samples[0])))
+        return _statistic(*(s[idx] for s in _samples), axis=-1)
+    return _statistic(*(s[rng.integers(0, len(s), (size, len(s)))] for s in _samples), axis=-1)
+
+
+def _permutation_chunk(seed, size, kind):
+    rng = np.random.default_rng(seed)
+    if kind == 'independent':
+        # shuffle the pooled values in every row, then cut the rows back into the group sizes
+        pooled = np.concatenate(_samples)
+        shuffled = rng.permuted(np.broadcast_to(pooled, (size, len(pooled))), axis=1)
+        cuts = np.cumsum([len(s) for s in _samples])[:-1]
+        return _statistic(*np.split(shuffled, cuts, axis=1), axis=-1)
+    # pairings: keep the first sample fixed, shuffle the others
+    first, *rest = _samples
+    fixed = np.broadcast_to(first, (size, len(first)))
+    return _statistic(fixed, *(rng.permuted(np.broadcast_to(s, (size, len(s))), axis=1) for s in rest), axis=-1)
+
+
+def _run_chunks(func, samples, statistic, n_resamples, chunk_size, workers, seed, extra):
+    sizes = [min(chunk_size, n_resamples - i) for i in range(0, n_resamples, chunk_size)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    if workers == 1:
+        _init(samples, statistic)
+        return np.concatenate([func(s, size, extra) for s, size in zip(seeds, sizes)])
+    # the samples go to each worker once (initializer), the tasks only carry a seed and a size
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count(), initializer=_init,
+                             initargs=(samples, statistic)) as pool:
+        return np.concatenate(list(pool.map(func, seeds, sizes, [extra] * len(sizes))))
+
+
+def _as_samples(data):
+    if isinstance(data, np.ndarray):
+        data = (data,)
+    return tuple(np.asarray(s, dtype='float64') for s in data)
+
+
+####### public #######
+
+def bootstrap(data, statistic, n_resamples=10_000, confidence=0.95, method='percentile', paired=False,
+              chunk_size=1000, workers=None, seed=None):
+    # method 'percentile' or 'basic', returns dict with the estimate, the CI, the standard error
+    # and the bootstrap distribution
+    if method not in ('percentile', 'basic'):
+        raise ValueError(f"method must be 'percentile' or 'basic', got {method!r}")
+    samples = _as_samples(data)
+    if paired and len({len(s) for s in samples}) > 1:
+        raise ValueError("paired=True needs samples of the same length")
+    observed = float(statistic(*samples, axis=-1))
+    dist = _run_chunks(_bootstrap_chunk, samples, statistic, n_resamples, chunk_size, workers, seed, paired)
+    alpha = (1 - confidence) / 2
+    low, high = np.nanquantile(dist, [alpha, 1 - alpha])
+    if method == 'basic':
+        low, high = 2 * observed - high, 2 * observed - low
+    return {'statistic': observed, 'ci': (low, high), 'se': np.nanstd(dist, ddof=1), 'distribution': dist}
+
+
+def permutation_test(data, statistic, n_resamples=10_000, kind='independent', alternative='two-sided',
+                     chunk_size=1000, workers=None, seed=None):
+    # kind 'independent': group labels are exchangeable under H0 (two-sample tests)
+    # kind 'pairings': the pairing of x with y is random under H0 (correlation / slope)
+    if kind not in ('independent', 'pairings'):
+        raise ValueError(f"kind must be 'independent' or 'pairings', got {kind!r}")
+    if alternative not in ('two-sided', 'greater', 'less'):
+        raise ValueError(f"alternative must be 'two-sided', 'greater' or 'less', got {alternative!r}")
+    samples = _as_samples(data)
+    if kind == 'pairings' and len({len(s) for s in samples}) > 1:
+        raise ValueError("kind='pairings' needs samples of the same length")
+    observed = float(statistic(*samples, axis=-1))
+    null = _run_chunks(_permutation_chunk, samples, statistic, n_resamples, chunk_size, workers, seed, kind)
+    # small tolerance so ties with the observed value count as at least as extreme
+    # +1: the observed arrangement is one of the permutations, the p-value is never exactly 0
+    eps = 1e-12 * max(abs(observed), 1)
+    p_greater = (np.count_nonzero(null >= observed - eps) + 1) / (len(null) + 1)
+    p_less = (np.count_nonzero(null <= observed + eps) + 1) / (len(null) + 1)
+    if alternative == 'greater':
+        pvalue = p_greater
+    elif alternative == 'less':
+        pvalue = p_less
+    else:
+        # twice the smaller tail like scipy.stats.permutation_test, the null distribution doesn't
+        # have to be centred on 0 (ratios, medians, ...)
+        pvalue = min(1.0, 2 * min(p_greater, p_less))
+    return {'statistic': observed, 'pvalue': pvalue, 'null_distribution': null}
+
+
+####### benchmark #######
+
+def _loop_bootstrap(x, y, n_resamples, seed):
+    rng = np.random.default_rng(seed)
+    out = []
+    for _ in range(n_resamples):
+        idx = rng.integers(0, len(x), len(x))
+        out.append(np.corrcoef(x[idx], y[idx])[0, 1])
+    return np.array(out)
+
+
+def benchmark_resampling(n=1000, n_resamples=100_000, loop_resamples=5_000, seed=0):
+    rng = np.random.default_rng(seed)
+    x = rng.random(n)
+    y = 2 * x + rng.normal(0, 1, n)
+
+    start = time.perf_counter()
+    _loop_bootstrap(x, y, loop_resamples, seed)
+    took = time.perf_counter() - start
+    print(f"python loop:        {loop_resamples / took:10.0f} resamples/sec")
+
+    workers = 1
+    while workers <= os.cpu_count():
+        start = time.perf_counter()
+        res = bootstrap((x, y), pearson_r, n_resamples, paired=True, workers=workers, seed=seed)
+        took = time.perf_counter() - start
+        print(f"bootstrap {workers:2} procs: {n_resamples / took:10.0f} resamples/sec  "
+              f"r={res['statistic']:.3f} CI=({res['ci'][0]:.3f}, {res['ci'][1]:.3f})")
+        start = time.perf_counter()
+        perm = permutation_test((x, y), pearson_r, n_resamples, kind='pairings', workers=workers, seed=seed)
+        took = time.perf_counter() - start
+        print(f"permutation {workers:2} procs: {n_resamples / took:8.0f} resamples/sec  p={perm['pvalue']:.2e}")
+        workers *= 2
+
+# benchmark_resampling()
@@ -0,0 +1,90 @@
+# batch_ols / batch_ols_by against one sm.OLS fit per model
+# python -m pytest data-handling/statistical-analysis
+
+import warnings
+
+import numpy as np
+import pandas as pd
+import pytest
+import statsmodels.api as sm
+
+from batch_ols import batch_ols, batch_ols_by
+
+
+def _reference(x, y, add_constant=True):
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')  # statsmodels warns about tiny / rank deficient samples
+        return sm.OLS(y, sm.add_constant(x, has_constant='add') if add_constant else x).fit()
+
+
+def _assert_close(ours, ref, rtol=1e-8):
+    np.testing.assert_allclose(ours, ref, rtol=rtol, atol=1e-10, equal_nan=True)
+
+
+@pytest.mark.parametrize('add_constant', [True, False])
+def test_stacked_designs(add_constant):
+    rng = np.random.default_rng(0)
+    X = rng.random((50, 30, 3))
+    Y = np.einsum('mnp,mp->mn', X, rng.normal(0, 2, (50, 3))) + 1 + rng.normal(0, 0.1, (50, 30))
+    res = batch_ols(X, Y, add_constant=add_constant)
+    for i in range(len(Y)):
+        ref = _reference(X[i], Y[i], add_constant)
+        _assert_close(res.params[i], ref.params)
+        _assert_close(res.bse[i], ref.bse)
+        _assert_close(res.pvalues[i], ref.pvalues, rtol=1e-6)
+        _assert_close(res.rsquared[i], ref.rsquared)
+        assert res.df_resid[i] == ref.df_resid
+
+
+def test_shared_design():
+    rng = np.random.default_rng(1)
+    x = rng.random((40, 2))
+    Y = rng.normal(0, 1, (10, 40)) + x @ [1.0, -1.0]
+    res = batch_ols(x, Y)
+    for i in range(len(Y)):
+        ref = _reference(x, Y[i])
+        _assert_close(res.params[i], ref.params)
+        _assert_close(res.bse[i], ref.bse)
+
+
+def test_rank_deficient_model():
+    rng = np.random.default_rng(2)
+    x = rng.random(20)
+    X = np.stack([np.column_stack([x, 2 * x]), rng.random((20, 2))])
+    Y = rng.random((2, 20))
+    res = batch_ols(X, Y)
+    for i in range(2):
+        ref = _reference(X[i], Y[i])
+        _assert_close(res.params[i], ref.params)
+        _assert_close(res.bse[i], ref.bse)
+        assert res.df_resid[i] == ref.df_resid
+
+
+def _segments(sizes, seed=3):
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({'segment': np.repeat(np.arange(len(sizes)), sizes)})
+    df['x'] = rng.random(len(df))
+    df['y'] = 2 * df['x'] + rng.normal(0, 0.1, len(df))
+    return df.sample(frac=1, random_state=seed)
+
+
+def test_by_segment_matches_statsmodels():
+    df = _segments([5, 40, 12, 3, 40, 25])
+    frame = batch_ols_by(df, 'segment', 'y', 'x', batch_size=2)
+    for segment, rows in df.groupby('segment'):
+        ref = _reference(rows['x'].to_numpy(), rows['y'].to_numpy())
+        ours = frame.loc[segment]
+        _assert_close(ours['Coef.'].to_numpy(), ref.params)
+        _assert_close(ours['Std.Err.'].to_numpy(), ref.bse)
+        assert (ours['nobs'] == len(rows)).all()
+
+
+def test_segments_smaller_than_the_model():
+    # one row per segment with const + x: fewer rows than parameters, no error, degenerate results
+    df = _segments([1, 1, 1, 30])
+    frame = batch_ols_by(df, 'segment', 'y', 'x')
+    for segment, rows in df.groupby('segment'):
+        ref = _reference(rows['x'].to_numpy(), rows['y'].to_numpy())
+        _assert_close(frame.loc[segment, 'Coef.'].to_numpy(), ref.params)
+    assert frame.loc[0, 'Std.Err.'].isna().all()
+    assert frame.loc[3, 'Std.Err.'].notna().all()
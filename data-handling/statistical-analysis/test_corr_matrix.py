@@ -0,0 +1,44 @@
+# corr_matrix against pg.corr pair by pair
+# python -m pytest data-handling/statistical-analysis
+
+import numpy as np
+import pandas as pd
+import pingouin as pg
+import pytest
+
+from corr_matrix import corr_matrix
+
+
+def _frame(nan_fraction, n_rows=120, n_cols=12, seed=0):
+    rng = np.random.default_rng(seed)
+    values = rng.normal(0, 1, (n_rows, 3)) @ rng.normal(0, 1, (3, n_cols)) + rng.normal(0, 1, (n_rows, n_cols))
+    values = np.round(values, 1)  # some ties for the ranks
+    values[rng.random(values.shape) < nan_fraction] = np.nan
+    values[:, 0] = np.round(rng.normal(0, 1, n_rows), 1)  # one complete column
+    return pd.DataFrame(values, columns=[f'c{i}' for i in range(n_cols)])
+
+
+@pytest.mark.parametrize('method', ['pearson', 'spearman'])
+@pytest.mark.parametrize('nan_fraction', [0.0, 0.05, 0.3])
+def test_matches_pingouin(method, nan_fraction):
+    df = _frame(nan_fraction)
+    r, p, n = corr_matrix(df, method=method, block_size=5)
+    for i in range(df.shape[1]):
+        for j in range(i + 1, df.shape[1]):
+            ref = pg.corr(df.iloc[:, i], df.iloc[:, j], method=method)
+            pval = ref['p-val'] if 'p-val' in ref else ref['p_val']
+            assert r.iat[i, j] == pytest.approx(ref['r'].iloc[0], abs=1e-12)
+            assert r.iat[j, i] == r.iat[i, j]
+            assert p.iat[i, j] == pytest.approx(pval.iloc[0], rel=1e-8, abs=1e-14)
+            assert n.iat[i, j] == ref['n'].iloc[0]
+
+
+@pytest.mark.parametrize('method', ['pearson', 'spearman'])
+def test_top_k_matches_matrix(method):
+    df = _frame(0.1)
+    r, _, _ = corr_matrix(df, method=method)
+    top = corr_matrix(df, method=method, top_k=5, block_size=4)
+    for row in top.itertuples():
+        assert row.r == pytest.approx(r.loc[row.x, row.y], abs=1e-12)
+    upper = np.abs(r.to_numpy()[np.triu_indices(df.shape[1], 1)])
+    np.testing.assert_allclose(np.sort(np.abs(top['r']))[::-1], np.sort(upper)[::-1][:5], atol=1e-12)
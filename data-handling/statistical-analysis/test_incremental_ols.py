@@ -0,0 +1,108 @@
+# IncrementalOLS / SlidingWindowOLS against sm.OLS on the same rows
+# python -m pytest data-handling/statistical-analysis
+
+import numpy as np
+import pytest
+import statsmodels.api as sm
+
+from incremental_ols import IncrementalOLS, SlidingWindowOLS
+
+
+def _chunks(X, y, size):
+    return [(X[i:i + size], y[i:i + size]) for i in range(0, len(y), size)]
+
+
+def _assert_matches(model, X, y, add_constant=True, rtol=1e-7):
+    ref = sm.OLS(y, sm.add_constant(X) if add_constant else X).fit()
+    arrays = model.summary_arrays()
+    np.testing.assert_allclose(arrays['params'], ref.params, rtol=rtol, atol=1e-12)
+    np.testing.assert_allclose(arrays['bse'], ref.bse, rtol=rtol)
+    np.testing.assert_allclose(arrays['pvalues'], ref.pvalues, rtol=1e-5, atol=1e-12)
+    np.testing.assert_allclose(arrays['rsquared'], ref.rsquared, rtol=rtol)
+    assert arrays['df_resid'] == ref.df_resid
+
+
+def _fit(chunks, model=None):
+    model = model or IncrementalOLS()
+    for X, y in chunks:
+        model.partial_fit(X, y)
+    return model
+
+
+def test_matches_statsmodels():
+    rng = np.random.default_rng(0)
+    X = rng.normal(0, 1, (5000, 3))
+    y = X @ [1.5, -2.0, 0.3] + 4 + rng.normal(0, 1, 5000)
+    _assert_matches(_fit(_chunks(X, y, 700)), X, y)
+
+
+def test_large_offsets():
+    # unix timestamps as regressor, y around 1e6: raw X'X is hopeless here, and sm.OLS on the raw
+    # timestamps loses digits too, so the reference is sm.OLS on the same data shifted by an exact
+    # offset, with the intercept (and its variance) shifted back
+    rng = np.random.default_rng(1)
+    t = 1.7e9 + np.sort(rng.uniform(0, 86_400 * 30, 2000))
+    X = np.column_stack([t, rng.normal(0, 1, 2000)])
+    y = 1e6 + 2e-5 * (t - 1.7e9) + 3 * X[:, 1] + rng.normal(0, 1, 2000)
+    arrays = _fit(_chunks(X, y, 300)).summary_arrays()
+
+    offset = np.array([1.7e9, 0.0])
+    ref = sm.OLS(y, sm.add_constant(X - offset)).fit()
+    back = np.concatenate([[1.0], -offset])  # raw intercept = shifted intercept - offset @ slopes
+    np.testing.assert_allclose(arrays['params'][1:], ref.params[1:], rtol=1e-8)
+    np.testing.assert_allclose(arrays['params'][0], back @ ref.params, rtol=1e-8)
+    np.testing.assert_allclose(arrays['bse'][1:], ref.bse[1:], rtol=1e-8)
+    np.testing.assert_allclose(arrays['bse'][0], np.sqrt(back @ ref.cov_params() @ back), rtol=1e-6)
+    np.testing.assert_allclose(arrays['ssr'], ref.ssr, rtol=1e-8)
+    np.testing.assert_allclose(arrays['rsquared'], ref.rsquared, rtol=1e-8)
+
+
+def test_large_y_offset():
+    rng = np.random.default_rng(6)
+    X = rng.normal(0, 1, (3000, 2))
+    y = 1e6 + X @ [0.5, -0.2] + rng.normal(0, 1, 3000)
+    _assert_matches(_fit(_chunks(X, y, 400)), X, y)
+
+
+def test_without_constant():
+    rng = np.random.default_rng(2)
+    X = rng.normal(5, 1, (1000, 2))
+    y = X @ [2.0, -1.0] + rng.normal(0, 1, 1000)
+    _assert_matches(_fit(_chunks(X, y, 128), IncrementalOLS(add_constant=False)), X, y, add_constant=False)
+
+
+def test_merge_and_remove():
+    rng = np.random.default_rng(3)
+    X = rng.normal(100, 10, (3000, 2))
+    y = X @ [0.5, 0.25] + rng.normal(0, 1, 3000)
+    chunks = _chunks(X, y, 500)
+    merged = _fit(chunks[:3]).merge(_fit(chunks[3:]))
+    _assert_matches(merged, X, y)
+    for chunk in chunks[:2]:
+        merged.remove(*chunk)
+    _assert_matches(merged, X[1000:], y[1000:])
+
+
+def test_sliding_window():
+    rng = np.random.default_rng(4)
+    X = rng.normal(0, 1, (4000, 2)) + 1e4
+    y = X @ [1.0, 3.0] + rng.normal(0, 1, 4000)
+    chunks = _chunks(X, y, 200)
+    model = _fit(chunks, SlidingWindowOLS(window=5, refresh_every=7))
+    assert model.n == 1000
+    _assert_matches(model, X[-1000:], y[-1000:], rtol=1e-6)
+    assert not hasattr(model, 'remove')
+
+
+def test_rank_deficient():
+    rng = np.random.default_rng(5)
+    x = rng.normal(0, 1, 500)
+    X = np.column_stack([x, 2 * x])
+    y = 3 * x + rng.normal(0, 1, 500)
+    _assert_matches(_fit(_chunks(X, y, 100)), X, y)
+
+
+def test_column_mismatch():
+    model = IncrementalOLS().partial_fit(np.ones((3, 2)), np.ones(3))
+    with pytest.raises(ValueError):
+        model.partial_fit(np.ones((3, 3)), np.ones(3))
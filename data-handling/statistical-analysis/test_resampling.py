@@ -0,0 +1,64 @@
+# bootstrap / permutation_test against scipy.stats on the same data
+# python -m pytest data-handling/statistical-analysis
+
+import numpy as np
+import pytest
+from scipy import stats
+
+from resampling import bootstrap, mean, mean_diff, pearson_r, permutation_test
+
+
+def ratio_of_means(a, b, axis=-1):
+    return np.mean(a, axis=axis) / np.mean(b, axis=axis)
+
+
+def _scipy_pvalue(data, statistic, permutation_type, alternative='two-sided'):
+    return stats.permutation_test(data, statistic, permutation_type=permutation_type, vectorized=True,
+                                  n_resamples=20_000, alternative=alternative, random_state=0).pvalue
+
+
+@pytest.mark.parametrize('alternative', ['two-sided', 'greater', 'less'])
+def test_mean_diff_matches_scipy(alternative):
+    rng = np.random.default_rng(0)
+    a, b = rng.normal(0, 1, 40), rng.normal(0.5, 1, 50)
+    ours = permutation_test((a, b), mean_diff, 20_000, alternative=alternative, workers=1, seed=0)['pvalue']
+    assert ours == pytest.approx(_scipy_pvalue((a, b), mean_diff, 'independent', alternative), abs=0.01)
+
+
+def test_null_not_centred_on_zero():
+    # a ratio of means is around 1 under H0, |null| >= |observed| would give p=1 here
+    rng = np.random.default_rng(1)
+    a, b = rng.normal(6.5, 2, 40), rng.normal(10, 2, 40)
+    res = permutation_test((a, b), ratio_of_means, 20_000, workers=1, seed=0)
+    assert res['statistic'] == pytest.approx(0.65, abs=0.05)
+    assert res['pvalue'] < 0.01
+    assert res['pvalue'] == pytest.approx(_scipy_pvalue((a, b), ratio_of_means, 'independent'), abs=0.005)
+
+
+def test_pairings_matches_scipy():
+    rng = np.random.default_rng(2)
+    x = rng.random(60)
+    y = 0.3 * x + rng.normal(0, 0.3, 60)
+    ours = permutation_test((x, y), pearson_r, 20_000, kind='pairings', workers=1, seed=0)['pvalue']
+    assert ours == pytest.approx(_scipy_pvalue((x, y), pearson_r, 'pairings'), abs=0.01)
+
+
+def test_pairings_needs_equal_lengths():
+    with pytest.raises(ValueError):
+        permutation_test((np.ones(5), np.ones(6)), pearson_r, kind='pairings')
+
+
+def test_same_result_for_any_number_of_workers():
+    rng = np.random.default_rng(3)
+    x = rng.normal(0, 1, 200)
+    one = bootstrap((x,), mean, 4000, chunk_size=500, workers=1, seed=7)
+    two = bootstrap((x,), mean, 4000, chunk_size=500, workers=2, seed=7)
+    np.testing.assert_array_equal(one['distribution'], two['distribution'])
+
+
+def test_bootstrap_ci_close_to_scipy():
+    rng = np.random.default_rng(4)
+    x = rng.exponential(2, 300)
+    ours = bootstrap((x,), mean, 20_000, workers=1, seed=0)['ci']
+    ref = stats.bootstrap((x,), np.mean, n_resamples=20_000, method='percentile', random_state=0).confidence_interval
+    assert ours == pytest.approx((ref.low, ref.high), rel=0.02)
@@ -0,0 +1,31 @@
+# convert_csv / open_dataset round trip
+# python -m pytest data-handling/test_columnar_store.py
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from columnar_store import convert_csv, open_dataset
+
+
+@pytest.mark.parametrize('fmt', ['npy', 'arrow'])
+def test_round_trip(tmp_path, fmt):
+    df = pd.DataFrame({'Age': [25, None, 40], 'Name': ['a', None, 'c'], 'Salary': [1.5, 2.0, np.nan]})
+    df.to_csv(tmp_path / 'people.csv', index=False)
+    convert_csv(str(tmp_path / 'people.csv'), str(tmp_path / f'people.{fmt}'), fmt=fmt)
+    back = open_dataset(str(tmp_path / f'people.{fmt}')).to_pandas()
+    np.testing.assert_array_equal(back['Age'].to_numpy(dtype='float64', na_value=np.nan), df['Age'])
+    assert back['Name'].isna().tolist() == [False, True, False]
+    np.testing.assert_array_equal(back['Salary'].to_numpy(dtype='float64', na_value=np.nan), df['Salary'])
+
+
+@pytest.mark.parametrize('fmt', ['npy', 'arrow'])
+def test_types_widened_after_the_first_block(tmp_path, fmt):
+    # the first 1MB block says int / int / string, the last row doesn't fit
+    csv = tmp_path / 'late.csv'
+    csv.write_text('a,b,c\n' + '1,2,x\n' * 300_000 + '1.5,abc,y\n')
+    convert_csv(str(csv), str(tmp_path / f'late.{fmt}'), fmt=fmt, block_size=1 << 20)
+    back = open_dataset(str(tmp_path / f'late.{fmt}')).to_pandas()
+    assert len(back) == 300_001
+    assert back['a'].dtype == np.float64 and back['a'].iloc[-1] == 1.5
+    assert back['b'].iloc[-1] == 'abc' and back['b'].iloc[0] == '2'
@@ -0,0 +1,157 @@
+# batch version of using_beautifulsoup (main.py)
+# requests.get fetches one page at a time so thousands of pages = thousands of round trips
+# here we fetch on asyncio with aiohttp:
+#   - bounded concurrency (only `concurrency` requests in flight)
+#   - one pooled keep-alive connector, limit_per_host connections per host
+#   - per host rate limit (min gap between two requests to the same host)
+# titles are yielded as soon as each page arrives (not in input order)
+# pipenv install aiohttp beautifulsoup4 requests
+
+import asyncio
+import time
+from urllib.parse import urlsplit
+
+import aiohttp
+from bs4 import BeautifulSoup
+
+
+def parse_titles(html, tag='h2'):
+    soup = BeautifulSoup(html, 'html.parser')
+    return [title.text for title in soup.find_all(tag)]
+
+
+class HostRateLimiter:
+    # spaces out requests to the same host, `rate` = max requests per second per host
+    def __init__(self, rate=None):
+        self.interval = 1.0 / rate if rate else 0.0
+        self._next_slot = {}
+        self._locks = {}
+
+    async def wait(self, host):
+        if not self.interval:
+            return
+        lock = self._locks.setdefault(host, asyncio.Lock())
+        async with lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot.get(host, now))
+            self._next_slot[host] = slot + self.interval
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+
+async def iter_pages(urls, concurrency=20, per_host=8, per_host_rate=None, timeout=30):
+    # yields (url, status, body bytes) as pages come back, errors come back as (url, None, exception)
+    # (url is None if iterating `urls` raised)
+    # urls can be any iterable (even a generator), it is consumed lazily by the workers
+    urls = iter(urls)
+    results = asyncio.Queue(maxsize=concurrency * 2)
+    limiter = HostRateLimiter(per_host_rate)
+    connector = aiohttp.TCPConnector(limit=concurrency, limit_per_host=per_host, keepalive_timeout=30)
+    client_timeout = aiohttp.ClientTimeout(total=timeout)
+    done = object()
+
+    async with aiohttp.ClientSession(connector=connector, timeout=client_timeout) as session:
+
+        async def worker():
+            # always ends with `done` (unless cancelled, then nobody is reading anymore), otherwise
+            # the loop below waits forever for a worker that died
+            cancelled = False
+            try:
+                for url in urls:
+                    try:  # any error for this url (bad url, connection, timeout, ...) is its result
+                        await limiter.wait(urlsplit(url).netloc)
+                        async with session.get(url) as response:
+                            body = await response.read()
+                        item = (url, response.status, body)
+                    except Exception as e:
+                        item = (url, None, e)
+                    await results.put(item)
+            except asyncio.CancelledError:
+                cancelled = True
+                raise
+            except Exception as e:  # the urls iterable itself failed
+                await results.put((None, None, e))
+            finally:
+                if not cancelled:
+                    await results.put(done)
+
+        workers = [asyncio.create_task(worker()) for _ in range(concurrency)]
+        try:
+            finished = 0
+            while finished < len(workers):
+                item = await results.get()
+                if item is done:
+                    finished += 1
+                    continue
+                yield item
+        finally:
+            for w in workers:
+                w.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+
+
+async def iter_titles(urls, tag='h2', **kwargs):
+    # same as iter_pages but yields (url, [titles]) for every page that came back 200
+    async for url, status, body in iter_pages(urls, **kwargs):
+        if status == 200:
+            yield url, parse_titles(body, tag)
+
+
+def fetch_titles(urls, tag='h2', **kwargs):
+    # sync helper for scripts, returns {url: [titles]}
+    async def collect():
+        return {url: titles async for url, titles in iter_titles(urls, tag, **kwargs)}
+    return asyncio.run(collect())
+
+
+####### benchmark against a local stand-in server #######
+
+def _start_local_server(latency=0.05, n_titles=20):
+    # threaded http server on a random port, every path returns the same page after `latency` secs
+    import threading
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    page = ('<html><body>' + ''.join(f'<h2>title {i}</h2><p>text</p>' for i in range(n_titles))
+            + '</body></html>').encode()
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'  # keep-alive
+
+        def do_GET(self):
+            time.sleep(latency)
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/html')
+            self.send_header('Content-Length', str(len(page)))
+            self.end_headers()
+            self.wfile.write(page)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def benchmark_fetch(n_pages=200, latency=0.05, concurrency=32):
+    import requests
+
+    server = _start_local_server(latency)
+    base = f'http://127.0.0.1:{server.server_address[1]}'
+    urls = [f'{base}/page/{i}' for i in range(n_pages)]
+
+    start = time.perf_counter()
+    for url in urls:
+        parse_titles(requests.get(url).text)  # what using_beautifulsoup does
+    serial = time.perf_counter() - start
+
+    start = time.perf_counter()
+    pages = fetch_titles(urls, concurrency=concurrency, per_host=concurrency)
+    concurrent = time.perf_counter() - start
+
+    server.shutdown()
+    print(f"serial:     {n_pages / serial:8.1f} pages/sec")
+    print(f"concurrent: {len(pages) / concurrent:8.1f} pages/sec (concurrency={concurrency})")
+
+# benchmark_fetch()
@@ -0,0 +1,231 @@
+# pool of warm selenium drivers for using_selenium (main.py)
+# starting chrome takes seconds, so instead of webdriver.Chrome() + quit() per url we keep
+# `size` headless drivers alive and lease them out to worker threads
+#   - a driver is recycled (quit + started again) after `max_pages` pages or when a page crashed it
+#   - a start that fails is retried `start_attempts` times with backoff; if chrome still won't come
+#     up the slot stays in the pool empty, the next lease tries again and raises if it can't, so
+#     nobody waits forever on a driver that never comes back
+#   - images and css are blocked through chrome prefs, we only need the dom
+#   - stats(): lease wait time and pages served per driver
+# the factory is pluggable, FakeDriver below lets you run the pool without a browser
+
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+
+def headless_chrome_options(block_images=True, block_css=True):
+    from selenium import webdriver
+
+    options = webdriver.ChromeOptions()
+    options.add_argument('--headless=new')
+    options.add_argument('--disable-gpu')
+    options.add_argument('--no-sandbox')
+    prefs = {}
+    if block_images:
+        prefs['profile.managed_default_content_settings.images'] = 2
+    if block_css:
+        prefs['profile.managed_default_content_settings.stylesheets'] = 2
+    if prefs:
+        options.add_experimental_option('prefs', prefs)
+    return options
+
+
+def chrome_factory(block_images=True, block_css=True):
+    from selenium import webdriver
+
+    def make():
+        return webdriver.Chrome(options=headless_chrome_options(block_images, block_css))
+    return make
+
+
+class _Slot:
+    def __init__(self, driver):
+        self.driver = driver  # None when the last start failed
+        self.pages = 0
+
+
+class DriverPool:
+
+    def __init__(self, factory=None, size=4, max_pages=100, start_attempts=3, start_backoff=0.5):
+        self.factory = factory or chrome_factory()
+        self.size = size
+        self.max_pages = max_pages
+        self.start_attempts = start_attempts
+        self.start_backoff = start_backoff
+        self._idle = queue.Queue()
+        self._lock = threading.Lock()
+        self._closed = False
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+        self._leases = 0
+        self._recycled = 0
+        self._start_failures = 0
+        self._retired_pages = []  # pages served by drivers that were already recycled
+        self._slots = []
+        for _ in range(size):  # start them all up front so the first leases are warm
+            slot = _Slot(self._start())
+            self._slots.append(slot)
+            self._idle.put(slot)
+
+    @contextmanager
+    def lease(self, timeout=None):
+        if self._closed:
+            raise RuntimeError("pool is closed")
+        start = time.perf_counter()
+        slot = self._idle.get(timeout=timeout)
+        waited = time.perf_counter() - start
+        with self._lock:
+            self._leases += 1
+            self._wait_total += waited
+            self._wait_max = max(self._wait_max, waited)
+
+        if slot.driver is None:  # its last restart failed, try again for this lease
+            try:
+                slot.driver = self._start()
+            except Exception:
+                self._idle.put(slot)  # still empty, the next lease gets its own try
+                raise
+
+        crashed = False
+        try:
+            yield slot.driver
+        except Exception:
+            crashed = True
+            raise
+        finally:
+            slot.pages += 1
+            if crashed or slot.pages >= self.max_pages or self._closed:
+                slot = self._recycle(slot)
+            if slot is not None:
+                self._idle.put(slot)
+
+    def _recycle(self, slot):
+        try:
+            slot.driver.quit()
+        except Exception:
+            pass  # a crashed driver may already be gone
+        with self._lock:
+            self._retired_pages.append(slot.pages)
+            self._slots.remove(slot)
+            self._recycled += 1
+        if self._closed:
+            return None
+        try:
+            fresh = _Slot(self._start())
+        except Exception:
+            fresh = _Slot(None)  # keep the slot, otherwise waiting leases block forever
+        with self._lock:
+            self._slots.append(fresh)
+        return fresh
+
+    def _start(self):
+        for attempt in range(self.start_attempts):
+            try:
+                return self.factory()
+            except Exception:
+                with self._lock:
+                    self._start_failures += 1
+                if attempt == self.start_attempts - 1:
+                    raise
+                time.sleep(self.start_backoff * 2 ** attempt)
+
+    def map(self, fn, urls):
+        # runs fn(driver, url) for every url on `size` worker threads, results in input order
+        # an exception is returned in place of the result (and the driver that raised it is recycled)
+        def work(url):
+            try:
+                with self.lease() as driver:
+                    return fn(driver, url)
+            except Exception as e:
+                return e
+
+        with ThreadPoolExecutor(max_workers=self.size) as workers:
+            return list(workers.map(work, urls))
+
+    def stats(self):
+        with self._lock:
+            pages = self._retired_pages + [slot.pages for slot in self._slots]
+            return {
+                'leases': self._leases,
+                'lease_wait_avg': self._wait_total / self._leases if self._leases else 0.0,
+                'lease_wait_max': self._wait_max,
+                'recycled': self._recycled,
+                'start_failures': self._start_failures,
+                'pages_per_driver': pages,
+            }
+
+    def close(self):
+        self._closed = True
+        while True:
+            try:
+                slot = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            if slot.driver is None:
+                continue
+            try:
+                slot.driver.quit()
+            except Exception:
+                pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def page_title(driver, url):
+    driver.get(url)
+    return driver.title
+
+
+####### fake driver, to try the pool without chrome (see test_driver_pool.py) #######
+
+class FakeDriver:
+    started = 0
+
+    def __init__(self, startup=0.0, page_time=0.0, crash_on=()):
+        FakeDriver.started += 1
+        time.sleep(startup)
+        self.page_time = page_time
+        self.crash_on = set(crash_on)
+        self.title = None
+        self.quit_called = False
+
+    def get(self, url):
+        if self.quit_called:
+            raise RuntimeError("driver already quit")
+        time.sleep(self.page_time)
+        if url in self.crash_on:
+            raise RuntimeError(f"renderer crashed on {url}")
+        self.title = f"title of {url}"
+
+    def quit(self):
+        self.quit_called = True
+
+
+def benchmark_pool(n_urls=40, startup=1.0, page_time=0.05, size=4):
+    # new driver per url (what using_selenium does) vs pooled drivers, with a fake 1s startup
+    urls = [f'https://example.com/{i}' for i in range(n_urls)]
+
+    start = time.perf_counter()
+    for url in urls:
+        driver = FakeDriver(startup, page_time)
+        page_title(driver, url)
+        driver.quit()
+    per_url = time.perf_counter() - start
+
+    start = time.perf_counter()
+    with DriverPool(lambda: FakeDriver(startup, page_time), size=size, max_pages=50) as pool:
+        pool.map(page_title, urls)
+        stats = pool.stats()
+    pooled = time.perf_counter() - start
+
+    print(f"driver per url: {n_urls / per_url:8.1f} pages/sec")
+    print(f"pool of {size}:      {n_urls / pooled:8.1f} pages/sec  {stats}")
+
+# benchmark_pool()
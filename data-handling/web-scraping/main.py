@@ -21,6 +21,27 @@ url = 'https://www.bbc.co.uk/news'
 # using_beautifulsoup(url)
 
 
+# same thing for many urls at once, fetched concurrently (see async_fetcher.py)
+# pass workers to also parse in a process pool (see parse_pool.py), parser can be 'html.parser' or 'lxml'
+def using_beautifulsoup_batch(urls, workers=None, parser='html.parser'):
+    if workers:
+        import asyncio
+        from parse_pool import iter_titles_parallel
+
+        async def collect():
+            return [item async for item in iter_titles_parallel(urls, workers=workers, parser=parser)]
+        pages = asyncio.run(collect())
+    else:
+        from async_fetcher import fetch_titles
+        pages = fetch_titles(urls).items()
+
+    for url, titles in pages:
+        for title in titles:
+            print(title)
+
+# using_beautifulsoup_batch([url, 'https://www.bbc.co.uk/sport'])
+
+
 from selenium import webdriver
 
 def using_selenium(url):
@@ -34,3 +55,15 @@ def using_selenium(url):
 url = 'https://www.bbc.co.uk/news'
 using_selenium(url)
 
+
+# many urls: keep a few warm headless drivers and reuse them (see driver_pool.py)
+def using_selenium_pool(urls, size=4, max_pages=100):
+    from driver_pool import DriverPool, page_title
+
+    with DriverPool(size=size, max_pages=max_pages) as pool:
+        for title in pool.map(page_title, urls):
+            print(title)
+        print(pool.stats())
+
+# using_selenium_pool([url, 'https://www.bbc.co.uk/sport'])
+
@@ -0,0 +1,339 @@
+# Local benchmarks for the project components, run from the project dir:
+#
+#     python -c "from myScrapyProject import benchmarks; benchmarks.benchmark_response_cache()"
+#
+# Everything runs against a throwaway HTTP server on 127.0.0.1, nothing goes out.
+
+import os
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import scrapy
+from scrapy.utils.project import get_project_settings
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    # the default backlog of 5 drops concurrent connects, they come back a second later and
+    # look like a slow server
+    request_queue_size = 128
+
+
+def serve(handler_cls):
+    server = _Server(("127.0.0.1", 0), handler_cls)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def run_crawls(crawls):
+    # crawls: list of (spider_cls, settings_dict, spider_kwargs), run one after the other in the
+    # same reactor, returns [(elapsed secs, stats dict)]
+    from scrapy.crawler import CrawlerRunner
+    from scrapy.utils.reactor import install_reactor
+
+    base = get_project_settings()
+    install_reactor(base.get("TWISTED_REACTOR"))
+    from twisted.internet import defer, reactor
+
+    results = []
+
+    @defer.inlineCallbacks
+    def crawl_all():
+        try:
+            for spider_cls, overrides, kwargs in crawls:
+                settings = base.copy()
+                settings.update({"ROBOTSTXT_OBEY": False, "LOG_LEVEL": "WARNING", **overrides})
+                runner = CrawlerRunner(settings)
+                crawler = runner.create_crawler(spider_cls)
+                start = time.perf_counter()
+                yield runner.crawl(crawler, **kwargs)
+                results.append((time.perf_counter() - start, crawler.stats.get_stats()))
+        finally:
+            reactor.stop()
+
+    reactor.callWhenRunning(crawl_all)
+    reactor.run()
+    return results
+
+
+class UrlListSpider(scrapy.Spider):
+    name = "bench_urls"
+
+    def __init__(self, urls=(), **kwargs):
+        super().__init__(**kwargs)
+        self.start_urls = list(urls)
+
+    def parse(self, response):
+        pass
+
+
+####### response cache (middlewares.py / httpcache.py) #######
+
+def _revalidating_handler(page_size, latency):
+    body = b"<html><body>" + b"x" * page_size + b"</body></html>"
+    last_modified = "Mon, 06 Jan 2025 10:00:00 GMT"
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            time.sleep(latency)
+            etag = f'"v1-{self.path}"'
+            if self.headers.get("If-None-Match") == etag:
+                self.send_response(304)
+                self.send_header("ETag", etag)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html")
+            self.send_header("ETag", etag)
+            self.send_header("Last-Modified", last_modified)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    return Handler
+
+
+def benchmark_response_cache(n_pages=200, page_size=200_000, latency=0.02):
+    server, base = serve(_revalidating_handler(page_size, latency))
+    urls = [f"{base}/page/{i}" for i in range(n_pages)]
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        settings = {"RESPONSE_CACHE_DIR": cache_dir}
+        (cold, cold_stats), (warm, warm_stats) = run_crawls([
+            (UrlListSpider, settings, {"urls": urls}),
+            (UrlListSpider, settings, {"urls": urls}),
+        ])
+    server.shutdown()
+
+    for label, took, stats in (("first crawl", cold, cold_stats), ("recrawl", warm, warm_stats)):
+        print(
+            f"{label:12} {took:6.2f}s  "
+            f"downloaded {stats.get('downloader/response_bytes', 0) / 1e6:8.2f} MB  "
+            f"hit {stats.get('response_cache/hit', 0)}  miss {stats.get('response_cache/miss', 0)}  "
+            f"saved {stats.get('response_cache/saved_bytes', 0) / 1e6:.2f} MB"
+        )
+
+
+####### items (items.py) #######
+
+def benchmark_items(n_items=200_000):
+    import gc
+    import json
+    import tracemalloc
+
+    from itemadapter import ItemAdapter
+
+    from .items import MyscrapyprojectItem, dumps_jsonl, dumps_msgpack
+
+    class DictItem(scrapy.Item):
+        url = scrapy.Field()
+        title = scrapy.Field()
+        text = scrapy.Field()
+        status = scrapy.Field()
+
+    def build(cls):
+        return [
+            cls(url=f"https://example.com/{i}", title=f"title {i}", text="some text", status=200)
+            for i in range(n_items)
+        ]
+
+    for label, cls in (("scrapy.Item", DictItem), ("slotted dataclass", MyscrapyprojectItem)):
+        gc.collect()
+        tracemalloc.start()
+        items = build(cls)
+        size, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        start = time.perf_counter()
+        payload = "".join(json.dumps(ItemAdapter(item).asdict()) + "\n" for item in items).encode()
+        adapter_json = time.perf_counter() - start
+        print(f"{label:18} {size / n_items:7.0f} bytes/item  "
+              f"ItemAdapter+json {n_items / adapter_json:10.0f} items/sec ({len(payload) / 1e6:.1f} MB)")
+        del items
+
+    items = build(MyscrapyprojectItem)
+    for label, dumps in (("dumps_jsonl", dumps_jsonl), ("dumps_msgpack", dumps_msgpack)):
+        start = time.perf_counter()
+        payload = dumps(items)
+        took = time.perf_counter() - start
+        print(f"{label:18} {n_items / took:10.0f} items/sec ({len(payload) / 1e6:.1f} MB)")
+
+
+####### dupefilter (dupefilter.py) #######
+
+def benchmark_dupefilter(n_urls=10_000_000, error_rate=0.001, n_probes=100_000):
+    # memory of the default set-of-fingerprints filter vs the Bloom filter at n_urls
+    # the set needs ~1.5 GB at 10M urls, pass a smaller n_urls on small machines
+    import hashlib
+    import tracemalloc
+
+    from .dupefilter import ScalableBloomFilter
+
+    def fingerprints(start, stop):
+        # same shape as scrapy's request fingerprints (sha1 digests)
+        for i in range(start, stop):
+            yield hashlib.sha1(f"https://example.com/page/{i}".encode()).digest()
+
+    tracemalloc.start()
+    seen = set()
+    start = time.perf_counter()
+    for fp in fingerprints(0, n_urls):
+        seen.add(fp)
+    set_time = time.perf_counter() - start
+    set_bytes, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del seen
+
+    bloom = ScalableBloomFilter(capacity=n_urls // 4, error_rate=error_rate)  # force it to grow a couple of times
+    start = time.perf_counter()
+    for fp in fingerprints(0, n_urls):
+        bloom.add(fp)
+    bloom_time = time.perf_counter() - start
+    false_positives = sum(fp in bloom for fp in fingerprints(n_urls, n_urls + n_probes))
+    bloom.close()
+
+    print(f"set of fingerprints: {set_bytes / 1e6:9.1f} MB  {n_urls / set_time:10.0f} urls/sec")
+    print(f"scalable bloom:      {bloom.nbytes / 1e6:9.1f} MB  {n_urls / bloom_time:10.0f} urls/sec  "
+          f"{len(bloom.slices)} slices, false positives {false_positives / n_probes:.5f} (target {error_rate})")
+
+
+####### adaptive concurrency (throttle.py / middlewares.py) #######
+
+def _overloaded_handler(capacity, base_latency):
+    # gets slower once more than `capacity` requests are in flight and answers 429 past 2x capacity
+    lock = threading.Lock()
+    in_flight = [0]
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        # class attributes, so a running server can be made to recover (Handler.capacity = ...)
+        capacity = 0
+        base_latency = 0.0
+
+        def do_GET(self):
+            capacity, base_latency = self.capacity, self.base_latency
+            with lock:
+                in_flight[0] += 1
+                load = in_flight[0]
+            try:
+                if load > 2 * capacity:
+                    self.send_response(429)
+                    self.send_header("Retry-After", "1")
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                time.sleep(base_latency * max(1.0, load / capacity) ** 2)
+                body = b"<html><body>ok</body></html>"
+                self.send_response(200)
+                self.send_header("Content-Type", "text/html")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+            finally:
+                with lock:
+                    in_flight[0] -= 1
+
+        def log_message(self, *args):
+            pass
+
+    Handler.capacity, Handler.base_latency = capacity, base_latency
+    return Handler
+
+
+def benchmark_adaptive_concurrency(n_pages=400, capacity=8, base_latency=0.1):
+    server, base = serve(_overloaded_handler(capacity, base_latency))
+    urls = [f"{base}/page/{i}" for i in range(n_pages)]
+    common = {"RESPONSE_CACHE_ENABLED": False, "ADAPTIVE_CONCURRENCY_TARGET_LATENCY": base_latency * 2}
+    runs = [
+        ("fixed 32/domain", {**common, "ADAPTIVE_CONCURRENCY_ENABLED": False, "CONCURRENT_REQUESTS_PER_DOMAIN": 32}),
+        ("adaptive (AIMD)", {**common, "ADAPTIVE_CONCURRENCY_ENABLED": True}),
+    ]
+    results = run_crawls([(UrlListSpider, settings, {"urls": urls}) for _, settings in runs])
+    server.shutdown()
+
+    for (label, _), (took, stats) in zip(runs, results):
+        ok = stats.get("downloader/response_status_count/200", 0)
+        print(
+            f"{label:16} {took:6.2f}s  {ok / took:7.1f} pages/sec  200s {ok}  "
+            f"429s {stats.get('downloader/response_status_count/429', 0)}  "
+            f"final concurrency {stats.get('adaptive_concurrency/127.0.0.1/concurrency', '-')}"
+        )
+
+
+####### streaming extraction (streaming.py) #######
+
+STREAM_SPEC = {"item": "div.card", "fields": {"title": "h2", "link": "a/@href", "price": "span"}}
+
+
+def _write_listing(path, size_mb):
+    card = '<div class="card"><h2>product {i}</h2><p>{filler}</p><a href="/p/{i}">more</a><span>{i}.99</span></div>\n'
+    filler = "lorem ipsum dolor sit amet " * 8
+    with open(path, "w") as f:
+        f.write("<html><head><title>listing</title></head><body><section>\n")
+        i = 0
+        while f.tell() < size_mb * 1024 * 1024:
+            f.write("".join(card.format(i=i + j, filler=filler) for j in range(1000)))
+            i += 1000
+        f.write("</section></body></html>\n")
+
+
+def _peak_rss():
+    # bytes; from /proc on Linux (VmHWM starts over at exec, so a spawned child gets its own peak)
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    import resource
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def _extract_in_child(path, mode, out):
+    from scrapy.http import HtmlResponse
+
+    from .streaming import StreamingExtractor
+
+    with open(path, "rb") as f:
+        body = f.read()  # both modes start from the body in memory, like response.body
+    start = time.perf_counter()
+    count = 0
+    if mode == "stream":
+        for _ in StreamingExtractor(STREAM_SPEC).iter_items(body):
+            count += 1
+    else:
+        response = HtmlResponse(url="https://example.com/listing", body=body, encoding="utf-8")
+        for card in response.css("div.card"):
+            {"title": card.css("h2::text").get(), "link": card.css("a::attr(href)").get(),
+             "price": card.css("span::text").get()}
+            count += 1
+    took = time.perf_counter() - start
+    out.put((count, took, _peak_rss()))
+
+
+def benchmark_streaming(size_mb=100):
+    import multiprocessing
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "listing.html")
+        _write_listing(path, size_mb)
+        ctx = multiprocessing.get_context("spawn")  # fresh process per mode so peak RSS is its own
+        for mode in ("selectors", "stream"):
+            out = ctx.Queue()
+            child = ctx.Process(target=_extract_in_child, args=(path, mode, out))
+            child.start()
+            count, took, peak = out.get()
+            child.join()
+            print(f"{mode:10} {count:9d} items  {count / took:9.0f} items/sec  peak RSS {peak / 1e6:8.1f} MB")
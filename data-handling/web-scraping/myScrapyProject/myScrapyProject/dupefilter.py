@@ -0,0 +1,212 @@
+# Bloom filter dupefilter for large crawls
+#
+# Scrapy's RFPDupeFilter keeps every request fingerprint in a python set,
+# which grows without bound (~100+ bytes per url). This one keeps a scalable
+# Bloom filter instead: a list of fixed size filters, each new one twice as
+# big with a tighter error rate, so the overall false positive rate stays
+# under DUPEFILTER_BLOOM_ERROR_RATE however many urls we add.
+#
+# With JOBDIR set the bit arrays are memory-mapped files in <JOBDIR>/bloom/,
+# so "scrapy crawl new_spider -s JOBDIR=crawls/run1" can be stopped and
+# resumed (JOBDIR also persists the scheduler queue). Without JOBDIR the
+# filter lives in anonymous memory. bloom.json (sizes of every slice) is
+# rewritten whenever a slice is added, so a killed crawl resumes with all of
+# them; the item counts in it may lag, on load they are estimated again from
+# the bits that are set. A resumed job keeps the sizes it was started with,
+# changing the settings only affects new jobs.
+#
+# Settings: DUPEFILTER_BLOOM_CAPACITY, DUPEFILTER_BLOOM_ERROR_RATE
+
+import json
+import math
+import mmap
+import os
+
+from scrapy.dupefilters import RFPDupeFilter
+from scrapy.utils.job import job_dir
+
+
+class _BloomSlice:
+    def __init__(self, capacity, error_rate, path=None, count=0, bits=None, hashes=None):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.count = count
+        # optimal sizes for `capacity` items at `error_rate`, unless an existing slice says otherwise
+        self.bits = bits or max(8, int(math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)))
+        self.hashes = hashes or max(1, int(round(self.bits / capacity * math.log(2))))
+        size = (self.bits + 7) // 8
+        self._file = None
+        if path is None:
+            self.bitarray = mmap.mmap(-1, size)
+        else:
+            exists = os.path.exists(path)
+            if exists and os.path.getsize(path) != size:
+                raise ValueError(
+                    f"{path} is {os.path.getsize(path)} bytes, expected {size} for "
+                    f"{self.bits} bits, the bloom metadata doesn't belong to it"
+                )
+            self._file = open(path, "r+b" if exists else "w+b")
+            if not exists:
+                self._file.truncate(size)
+            self.bitarray = mmap.mmap(self._file.fileno(), size)
+
+    def estimated_count(self):
+        # items added, estimated from the fraction of bits set: -m/k * ln(1 - X/m)
+        ones = 0
+        for start in range(0, len(self.bitarray), 1 << 20):
+            ones += int.from_bytes(self.bitarray[start:start + (1 << 20)], "little").bit_count()
+        if ones >= self.bits:
+            return self.capacity
+        return int(round(-self.bits / self.hashes * math.log(1 - ones / self.bits)))
+
+    def _positions(self, h1, h2):
+        # double hashing: k positions out of two 64 bit hashes
+        bits = self.bits
+        return [(h1 + i * h2) % bits for i in range(self.hashes)]
+
+    def __contains__(self, hashes):
+        bitarray = self.bitarray
+        return all(bitarray[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(*hashes))
+
+    def add(self, hashes):
+        bitarray = self.bitarray
+        for pos in self._positions(*hashes):
+            bitarray[pos >> 3] |= 1 << (pos & 7)
+        self.count += 1
+
+    @property
+    def full(self):
+        return self.count >= self.capacity
+
+    def flush(self):
+        if self._file is not None:
+            self.bitarray.flush()
+
+    def close(self):
+        self.flush()
+        self.bitarray.close()
+        if self._file is not None:
+            self._file.close()
+
+
+class ScalableBloomFilter:
+    GROWTH = 2
+    TIGHTENING = 0.5
+
+    def __init__(self, capacity=1_000_000, error_rate=0.001, path=None):
+        self.initial_capacity = capacity
+        self.error_rate = error_rate
+        self.path = path
+        self.slices = []
+        if path is not None:
+            os.makedirs(path, exist_ok=True)
+            self._load()
+        if not self.slices:
+            self._grow()
+
+    def _meta_path(self):
+        return os.path.join(self.path, "bloom.json")
+
+    def _slice_path(self, index):
+        return None if self.path is None else os.path.join(self.path, f"bloom-{index:03d}.bin")
+
+    def _load(self):
+        if not os.path.exists(self._meta_path()):
+            return
+        with open(self._meta_path()) as f:
+            meta = json.load(f)
+        self.initial_capacity = meta["initial_capacity"]
+        self.error_rate = meta["error_rate"]
+        for index, s in enumerate(meta["slices"]):
+            bloom_slice = _BloomSlice(
+                s["capacity"], s["error_rate"], self._slice_path(index), s["count"], s.get("bits"), s.get("hashes")
+            )
+            # the count in bloom.json is from the last flush, after a crash the bits know better
+            bloom_slice.count = max(bloom_slice.count, bloom_slice.estimated_count())
+            self.slices.append(bloom_slice)
+
+    def _grow(self):
+        index = len(self.slices)
+        capacity = self.initial_capacity * self.GROWTH ** index
+        # error rates p*(1-r), p*(1-r)*r, ... sum up to at most p
+        error_rate = self.error_rate * (1 - self.TIGHTENING) * self.TIGHTENING ** index
+        self.slices.append(_BloomSlice(capacity, error_rate, self._slice_path(index)))
+        self._write_meta()
+
+    @staticmethod
+    def _hashes(key):
+        # key is already a hash (request fingerprint), two 64 bit halves are enough for double hashing
+        return int.from_bytes(key[:8], "little"), int.from_bytes(key[8:16], "little") | 1
+
+    def __contains__(self, key):
+        hashes = self._hashes(key)
+        return any(hashes in s for s in reversed(self.slices))
+
+    def add(self, key):
+        # returns True if the key was (probably) there already
+        hashes = self._hashes(key)
+        if any(hashes in s for s in reversed(self.slices)):
+            return True
+        if self.slices[-1].full:
+            self._grow()
+        self.slices[-1].add(hashes)
+        return False
+
+    def __len__(self):
+        return sum(s.count for s in self.slices)
+
+    @property
+    def nbytes(self):
+        return sum((s.bits + 7) // 8 for s in self.slices)
+
+    def _write_meta(self):
+        if self.path is None:
+            return
+        meta = {
+            "initial_capacity": self.initial_capacity,
+            "error_rate": self.error_rate,
+            "slices": [
+                {"capacity": s.capacity, "error_rate": s.error_rate, "count": s.count, "bits": s.bits, "hashes": s.hashes}
+                for s in self.slices
+            ],
+        }
+        tmp = self._meta_path() + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(meta, f)
+        os.replace(tmp, self._meta_path())
+
+    def flush(self):
+        if self.path is None:
+            return
+        for s in self.slices:
+            s.flush()
+        self._write_meta()
+
+    def close(self):
+        self.flush()
+        for s in self.slices:
+            s.close()
+
+
+class BloomDupeFilter(RFPDupeFilter):
+    def __init__(self, path=None, debug=False, *, fingerprinter=None, capacity=1_000_000, error_rate=0.001):
+        super().__init__(None, debug, fingerprinter=fingerprinter)  # no requests.seen file, we keep our own
+        bloom_path = os.path.join(path, "bloom") if path else None
+        self.bloom = ScalableBloomFilter(capacity, error_rate, bloom_path)
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        settings = crawler.settings
+        return cls(
+            job_dir(settings),
+            settings.getbool("DUPEFILTER_DEBUG"),
+            fingerprinter=crawler.request_fingerprinter,
+            capacity=settings.getint("DUPEFILTER_BLOOM_CAPACITY", 1_000_000),
+            error_rate=settings.getfloat("DUPEFILTER_BLOOM_ERROR_RATE", 0.001),
+        )
+
+    def request_seen(self, request):
+        return self.bloom.add(self._fingerprint(request))
+
+    def close(self, reason):
+        self.bloom.close()
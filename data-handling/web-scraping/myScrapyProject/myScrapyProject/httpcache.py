@@ -0,0 +1,145 @@
+# Disk-backed response cache used by MyscrapyprojectDownloaderMiddleware
+#
+# Every cached response is two files named after the request fingerprint:
+# <fp>.json (url, status, headers) and <fp>.body. The mtime of the .json file
+# is the LRU clock, so recency survives restarts without a separate index.
+
+import json
+import os
+import time
+from collections import OrderedDict
+
+from scrapy.http import Headers
+from scrapy.responsetypes import responsetypes
+
+
+class ResponseCache:
+    def __init__(self, cache_dir, max_bytes=512 * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        self._entries = OrderedDict()  # fp -> size on disk, oldest first
+        os.makedirs(cache_dir, exist_ok=True)
+        self._load_index()
+
+    def _path(self, fp, ext):
+        return os.path.join(self.cache_dir, fp + ext)
+
+    def _load_index(self):
+        found = []
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(".json"):
+                continue
+            fp = name[:-5]
+            try:
+                meta = os.stat(self._path(fp, ".json"))
+                body = os.stat(self._path(fp, ".body"))
+            except FileNotFoundError:
+                continue
+            found.append((meta.st_mtime, fp, meta.st_size + body.st_size))
+        for _, fp, size in sorted(found):
+            self._entries[fp] = size
+            self.total_bytes += size
+
+    def validators(self, fp):
+        # headers to send on recrawl so the server can answer 304 Not Modified
+        if fp not in self._entries:
+            return {}
+        try:
+            with open(self._path(fp, ".json"), encoding="utf-8") as f:
+                meta = json.load(f)
+        except FileNotFoundError:
+            self._forget(fp)
+            return {}
+        headers = {}
+        if meta.get("etag"):
+            headers["If-None-Match"] = meta["etag"]
+        if meta.get("last_modified"):
+            headers["If-Modified-Since"] = meta["last_modified"]
+        return headers
+
+    def load(self, fp, request):
+        if fp not in self._entries:
+            return None
+        try:
+            with open(self._path(fp, ".json"), encoding="utf-8") as f:
+                meta = json.load(f)
+            with open(self._path(fp, ".body"), "rb") as f:
+                body = f.read()
+        except FileNotFoundError:
+            self._forget(fp)
+            return None
+        self._touch(fp)
+        headers = Headers([(k.encode("latin-1"), v.encode("latin-1")) for k, v in meta["headers"]])
+        respcls = responsetypes.from_args(headers=headers, url=meta["url"], body=body)
+        return respcls(
+            url=meta["url"],
+            status=meta["status"],
+            headers=headers,
+            body=body,
+            request=request,
+            flags=["cached"],
+        )
+
+    def store(self, fp, response):
+        etag = response.headers.get("ETag")
+        last_modified = response.headers.get("Last-Modified")
+        if not etag and not last_modified:
+            return False  # nothing to revalidate with, so no point keeping it
+        meta = {
+            "url": response.url,
+            "status": response.status,
+            "etag": etag.decode("latin-1") if etag else None,
+            "last_modified": last_modified.decode("latin-1") if last_modified else None,
+            "headers": [
+                (k.decode("latin-1"), v.decode("latin-1"))
+                for k, values in response.headers.items()
+                for v in values
+            ],
+            "stored_at": time.time(),
+        }
+        encoded = json.dumps(meta).encode("utf-8")
+        size = len(encoded) + len(response.body)
+        if size > self.max_bytes:
+            return False
+
+        self._forget(fp)
+        with open(self._path(fp, ".body"), "wb") as f:
+            f.write(response.body)
+        with open(self._path(fp, ".json"), "wb") as f:  # written last, marks the entry complete
+            f.write(encoded)
+        self._entries[fp] = size
+        self.total_bytes += size
+        return True
+
+    def evict(self):
+        # drop least recently used entries until we are under the byte budget, returns how many
+        evicted = 0
+        while self.total_bytes > self.max_bytes and self._entries:
+            fp = next(iter(self._entries))
+            self._forget(fp)
+            evicted += 1
+        return evicted
+
+    def body_size(self, fp):
+        try:
+            return os.path.getsize(self._path(fp, ".body"))
+        except FileNotFoundError:
+            return 0
+
+    def _touch(self, fp):
+        self._entries.move_to_end(fp)
+        try:
+            os.utime(self._path(fp, ".json"))
+        except FileNotFoundError:
+            pass
+
+    def _forget(self, fp):
+        size = self._entries.pop(fp, None)
+        if size is not None:
+            self.total_bytes -= size
+        for ext in (".json", ".body"):
+            try:
+                os.remove(self._path(fp, ext))
+            except FileNotFoundError:
+                pass
@@ -2,11 +2,60 @@
 #
 # See documentation in:
 # https://docs.scrapy.org/en/latest/topics/items.html
+#
+# Items are slotted dataclasses instead of scrapy.Item: no per-item dict,
+# fields are checked on creation, and ItemAdapter supports dataclasses
+# out of the box so pipelines and feed exports work unchanged.
+# Needs python 3.10+ for slots=True.
+
+import json
+from dataclasses import dataclass, fields
+
+
+@dataclass(slots=True)
+class MyscrapyprojectItem:
+    url: str
+    title: str
+    text: str | None = None
+    status: int = 200
+
+    def __post_init__(self):
+        if not isinstance(self.url, str) or not self.url.startswith(("http://", "https://")):
+            raise ValueError(f"url must be an http(s) url, got {self.url!r}")
+        if not isinstance(self.title, str):
+            raise TypeError(f"title must be str, got {type(self.title).__name__}")
+        if self.text is not None and not isinstance(self.text, str):
+            raise TypeError(f"text must be str or None, got {type(self.text).__name__}")
+        if not isinstance(self.status, int) or not 100 <= self.status <= 599:
+            raise ValueError(f"status must be an http status code, got {self.status!r}")
+
+
+FIELD_NAMES = tuple(f.name for f in fields(MyscrapyprojectItem))
+
+
+def as_row(item):
+    # field values in FIELD_NAMES order, cheaper than dataclasses.asdict (no deep copy)
+    return tuple(getattr(item, name) for name in FIELD_NAMES)
+
+
+def dumps_jsonl(items):
+    encode = json.JSONEncoder(ensure_ascii=False, separators=(",", ":")).encode
+    return "".join(
+        encode(dict(zip(FIELD_NAMES, as_row(item)))) + "\n" for item in items
+    ).encode("utf-8")
+
+
+def dumps_msgpack(items):
+    # each item is packed as an array in FIELD_NAMES order, field names are not repeated per item
+    import msgpack
+
+    packer = msgpack.Packer()
+    return b"".join(packer.pack(as_row(item)) for item in items)
 
-import scrapy
 
+def loads_msgpack(data):
+    import msgpack
 
-class MyscrapyprojectItem(scrapy.Item):
-    # define the fields for your item here like:
-    # name = scrapy.Field()
-    pass
+    unpacker = msgpack.Unpacker(raw=False, use_list=False)
+    unpacker.feed(data)
+    return [MyscrapyprojectItem(*row) for row in unpacker]
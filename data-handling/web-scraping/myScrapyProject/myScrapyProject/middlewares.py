@@ -3,11 +3,22 @@
 # See documentation in:
 # https://docs.scrapy.org/en/latest/topics/spider-middleware.html
 
+import time
+from collections import defaultdict, deque
+
 from scrapy import signals
+from scrapy.utils.defer import maybe_deferred_to_future
+from scrapy.utils.httpobj import urlparse_cached
+from scrapy.utils.project import data_path
+from scrapy.utils.request import fingerprint
+from twisted.internet import defer
 
 # useful for handling different item types with a single interface
 from itemadapter import is_item, ItemAdapter
 
+from .httpcache import ResponseCache
+from .throttle import AIMDController, parse_retry_after
+
 
 class MyscrapyprojectSpiderMiddleware:
     # Not all methods need to be defined. If a method is not defined,
@@ -60,15 +71,140 @@ class MyscrapyprojectDownloaderMiddleware:
     # Not all methods need to be defined. If a method is not defined,
     # scrapy acts as if the downloader middleware does not modify the
     # passed objects.
+    #
+    # Keeps a disk cache of responses (see httpcache.py). On recrawl the
+    # cached ETag / Last-Modified go out as If-None-Match / If-Modified-Since
+    # and a 304 answer is swapped for the cached response. If the entry was
+    # evicted in between, the request is sent again without the validators.
+    # Settings: RESPONSE_CACHE_ENABLED, RESPONSE_CACHE_DIR, RESPONSE_CACHE_MAX_BYTES
+    #
+    # It also limits the per-domain concurrency with AIMD (see throttle.py)
+    # and honors Retry-After. Requests over the limit wait in process_request
+    # (the limit is copied to slot.concurrency too, but with the asyncio
+    # reactor the downloader can start more than that at once). A permit is
+    # given back when the response or exception comes back through here, or
+    # when the request leaves the downloader, whichever happens first, so
+    # responses from middlewares further down (HttpCacheMiddleware) don't
+    # leak it. While a domain is paused by Retry-After the slot's delay jitter
+    # is off, otherwise RANDOMIZE_DOWNLOAD_DELAY could cut the pause by half.
+    # It has to sit above RetryMiddleware (550) to see 429/503 responses
+    # before they are retried.
+    # Settings: ADAPTIVE_CONCURRENCY_ENABLED, ADAPTIVE_CONCURRENCY_MAX,
+    # ADAPTIVE_CONCURRENCY_TARGET_LATENCY (start is CONCURRENT_REQUESTS_PER_DOMAIN)
+
+    def __init__(self, stats=None, cache_dir=None, max_bytes=512 * 1024 * 1024, throttle=None, crawler=None):
+        self.stats = stats
+        self.cache = ResponseCache(cache_dir, max_bytes) if cache_dir else None
+        self.throttle = throttle
+        self.crawler = crawler
+        self._base_delay = {}
+        self._base_jitter = {}
+        self._in_flight = defaultdict(int)
+        self._waiting = defaultdict(deque)
+        self._holders = {}  # request -> domain, for requests that got a concurrency permit
 
     @classmethod
     def from_crawler(cls, crawler):
         # This method is used by Scrapy to create your spiders.
-        s = cls()
+        settings = crawler.settings
+        cache_dir = None
+        if settings.getbool("RESPONSE_CACHE_ENABLED", True):
+            cache_dir = data_path(settings.get("RESPONSE_CACHE_DIR", "responsecache"), createdir=True)
+        throttle = None
+        if settings.getbool("ADAPTIVE_CONCURRENCY_ENABLED", True):
+            throttle = AIMDController(
+                start=settings.getint("CONCURRENT_REQUESTS_PER_DOMAIN"),
+                max_concurrency=settings.getint("ADAPTIVE_CONCURRENCY_MAX", 32),
+                target_latency=settings.getfloat("ADAPTIVE_CONCURRENCY_TARGET_LATENCY", 1.0),
+            )
+        s = cls(
+            stats=crawler.stats,
+            cache_dir=cache_dir,
+            max_bytes=settings.getint("RESPONSE_CACHE_MAX_BYTES", 512 * 1024 * 1024),
+            throttle=throttle,
+            crawler=crawler,
+        )
         crawler.signals.connect(s.spider_opened, signal=signals.spider_opened)
+        crawler.signals.connect(s.spider_closed, signal=signals.spider_closed)
+        crawler.signals.connect(s.request_left_downloader, signal=signals.request_left_downloader)
         return s
 
-    def process_request(self, request, spider):
+    def _inc(self, key, count=1):
+        if self.stats is not None:
+            self.stats.inc_value(key, count)
+
+    def _slot(self, request):
+        key = request.meta.get("download_slot")
+        if key is None or self.crawler is None or self.crawler.engine is None:
+            return None, None
+        return key, self.crawler.engine.downloader.slots.get(key)
+
+    def _domain(self, request):
+        # same key the downloader uses for its slots
+        return request.meta.get("download_slot") or urlparse_cached(request).hostname or ""
+
+    async def _acquire(self, request):
+        key = self._domain(request)
+        self._holders[request] = key
+        if self._in_flight[key] < int(self.throttle.state(key).concurrency) and not self._waiting[key]:
+            self._in_flight[key] += 1
+            return
+        waiter = defer.Deferred()
+        self._waiting[key].append(waiter)
+        await maybe_deferred_to_future(waiter)  # _wake() takes the permit for us
+
+    def _wake(self, key):
+        waiting = self._waiting[key]
+        limit = int(self.throttle.state(key).concurrency)
+        while waiting and self._in_flight[key] < limit:
+            self._in_flight[key] += 1
+            waiting.popleft().callback(None)
+
+    def _release(self, request):
+        key = self._holders.pop(request, None)
+        if key is not None:
+            self._in_flight[key] -= 1
+            self._wake(key)
+
+    def request_left_downloader(self, request, spider):
+        self._release(request)
+
+    @staticmethod
+    def _jitter_attr(slot):
+        # Slot.jitter (fraction) in newer scrapy, Slot.randomize_delay (bool) before
+        return "jitter" if hasattr(slot, "jitter") else "randomize_delay"
+
+    def _apply_throttle(self, request, state):
+        key, slot = self._slot(request)
+        self._wake(key or self._domain(request))
+        if slot is None:
+            return
+        jitter = self._jitter_attr(slot)
+        base_delay = self._base_delay.setdefault(key, slot.delay)
+        base_jitter = self._base_jitter.setdefault(key, getattr(slot, jitter))
+        slot.concurrency = int(state.concurrency)
+        pause = self.throttle.pause_left(key)
+        if pause:
+            # the downloader waits slot.delay after slot.lastseen before sending the next one,
+            # without jitter so the wait is never shorter than what the server asked for
+            slot.delay = max(base_delay, pause)
+            setattr(slot, jitter, type(base_jitter)(0))
+            slot.lastseen = time.monotonic()
+        elif slot.delay != base_delay or getattr(slot, jitter) != base_jitter:
+            slot.delay = base_delay
+            setattr(slot, jitter, base_jitter)
+
+    def _observe(self, request, response):
+        key = request.meta.get("download_slot")
+        if self.throttle is None or key is None:
+            return
+        retry_after = parse_retry_after(response.headers.get("Retry-After"))
+        state = self.throttle.on_response(
+            key, response.status, request.meta.get("download_latency"), retry_after
+        )
+        self._apply_throttle(request, state)
+
+    async def process_request(self, request, spider):
         # Called for each request that goes through the downloader
         # middleware.
 
@@ -78,8 +214,31 @@ class MyscrapyprojectDownloaderMiddleware:
         # - or return a Request object
         # - or raise IgnoreRequest: process_exception() methods of
         #   installed downloader middleware will be called
+        if self.throttle is not None:
+            await self._acquire(request)
+        if self.cache is None or request.meta.get("dont_cache"):
+            return None
+        fp = fingerprint(request).hex()
+        request.meta["response_cache_fp"] = fp
+        added = []
+        for name, value in self.cache.validators(fp).items():
+            if name not in request.headers:
+                request.headers[name] = value
+                added.append(name)
+        if added:
+            request.meta["response_cache_validators"] = added
         return None
 
+    def _refetch(self, request):
+        # the entry our validators came from was evicted before the 304 came back: ask again for
+        # the full page, without validators and without going through the cache
+        headers = request.headers.copy()
+        for name in request.meta["response_cache_validators"]:
+            headers.pop(name, None)
+        meta = {k: v for k, v in request.meta.items() if not k.startswith("response_cache_")}
+        meta["dont_cache"] = True
+        return request.replace(headers=headers, meta=meta, dont_filter=True)
+
     def process_response(self, request, response, spider):
         # Called with the response returned from the downloader.
 
@@ -87,6 +246,27 @@ class MyscrapyprojectDownloaderMiddleware:
         # - return a Response object
         # - return a Request object
         # - or raise IgnoreRequest
+        self._release(request)
+        self._observe(request, response)
+
+        fp = request.meta.get("response_cache_fp")
+        if self.cache is None or fp is None:
+            return response
+
+        if response.status == 304:
+            cached = self.cache.load(fp, request)
+            if cached is not None:
+                self._inc("response_cache/hit")
+                self._inc("response_cache/saved_bytes", len(cached.body))
+                return cached
+            if request.meta.get("response_cache_validators"):
+                self._inc("response_cache/refetch")
+                return self._refetch(request)
+
+        self._inc("response_cache/miss")
+        if response.status == 200 and self.cache.store(fp, response):
+            self._inc("response_cache/store")
+            self._inc("response_cache/evicted", self.cache.evict())
         return response
 
     def process_exception(self, request, exception, spider):
@@ -97,7 +277,18 @@ class MyscrapyprojectDownloaderMiddleware:
         # - return None: continue processing this exception
         # - return a Response object: stops process_exception() chain
         # - return a Request object: stops process_exception() chain
-        pass
+        self._release(request)
+        key = request.meta.get("download_slot")
+        if self.throttle is not None and key is not None:
+            self._apply_throttle(request, self.throttle.on_error(key))
+        return None
 
     def spider_opened(self, spider):
         spider.logger.info("Spider opened: %s" % spider.name)
+
+    def spider_closed(self, spider):
+        if self.throttle is None or self.stats is None:
+            return
+        for domain, metrics in self.throttle.metrics().items():
+            for name, value in metrics.items():
+                self.stats.set_value(f"adaptive_concurrency/{domain}/{name}", value)
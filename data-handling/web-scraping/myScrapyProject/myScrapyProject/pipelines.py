@@ -3,11 +3,129 @@
 # Don't forget to add your pipeline to the ITEM_PIPELINES setting
 # See: https://docs.scrapy.org/en/latest/topics/item-pipeline.html
 
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from twisted.internet import task, threads
 
 # useful for handling different item types with a single interface
 from itemadapter import ItemAdapter
 
+from .storage import open_writer
+
+logger = logging.getLogger(__name__)
+
 
 class MyscrapyprojectPipeline:
+    # Buffers items into columnar batches and writes them in bulk (see storage.py).
+    # A batch is flushed when it reaches STORAGE_BATCH_SIZE items or is older than
+    # STORAGE_FLUSH_INTERVAL seconds, and always in close_spider. Writes run on a
+    # single background thread so the reactor never waits on disk.
+    # Settings: STORAGE_BACKEND ("sqlite" / "parquet" / None), STORAGE_PATH
+    # (default items.db for sqlite, items.parquet/ for parquet),
+    # STORAGE_BATCH_SIZE, STORAGE_FLUSH_INTERVAL
+
+    def __init__(self, stats=None, backend=None, path=None, batch_size=1000, flush_interval=5.0):
+        self.stats = stats
+        self.backend = backend
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._writer = None
+        self._executor = None
+        self._timer = None
+        self._reset()
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        settings = crawler.settings
+        return cls(
+            stats=crawler.stats,
+            backend=settings.get("STORAGE_BACKEND"),
+            path=settings.get("STORAGE_PATH"),
+            batch_size=settings.getint("STORAGE_BATCH_SIZE", 1000),
+            flush_interval=settings.getfloat("STORAGE_FLUSH_INTERVAL", 5.0),
+        )
+
+    def _reset(self):
+        self._columns = {}
+        self._count = 0
+        self._batch_started = None
+
+    def open_spider(self, spider):
+        if not self.backend:
+            return
+        self._writer = open_writer(self.backend, self.path)
+        self.path = self._writer.path
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="storage")
+        self._started = time.perf_counter()
+        if self.flush_interval:
+            self._timer = task.LoopingCall(self._flush_if_stale)
+            self._timer.start(self.flush_interval, now=False)
+
     def process_item(self, item, spider):
+        if self._writer is None:
+            return item
+        row = ItemAdapter(item).asdict()
+        for name in row.keys() - self._columns.keys():
+            self._columns[name] = [None] * self._count  # new field, pad earlier rows
+        for name, values in self._columns.items():
+            values.append(row.get(name))
+        self._count += 1
+        if self._batch_started is None:
+            self._batch_started = time.monotonic()
+        if self._count >= self.batch_size:
+            self._flush()
         return item
+
+    def _flush_if_stale(self):
+        if self._batch_started is not None and time.monotonic() - self._batch_started >= self.flush_interval:
+            self._flush()
+
+    def _flush(self):
+        if not self._count:
+            return None
+        batch, count = self._columns, self._count
+        self._reset()
+        future = self._executor.submit(self._write, batch, count)
+        future.add_done_callback(self._check_write)
+        return future
+
+    def _check_write(self, future):
+        if future.exception() is not None:
+            logger.error("Failed to write a batch to %s", self.path, exc_info=future.exception())
+            if self.stats is not None:
+                self.stats.inc_value("storage/failed_flushes")
+
+    def _write(self, batch, count):
+        # runs on the storage thread, StatsCollector calls are plain dict updates
+        start = time.perf_counter()
+        self._writer.write(batch)
+        took = time.perf_counter() - start
+        if self.stats is not None:
+            self.stats.inc_value("storage/items", count)
+            self.stats.inc_value("storage/flushes")
+            self.stats.inc_value("storage/flush_time", took)
+            self.stats.max_value("storage/flush_latency_max", took)
+
+    def close_spider(self, spider):
+        if self._writer is None:
+            return None
+        if self._timer is not None and self._timer.running:
+            self._timer.stop()
+        self._flush()
+        self._executor.submit(self._writer.close)  # the sqlite connection belongs to the storage thread
+        return threads.deferToThread(self._finish)  # wait for the last flush off the reactor
+
+    def _finish(self):
+        self._executor.shutdown(wait=True)
+        if self.stats is not None:
+            items = self.stats.get_value("storage/items", 0)
+            flushes = self.stats.get_value("storage/flushes", 0)
+            elapsed = time.perf_counter() - self._started
+            self.stats.set_value("storage/items_per_sec", items / elapsed if elapsed else 0.0)
+            if flushes:
+                self.stats.set_value(
+                    "storage/flush_latency_avg", self.stats.get_value("storage/flush_time") / flushes
+                )
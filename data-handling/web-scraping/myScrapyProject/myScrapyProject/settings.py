@@ -20,14 +20,14 @@ NEWSPIDER_MODULE = "myScrapyProject.spiders"
 ROBOTSTXT_OBEY = True
 
 # Configure maximum concurrent requests performed by Scrapy (default: 16)
-#CONCURRENT_REQUESTS = 32
+CONCURRENT_REQUESTS = 64
 
 # Configure a delay for requests for the same website (default: 0)
 # See https://docs.scrapy.org/en/latest/topics/settings.html#download-delay
 # See also autothrottle settings and docs
 #DOWNLOAD_DELAY = 3
 # The download delay setting will honor only one of:
-#CONCURRENT_REQUESTS_PER_DOMAIN = 16
+CONCURRENT_REQUESTS_PER_DOMAIN = 2  # only the starting point with ADAPTIVE_CONCURRENCY_ENABLED
 #CONCURRENT_REQUESTS_PER_IP = 16
 
 # Disable cookies (enabled by default)
@@ -50,9 +50,21 @@ ROBOTSTXT_OBEY = True
 
 # Enable or disable downloader middlewares
 # See https://docs.scrapy.org/en/latest/topics/downloader-middleware.html
-#DOWNLOADER_MIDDLEWARES = {
-#    "myScrapyProject.middlewares.MyscrapyprojectDownloaderMiddleware": 543,
-#}
+# Above RetryMiddleware (550) so it sees 429/503 responses before they are retried
+DOWNLOADER_MIDDLEWARES = {
+    "myScrapyProject.middlewares.MyscrapyprojectDownloaderMiddleware": 560,
+}
+
+# AIMD per-domain concurrency (see throttle.py), use it instead of AUTOTHROTTLE
+ADAPTIVE_CONCURRENCY_ENABLED = True
+ADAPTIVE_CONCURRENCY_MAX = 32
+ADAPTIVE_CONCURRENCY_TARGET_LATENCY = 1.0
+
+# Response cache with ETag / Last-Modified revalidation (see middlewares.py)
+# The directory is relative to the project data dir (.scrapy/)
+RESPONSE_CACHE_ENABLED = True
+RESPONSE_CACHE_DIR = "responsecache"
+RESPONSE_CACHE_MAX_BYTES = 512 * 1024 * 1024
 
 # Enable or disable extensions
 # See https://docs.scrapy.org/en/latest/topics/extensions.html
@@ -62,9 +74,17 @@ ROBOTSTXT_OBEY = True
 
 # Configure item pipelines
 # See https://docs.scrapy.org/en/latest/topics/item-pipeline.html
-#ITEM_PIPELINES = {
-#    "myScrapyProject.pipelines.MyscrapyprojectPipeline": 300,
-#}
+ITEM_PIPELINES = {
+    "myScrapyProject.pipelines.MyscrapyprojectPipeline": 300,
+}
+
+# Batched item storage (see pipelines.py), STORAGE_BACKEND is "sqlite", "parquet" or None
+# STORAGE_PATH defaults to items.db for sqlite and to the items.parquet directory for
+# parquet (one part file per batch)
+STORAGE_BACKEND = "sqlite"
+#STORAGE_PATH = "items.db"
+STORAGE_BATCH_SIZE = 1000
+STORAGE_FLUSH_INTERVAL = 5.0
 
 # Enable and configure the AutoThrottle extension (disabled by default)
 # See https://docs.scrapy.org/en/latest/topics/autothrottle.html
@@ -87,6 +107,11 @@ ROBOTSTXT_OBEY = True
 #HTTPCACHE_IGNORE_HTTP_CODES = []
 #HTTPCACHE_STORAGE = "scrapy.extensions.httpcache.FilesystemCacheStorage"
 
+# Bloom filter dupefilter (see dupefilter.py), persisted when JOBDIR is set
+DUPEFILTER_CLASS = "myScrapyProject.dupefilter.BloomDupeFilter"
+DUPEFILTER_BLOOM_CAPACITY = 1_000_000
+DUPEFILTER_BLOOM_ERROR_RATE = 0.001
+
 # Set settings whose default value is deprecated to a future-proof value
 TWISTED_REACTOR = "twisted.internet.asyncioreactor.AsyncioSelectorReactor"
 FEED_EXPORT_ENCODING = "utf-8"
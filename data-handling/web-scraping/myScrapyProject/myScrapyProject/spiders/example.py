@@ -1,14 +1,56 @@
 import scrapy
 
+from ..items import FIELD_NAMES, MyscrapyprojectItem
+from ..streaming import iter_items
+
 
 class NewSpider(scrapy.Spider):
     name = "new_spider"
     allowed_domains = ["example.com"]
     start_urls = ["https://example.com"]
 
+    # For huge pages set a spec (see streaming.py) to extract items while parsing
+    # instead of building the full selector tree, e.g.
+    # stream_spec = {"item": "div", "fields": {"title": "h1", "text": "p"}}
+    # Field names must be item fields (url comes from the response). Fields a
+    # node doesn't have get the item defaults (title "" like the non-streaming
+    # path), a node that still doesn't make a valid item is logged and skipped.
+    stream_spec = None
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        if self.stream_spec:
+            allowed = set(FIELD_NAMES) - {"url"}
+            unknown = set(self.stream_spec["fields"]) - allowed
+            if unknown:
+                raise ValueError(
+                    f"stream_spec fields {sorted(unknown)} are not item fields, "
+                    f"use some of {sorted(allowed)}"
+                )
+
     def parse(self, response):
-        pass
+        if self.stream_spec:
+            for fields in iter_items(response, self.stream_spec):
+                # missing fields fall back to the item defaults ("" for the title)
+                fields = {name: value for name, value in fields.items() if value is not None}
+                fields.setdefault("title", "")
+                try:
+                    item = MyscrapyprojectItem(url=response.url, **fields)
+                except (TypeError, ValueError) as e:
+                    self.logger.warning("skipping invalid item on %s: %s", response.url, e)
+                    if getattr(self, "crawler", None) is not None:
+                        self.crawler.stats.inc_value("new_spider/invalid_items")
+                    continue
+                yield item
+            return
+
+        yield MyscrapyprojectItem(
+            url=response.url,
+            title=response.css("h1::text").get(default=""),
+            text=response.css("p::text").get(),
+        )
     
     
     
-# to run this command "scrapy crawl new_spider -o output.json"
\ No newline at end of file
+# to run this command "scrapy crawl new_spider -o output.json"
+# to be able to stop and resume a crawl add a job dir "scrapy crawl new_spider -s JOBDIR=crawls/new_spider-1"
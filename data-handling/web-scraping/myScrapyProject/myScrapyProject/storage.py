@@ -0,0 +1,103 @@
+# Bulk writers for MyscrapyprojectPipeline
+#
+# A batch is columnar: {"field": [value, value, ...], ...}, all lists the
+# same length. Writers are only ever called from the pipeline's single
+# flush thread, so they can hold a connection without locking.
+
+import json
+import os
+import sqlite3
+
+
+def _plain(value):
+    # sqlite/parquet only take scalars, anything nested is stored as json text
+    if value is None or isinstance(value, (str, int, float, bool, bytes)):
+        return value
+    return json.dumps(value, default=str)
+
+
+class SQLiteWriter:
+    def __init__(self, path, table="items"):
+        self.path = path
+        self.table = table
+        self._conn = None
+        self._columns = []
+
+    def _open(self):
+        self._conn = sqlite3.connect(self.path)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._columns = [row[1] for row in self._conn.execute(f'PRAGMA table_info("{self.table}")')]
+
+    def _ensure_columns(self, names):
+        new = [name for name in names if name not in self._columns]
+        if not new:
+            return
+        if not self._columns:
+            cols = ", ".join(f'"{name}"' for name in new)
+            self._conn.execute(f'CREATE TABLE "{self.table}" ({cols})')
+        else:
+            for name in new:
+                self._conn.execute(f'ALTER TABLE "{self.table}" ADD COLUMN "{name}"')
+        self._columns.extend(new)
+
+    def write(self, batch):
+        if self._conn is None:
+            self._open()
+        names = list(batch)
+        rows = zip(*([_plain(v) for v in batch[name]] for name in names))
+        cols = ", ".join(f'"{name}"' for name in names)
+        marks = ", ".join("?" for _ in names)
+        with self._conn:  # one transaction per batch
+            self._ensure_columns(names)
+            self._conn.executemany(f'INSERT INTO "{self.table}" ({cols}) VALUES ({marks})', rows)
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+
+class ParquetWriter:
+    # every flush becomes one part file in a dataset directory, so batches with
+    # different fields don't have to share a schema (pyarrow/polars read the dir as one table)
+
+    def __init__(self, path, compression="zstd"):
+        self.path = path
+        self.compression = compression
+        self._part = 0
+
+    def write(self, batch):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        if self._part == 0:
+            os.makedirs(self.path, exist_ok=True)
+            self._part = len([n for n in os.listdir(self.path) if n.endswith(".parquet")])
+        table = pa.table({name: [_plain(v) for v in values] for name, values in batch.items()})
+        pq.write_table(
+            table, os.path.join(self.path, f"part-{self._part:05d}.parquet"), compression=self.compression
+        )
+        self._part += 1
+
+    def close(self):
+        pass
+
+
+WRITERS = {
+    "sqlite": SQLiteWriter,
+    "parquet": ParquetWriter,
+}
+
+# used when STORAGE_PATH isn't set, a file for sqlite, a dataset directory for parquet
+DEFAULT_PATHS = {
+    "sqlite": "items.db",
+    "parquet": "items.parquet",
+}
+
+
+def open_writer(backend, path=None):
+    try:
+        return WRITERS[backend](path or DEFAULT_PATHS[backend])
+    except KeyError:
+        raise ValueError(f"STORAGE_BACKEND must be one of {sorted(WRITERS)}, got {backend!r}") from None
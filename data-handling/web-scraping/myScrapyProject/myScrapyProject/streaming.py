@@ -0,0 +1,98 @@
+# Streaming extraction for huge pages (listings, sitemaps)
+#
+# response.css() / response.xpath() build a selector tree for the whole
+# document first, so a 100MB page costs several times that in memory. Here
+# lxml's iterparse walks the document once, an item is yielded as soon as
+# its element closes, and everything already handled is freed right away.
+#
+# The spec says which element is an item and where each field comes from:
+#
+#     spec = {
+#         "item": "div.card",        # tag, optionally with a class
+#         "fields": {
+#             "title": "h2",         # text of the first <h2> inside the item
+#             "link": "a/@href",     # attribute of the first <a> inside the item
+#             "id": "@data-id",      # attribute of the item element itself
+#             "text": ".",           # all text inside the item
+#         },
+#     }
+#
+# Tags are matched without namespace, so "url" / "loc" work on sitemaps too.
+# Set xml=True for xml documents (sitemaps, feeds), html is the default.
+
+import io
+
+from lxml import etree
+
+
+def _parse_item(selector):
+    tag, _, css_class = selector.partition(".")
+    return tag, css_class or None
+
+
+def _compile_field(selector):
+    # returns a function element -> value
+    if selector == ".":
+        return lambda el: " ".join(t.strip() for t in el.itertext() if t.strip()) or None
+    path, _, attr = selector.partition("@")
+    path = path.rstrip("/")
+    if not path:
+        return lambda el: el.get(attr)
+    find = etree.XPath(".//*[local-name()=$tag][1]")
+
+    if attr:
+        def get(el):
+            found = find(el, tag=path)
+            return found[0].get(attr) if found else None
+    else:
+        def get(el):
+            found = find(el, tag=path)
+            if not found:
+                return None
+            return "".join(found[0].itertext()).strip()
+    return get
+
+
+class StreamingExtractor:
+    def __init__(self, spec, xml=False):
+        self.item_tag, self.item_class = _parse_item(spec["item"])
+        self.fields = {name: _compile_field(sel) for name, sel in spec["fields"].items()}
+        self.xml = xml
+
+    def _matches(self, el):
+        if self.item_class is None:
+            return True
+        return self.item_class in (el.get("class") or "").split()
+
+    def iter_items(self, source):
+        # source: bytes or a binary file object, yields one dict per item
+        if isinstance(source, (bytes, bytearray)):
+            source = io.BytesIO(source)
+        events = etree.iterparse(
+            source,
+            events=("end",),
+            tag="{*}" + self.item_tag if self.xml else self.item_tag,
+            html=not self.xml,
+            huge_tree=True,
+            remove_comments=True,
+        )
+        for _, el in events:
+            if not self._matches(el):
+                continue
+            yield {name: get(el) for name, get in self.fields.items()}
+            # free the item and everything before it, the parent keeps only what is still open
+            el.clear(keep_tail=True)
+            for node in (el, *el.iterancestors()):
+                parent = node.getparent()
+                if parent is not None:
+                    while node.getprevious() is not None:
+                        del parent[0]
+        del events
+
+
+def iter_items(response, spec, xml=None):
+    # spider helper: `yield from iter_items(response, spec)` in parse()
+    if xml is None:
+        content_type = response.headers.get("Content-Type", b"").decode("latin-1")
+        xml = "xml" in content_type or response.url.endswith(".xml")
+    return StreamingExtractor(spec, xml=xml).iter_items(response.body)
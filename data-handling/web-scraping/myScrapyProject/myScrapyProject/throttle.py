@@ -0,0 +1,131 @@
+# AIMD per-domain concurrency, driven from MyscrapyprojectDownloaderMiddleware
+#
+# Like TCP congestion control: every good response adds 1/concurrency (so
+# about +1 per "round" of requests), and a 429, a 5xx, a download error or an
+# average latency above the target halves the concurrency. Decreases are
+# limited to one per cooldown so a burst of errors from the same round
+# doesn't collapse it to 1. Retry-After pauses the domain for that long.
+#
+# The controller only does the bookkeeping, the middleware applies the
+# numbers to Scrapy's downloader slots (slot.concurrency / slot.delay).
+
+import time
+from email.utils import parsedate_to_datetime
+
+THROTTLE_STATUSES = (429, 503)
+
+
+def parse_retry_after(value, now=None):
+    # Retry-After is either a number of seconds or an http date, returns seconds or None
+    if not value:
+        return None
+    if isinstance(value, bytes):
+        value = value.decode("latin-1")
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        when = parsedate_to_datetime(value).timestamp()
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, when - (now if now is not None else time.time()))
+
+
+class DomainState:
+    def __init__(self, concurrency, now):
+        self.concurrency = float(concurrency)
+        self.latency = None  # moving average of download latency
+        self.paused_until = 0.0
+        self.last_decrease = 0.0
+        self.started = now
+        self.responses = 0
+        self.errors = 0
+        self.throttled = 0
+
+    @property
+    def error_rate(self):
+        total = self.responses + self.errors
+        return self.errors / total if total else 0.0
+
+    def throughput(self, now):
+        elapsed = now - self.started
+        return self.responses / elapsed if elapsed > 0 else 0.0
+
+
+class AIMDController:
+    def __init__(self, start=2, min_concurrency=1, max_concurrency=32, target_latency=1.0,
+                 decrease_factor=0.5, cooldown=1.0, smoothing=0.3, clock=time.monotonic):
+        self.start = start
+        self.min_concurrency = min_concurrency
+        self.max_concurrency = max_concurrency
+        self.target_latency = target_latency
+        self.decrease_factor = decrease_factor
+        self.cooldown = cooldown
+        self.smoothing = smoothing
+        self.clock = clock
+        self.domains = {}
+
+    def state(self, domain):
+        state = self.domains.get(domain)
+        if state is None:
+            state = self.domains[domain] = DomainState(self.start, self.clock())
+        return state
+
+    def _decrease(self, state, now):
+        if now - state.last_decrease < self.cooldown:
+            return
+        state.concurrency = max(self.min_concurrency, state.concurrency * self.decrease_factor)
+        state.last_decrease = now
+
+    def on_response(self, domain, status, latency=None, retry_after=None):
+        now = self.clock()
+        state = self.state(domain)
+        if latency is not None:
+            if state.latency is None:
+                state.latency = latency
+            else:
+                state.latency += self.smoothing * (latency - state.latency)
+
+        if status in THROTTLE_STATUSES or status >= 500:
+            # the server is failing, sending it more requests won't help
+            state.errors += 1
+            if status in THROTTLE_STATUSES:
+                state.throttled += 1
+            self._decrease(state, now)
+            if retry_after:
+                state.paused_until = max(state.paused_until, now + retry_after)
+        else:
+            state.responses += 1
+            if state.latency is not None and state.latency > self.target_latency:
+                self._decrease(state, now)
+            else:
+                state.concurrency = min(self.max_concurrency, state.concurrency + 1.0 / state.concurrency)
+        return state
+
+    def on_error(self, domain):
+        now = self.clock()
+        state = self.state(domain)
+        state.errors += 1
+        self._decrease(state, now)
+        return state
+
+    def pause_left(self, domain):
+        state = self.domains.get(domain)
+        if state is None:
+            return 0.0
+        return max(0.0, state.paused_until - self.clock())
+
+    def metrics(self):
+        now = self.clock()
+        return {
+            domain: {
+                "concurrency": int(state.concurrency),
+                "latency": state.latency,
+                "responses": state.responses,
+                "errors": state.errors,
+                "throttled": state.throttled,
+                "error_rate": state.error_rate,
+                "throughput": state.throughput(now),
+            }
+            for domain, state in self.domains.items()
+        }
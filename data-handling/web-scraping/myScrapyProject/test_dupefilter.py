@@ -0,0 +1,64 @@
+# ScalableBloomFilter persistence: resume after a kill, settings changed between runs
+# python -m pytest data-handling/web-scraping/myScrapyProject
+
+import hashlib
+import json
+import os
+
+from myScrapyProject.dupefilter import ScalableBloomFilter
+
+
+def _keys(start, stop):
+    return [hashlib.sha1(str(i).encode()).digest() for i in range(start, stop)]
+
+
+def test_no_false_negatives_across_slices():
+    bloom = ScalableBloomFilter(capacity=100, error_rate=0.01)
+    keys = _keys(0, 1000)
+    assert not any(bloom.add(k) for k in keys[:10])
+    for k in keys:
+        bloom.add(k)
+    assert len(bloom.slices) > 2
+    assert all(k in bloom for k in keys)
+    false_positives = sum(k in bloom for k in _keys(10_000, 30_000))
+    assert false_positives < 20_000 * 0.01 * 1.5  # the rate is a bound on average, allow for noise
+
+
+def test_resume_after_kill(tmp_path):
+    # no flush() / close(): the process was killed, only what is already on disk survives
+    bloom = ScalableBloomFilter(capacity=100, error_rate=0.01, path=str(tmp_path))
+    keys = _keys(0, 700)
+    for k in keys:
+        bloom.add(k)
+    for s in bloom.slices:
+        s.bitarray.flush()  # what the kernel writes back of a shared mapping anyway
+    n_slices = len(bloom.slices)
+    assert n_slices > 2
+
+    resumed = ScalableBloomFilter(capacity=100, error_rate=0.01, path=str(tmp_path))
+    assert len(resumed.slices) == n_slices
+    assert all(resumed.add(k) for k in keys)  # every url is still known as seen
+    assert len(resumed) >= 0.9 * len(keys)  # counts estimated from the bits, not the stale json
+
+
+def test_resume_with_different_capacity(tmp_path):
+    bloom = ScalableBloomFilter(capacity=100, error_rate=0.01, path=str(tmp_path))
+    keys = _keys(0, 300)
+    for k in keys:
+        bloom.add(k)
+    bloom.close()
+
+    resumed = ScalableBloomFilter(capacity=5000, error_rate=0.001, path=str(tmp_path))
+    assert [s.bits for s in resumed.slices] == [s.bits for s in bloom.slices]
+    assert all(k in resumed for k in keys)
+    resumed.close()
+
+
+def test_metadata_written_when_a_slice_is_added(tmp_path):
+    bloom = ScalableBloomFilter(capacity=50, error_rate=0.01, path=str(tmp_path))
+    for k in _keys(0, 200):
+        bloom.add(k)
+    with open(os.path.join(tmp_path, "bloom.json")) as f:
+        meta = json.load(f)
+    assert len(meta["slices"]) == len(bloom.slices)
+    assert all("bits" in s and "hashes" in s for s in meta["slices"])
@@ -0,0 +1,61 @@
+# MyscrapyprojectItem validation and the JSONL / msgpack encoders
+# python -m pytest data-handling/web-scraping/myScrapyProject
+
+import json
+
+import pytest
+from itemadapter import ItemAdapter
+
+from myScrapyProject.items import FIELD_NAMES, MyscrapyprojectItem, as_row, dumps_jsonl, dumps_msgpack, loads_msgpack
+
+ITEMS = [
+    MyscrapyprojectItem("https://example.com/1", "first"),
+    MyscrapyprojectItem("http://example.com/2", "zweite Seite – ünïcode", text="some text", status=404),
+]
+
+
+@pytest.mark.parametrize("kwargs, error", [
+    ({"url": "ftp://example.com", "title": "t"}, ValueError),
+    ({"url": "/relative", "title": "t"}, ValueError),
+    ({"url": None, "title": "t"}, ValueError),
+    ({"url": "https://example.com", "title": None}, TypeError),
+    ({"url": "https://example.com", "title": b"bytes"}, TypeError),
+    ({"url": "https://example.com", "title": "t", "text": 3}, TypeError),
+    ({"url": "https://example.com", "title": "t", "status": 99}, ValueError),
+    ({"url": "https://example.com", "title": "t", "status": 600}, ValueError),
+    ({"url": "https://example.com", "title": "t", "status": "200"}, ValueError),
+])
+def test_invalid_values_rejected(kwargs, error):
+    with pytest.raises(error):
+        MyscrapyprojectItem(**kwargs)
+
+
+def test_slots_no_extra_fields():
+    item = ITEMS[0]
+    assert not hasattr(item, "__dict__")
+    with pytest.raises(AttributeError):
+        item.price = 3
+
+
+def test_item_adapter_asdict():
+    # what the pipeline and the feed exports see
+    assert ItemAdapter(ITEMS[1]).asdict() == {
+        "url": "http://example.com/2", "title": "zweite Seite – ünïcode", "text": "some text", "status": 404,
+    }
+    assert tuple(ItemAdapter(ITEMS[0]).field_names()) == FIELD_NAMES
+    assert as_row(ITEMS[0]) == ("https://example.com/1", "first", None, 200)
+
+
+def test_jsonl():
+    data = dumps_jsonl(ITEMS)
+    lines = data.decode("utf-8").splitlines()
+    assert [json.loads(line) for line in lines] == [ItemAdapter(item).asdict() for item in ITEMS]
+    assert "ünïcode" in lines[1]  # not \\u escaped
+    assert data.endswith(b"\n") and dumps_jsonl([]) == b""
+
+
+def test_msgpack_round_trip():
+    data = dumps_msgpack(ITEMS)
+    assert loads_msgpack(data) == ITEMS
+    assert b"title" not in data  # rows, no field names
+    assert loads_msgpack(dumps_msgpack([])) == []
@@ -0,0 +1,45 @@
+# NewSpider's streaming path on a synthetic page
+# python -m pytest data-handling/web-scraping/myScrapyProject
+
+import pytest
+from scrapy.http import HtmlResponse
+
+from myScrapyProject.spiders.example import NewSpider
+
+PAGE = (b'<html><body>'
+        b'<div><h1>first</h1><p>one</p></div>'
+        b'<div><p>no title here</p></div>'
+        b'<div data-status="abc"><h1>bad status</h1></div>'
+        b'<div><h1>last</h1></div>'
+        b'</body></html>')
+
+
+class StreamingSpider(NewSpider):
+    stream_spec = {"item": "div", "fields": {"title": "h1", "text": "p", "status": "@data-status"}}
+
+
+def test_invalid_nodes_are_skipped_not_fatal():
+    items = list(StreamingSpider().parse(HtmlResponse("https://example.com", body=PAGE)))
+    assert [(item.title, item.text, item.status) for item in items] == [
+        ("first", "one", 200),
+        ("", "no title here", 200),  # missing title gets "" like the non-streaming path
+        ("last", None, 200),
+    ]
+    assert all(item.url == "https://example.com" for item in items)
+
+
+def test_spec_fields_checked_at_start():
+    class Typo(NewSpider):
+        stream_spec = {"item": "div", "fields": {"heading": "h1"}}
+
+    class Url(NewSpider):
+        stream_spec = {"item": "div", "fields": {"url": "a/@href"}}
+
+    for spider in (Typo, Url):
+        with pytest.raises(ValueError):
+            spider()
+
+
+def test_non_streaming_path():
+    items = list(NewSpider().parse(HtmlResponse("https://example.com", body=PAGE)))
+    assert len(items) == 1 and items[0].title == "first"
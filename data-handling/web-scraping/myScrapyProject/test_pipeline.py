@@ -0,0 +1,151 @@
+# MyscrapyprojectPipeline batching and the storage writers, no crawl and no running reactor
+# python -m pytest data-handling/web-scraping/myScrapyProject
+
+import os
+import sqlite3
+import time
+
+import pytest
+from scrapy.utils.test import get_crawler
+from twisted.internet import defer, task
+
+from myScrapyProject import pipelines
+from myScrapyProject.items import MyscrapyprojectItem
+from myScrapyProject.pipelines import MyscrapyprojectPipeline
+from myScrapyProject.storage import ParquetWriter, SQLiteWriter, open_writer
+
+
+def _item(i):
+    return MyscrapyprojectItem(url=f"https://example.com/{i}", title=f"title {i}")
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    # the flush timer runs on a fake clock, close_spider's deferToThread runs inline
+    clock = task.Clock()
+    LoopingCall = task.LoopingCall
+
+    def looping_call(f):
+        call = LoopingCall(f)
+        call.clock = clock
+        return call
+
+    monkeypatch.setattr(pipelines.task, "LoopingCall", looping_call)
+    monkeypatch.setattr(pipelines.threads, "deferToThread", lambda f: defer.succeed(f()))
+    return clock
+
+
+def _pipeline(path, backend="sqlite", **kwargs):
+    return MyscrapyprojectPipeline(stats=get_crawler().stats, backend=backend, path=str(path), **kwargs)
+
+
+def _rows(path):
+    with sqlite3.connect(path) as conn:
+        return conn.execute('SELECT url, title FROM "items" ORDER BY rowid').fetchall()
+
+
+def _wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+def test_flush_when_the_batch_is_full(tmp_path, clock):
+    pipeline = _pipeline(tmp_path / "items.db", batch_size=3, flush_interval=60)
+    pipeline.open_spider(None)
+    for i in range(7):
+        pipeline.process_item(_item(i), None)
+    stats = pipeline.stats
+    _wait_for(lambda: stats.get_value("storage/items") == 6)
+    assert stats.get_value("storage/flushes") == 2
+    assert pipeline._count == 1  # the 7th waits for the next flush
+
+    pipeline.close_spider(None)
+    assert stats.get_value("storage/items") == 7 and stats.get_value("storage/flushes") == 3
+    assert stats.get_value("storage/flush_latency_max") > 0
+    assert stats.get_value("storage/flush_latency_avg") > 0
+    assert stats.get_value("storage/items_per_sec") > 0
+    assert not stats.get_value("storage/failed_flushes")
+    assert _rows(tmp_path / "items.db") == [(f"https://example.com/{i}", f"title {i}") for i in range(7)]
+    assert pipeline._writer._conn is None  # closed on the storage thread
+
+
+def test_flush_on_the_timer(tmp_path, clock):
+    pipeline = _pipeline(tmp_path / "items.db", batch_size=1000, flush_interval=0.05)
+    pipeline.open_spider(None)
+    pipeline.process_item(_item(0), None)
+    clock.advance(0.05)  # the batch isn't old enough yet in real time
+    assert pipeline._count == 1
+    time.sleep(0.06)
+    clock.advance(0.05)
+    assert pipeline._count == 0
+    _wait_for(lambda: pipeline.stats.get_value("storage/flushes") == 1)
+    pipeline.close_spider(None)
+    assert not pipeline._timer.running
+    assert pipeline.stats.get_value("storage/flushes") == 1  # nothing left for close_spider
+
+
+def test_disabled_backend_passes_items_through(tmp_path):
+    pipeline = _pipeline(tmp_path / "items.db", backend=None)
+    pipeline.open_spider(None)
+    item = _item(0)
+    assert pipeline.process_item(item, None) is item
+    assert pipeline.close_spider(None) is None
+    assert not os.listdir(tmp_path)
+
+
+def test_failed_write_is_counted(tmp_path, clock):
+    pipeline = _pipeline(tmp_path / "missing-dir" / "items.db", batch_size=1, flush_interval=0)
+    pipeline.open_spider(None)
+    pipeline.process_item(_item(0), None)
+    pipeline.close_spider(None)
+    assert pipeline.stats.get_value("storage/failed_flushes") == 1
+
+
+def test_default_path_follows_the_backend(tmp_path, monkeypatch, clock):
+    monkeypatch.chdir(tmp_path)
+    assert open_writer("sqlite").path == "items.db"
+    assert open_writer("parquet").path == "items.parquet"
+    with pytest.raises(ValueError):
+        open_writer("csv")
+    crawler = get_crawler(settings_dict={"STORAGE_BACKEND": "parquet"})
+    pipeline = MyscrapyprojectPipeline.from_crawler(crawler)
+    pipeline.flush_interval = 0
+    pipeline.open_spider(None)
+    pipeline.process_item(_item(0), None)
+    pipeline.close_spider(None)
+    assert pipeline.path == "items.parquet"
+    assert os.listdir(tmp_path) == ["items.parquet"]
+    assert os.listdir(tmp_path / "items.parquet") == ["part-00000.parquet"]
+
+
+def test_sqlite_adds_columns(tmp_path):
+    path = str(tmp_path / "items.db")
+    writer = SQLiteWriter(path)
+    writer.write({"url": ["a", "b"], "title": ["A", "B"]})
+    writer.write({"url": ["c"], "title": ["C"], "price": [9.5], "tags": [["x", "y"]]})
+    writer.close()
+
+    writer = SQLiteWriter(path)  # reopened, the existing columns are read back
+    writer.write({"url": ["d"], "price": [1.0]})
+    writer.close()
+    with sqlite3.connect(path) as conn:
+        columns = [row[1] for row in conn.execute('PRAGMA table_info("items")')]
+        rows = conn.execute('SELECT url, title, price, tags FROM "items" ORDER BY rowid').fetchall()
+    assert columns == ["url", "title", "price", "tags"]
+    assert rows == [("a", "A", None, None), ("b", "B", None, None), ("c", "C", 9.5, '["x", "y"]'),
+                    ("d", None, 1.0, None)]
+
+
+def test_parquet_parts_continue_on_resume(tmp_path):
+    pq = pytest.importorskip("pyarrow.parquet")
+    path = str(tmp_path / "items.parquet")
+    writer = ParquetWriter(path)
+    writer.write({"url": ["a", "b"], "title": ["A", "B"]})
+    writer.write({"url": ["c"], "status": [404]})
+    resumed = ParquetWriter(path)
+    resumed.write({"url": ["d"], "title": ["D"]})
+    assert sorted(os.listdir(path)) == [f"part-{i:05d}.parquet" for i in range(3)]
+    assert pq.read_table(os.path.join(path, "part-00002.parquet")).to_pylist() == [{"url": "d", "title": "D"}]
+    assert sum(pq.read_table(os.path.join(path, name)).num_rows for name in os.listdir(path)) == 4
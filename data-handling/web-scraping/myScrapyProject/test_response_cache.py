@@ -0,0 +1,126 @@
+# ResponseCache and the 304 handling in MyscrapyprojectDownloaderMiddleware
+# python -m pytest data-handling/web-scraping/myScrapyProject
+
+import os
+import time
+
+import pytest
+from scrapy import Request
+from scrapy.http import HtmlResponse, Response
+from scrapy.utils.request import fingerprint
+from scrapy.utils.test import get_crawler
+
+from myScrapyProject.httpcache import ResponseCache
+from myScrapyProject.middlewares import MyscrapyprojectDownloaderMiddleware
+
+URL = "https://example.com/page"
+ETAG = '"v1"'
+LAST_MODIFIED = "Wed, 01 Jan 2025 00:00:00 GMT"
+
+
+def _page(url=URL, body=b"<html><body>cached page</body></html>", **headers):
+    headers = {"ETag": ETAG, "Last-Modified": LAST_MODIFIED, "Content-Type": "text/html", **headers}
+    return HtmlResponse(url, status=200, headers=headers, body=body, request=Request(url))
+
+
+def _process_request(mw, request):
+    # no throttle, so process_request never waits
+    with pytest.raises(StopIteration):
+        mw.process_request(request, None).send(None)
+
+
+@pytest.fixture
+def mw(tmp_path):
+    return MyscrapyprojectDownloaderMiddleware(stats=get_crawler().stats, cache_dir=str(tmp_path / "cache"))
+
+
+def test_validators_sent_on_recrawl(mw):
+    first = Request(URL)
+    _process_request(mw, first)
+    assert b"If-None-Match" not in first.headers
+    mw.process_response(first, _page(), None)
+    assert mw.stats.get_value("response_cache/store") == 1
+
+    again = Request(URL)
+    _process_request(mw, again)
+    assert again.headers[b"If-None-Match"] == ETAG.encode()
+    assert again.headers[b"If-Modified-Since"] == LAST_MODIFIED.encode()
+    # a validator the spider set itself is left alone
+    own = Request(URL, headers={"If-None-Match": '"mine"'})
+    _process_request(mw, own)
+    assert own.headers[b"If-None-Match"] == b'"mine"'
+
+
+def test_not_modified_swapped_for_the_cached_body(mw):
+    first = Request(URL)
+    _process_request(mw, first)
+    mw.process_response(first, _page(), None)
+
+    again = Request(URL)
+    _process_request(mw, again)
+    response = mw.process_response(again, Response(URL, status=304, request=again), None)
+    assert response.status == 200 and response.body == _page().body
+    assert "cached" in response.flags and response.request is again
+    assert mw.stats.get_value("response_cache/hit") == 1
+    assert mw.stats.get_value("response_cache/saved_bytes") == len(_page().body)
+
+
+def test_not_modified_after_eviction_is_fetched_again(mw):
+    first = Request(URL, meta={"download_slot": "example.com"})
+    _process_request(mw, first)
+    mw.process_response(first, _page(), None)
+
+    again = Request(URL, meta={"download_slot": "example.com"})
+    _process_request(mw, again)
+    mw.cache._forget(again.meta["response_cache_fp"])  # evicted while the request was out
+    retry = mw.process_response(again, Response(URL, status=304, request=again), None)
+    assert isinstance(retry, Request)
+    assert b"If-None-Match" not in retry.headers and b"If-Modified-Since" not in retry.headers
+    assert retry.dont_filter and retry.meta["dont_cache"]
+    assert retry.meta["download_slot"] == "example.com"
+    assert not any(k.startswith("response_cache_") for k in retry.meta)
+    assert mw.stats.get_value("response_cache/refetch") == 1
+
+    # the re-issued request skips the cache both ways
+    _process_request(mw, retry)
+    assert b"If-None-Match" not in retry.headers
+    assert mw.process_response(retry, _page(), None).status == 200
+
+
+def test_not_modified_without_our_validators_passes_through(mw):
+    request = Request(URL, headers={"If-None-Match": '"mine"'})
+    _process_request(mw, request)
+    response = Response(URL, status=304, request=request)
+    assert mw.process_response(request, response, None) is response
+
+
+def _fp(i):
+    return fingerprint(Request(f"{URL}/{i}")).hex()
+
+
+def test_lru_order_survives_a_reload(tmp_path):
+    cache = ResponseCache(str(tmp_path))
+    for i in range(3):
+        cache.store(_fp(i), _page(f"{URL}/{i}"))
+        time.sleep(0.01)  # distinct mtimes
+    assert cache.load(_fp(0), Request(f"{URL}/0")) is not None  # 0 is now the most recent
+
+    reloaded = ResponseCache(str(tmp_path))
+    assert list(reloaded._entries) == [_fp(1), _fp(2), _fp(0)]
+    assert reloaded.total_bytes == cache.total_bytes
+
+
+def test_eviction_keeps_the_byte_budget(tmp_path):
+    body = b"x" * 1000
+    cache = ResponseCache(str(tmp_path), max_bytes=10_000)
+    for i in range(20):
+        assert cache.store(_fp(i), _page(f"{URL}/{i}", body=body))
+        cache.evict()
+        assert cache.total_bytes <= cache.max_bytes
+    kept = list(cache._entries)
+    assert kept == [_fp(i) for i in range(20 - len(kept), 20)]  # the oldest went first
+    assert sorted(os.listdir(tmp_path)) == sorted(fp + ext for fp in kept for ext in (".json", ".body"))
+    assert sum(cache.body_size(fp) for fp in kept) == len(kept) * len(body)
+    # too big for the budget on its own, or nothing to revalidate with: not stored
+    assert not cache.store(_fp(99), _page(body=b"x" * 20_000))
+    assert not cache.store(_fp(98), HtmlResponse(URL, body=body))
@@ -0,0 +1,103 @@
+# AIMDController, on its own and driven by clients of the local overloading server from benchmarks.py
+# python -m pytest data-handling/web-scraping/myScrapyProject
+
+import threading
+import time
+import urllib.error
+import urllib.request
+
+from myScrapyProject.benchmarks import _overloaded_handler, serve
+from myScrapyProject.throttle import AIMDController, parse_retry_after
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_server_errors_decrease_and_count():
+    clock = Clock()
+    aimd = AIMDController(start=8, cooldown=1.0, clock=clock)
+    for status in (500, 502, 504):
+        clock.now += 2
+        before = aimd.state("d").concurrency
+        state = aimd.on_response("d", status, latency=0.1)
+        assert state.concurrency == before / 2
+    assert (state.errors, state.throttled, state.responses) == (3, 0, 0)
+    assert aimd.metrics()["d"]["error_rate"] == 1.0
+
+    clock.now += 2
+    state = aimd.on_response("d", 404, latency=0.1)  # a client error says nothing about load
+    assert state.concurrency > 1 and state.responses == 1
+
+
+def test_throttled_response_pauses():
+    clock = Clock()
+    aimd = AIMDController(start=4, clock=clock)
+    clock.now = 10.0
+    state = aimd.on_response("d", 429, retry_after=parse_retry_after(b"30"))
+    assert state.throttled == 1 and state.concurrency == 2
+    assert aimd.pause_left("d") == 30
+    clock.now += 31
+    assert aimd.pause_left("d") == 0
+
+
+def _drive(aimd, handler, url, seconds, workers=32):
+    # client threads that keep at most int(concurrency) requests in flight, like the middleware
+    # returns the concurrency after every response
+    stop_at = time.monotonic() + seconds
+    cond = threading.Condition()
+    in_flight = [0]
+    seen = []
+
+    def client():
+        while time.monotonic() < stop_at:
+            with cond:
+                while in_flight[0] >= int(aimd.state("local").concurrency) or aimd.pause_left("local"):
+                    if time.monotonic() >= stop_at:
+                        return
+                    cond.wait(0.01)
+                in_flight[0] += 1
+            start = time.monotonic()
+            try:
+                with urllib.request.urlopen(url, timeout=10) as response:
+                    response.read()
+                    status, retry_after = response.status, None
+            except urllib.error.HTTPError as e:
+                status, retry_after = e.code, parse_retry_after(e.headers.get("Retry-After"))
+            with cond:
+                in_flight[0] -= 1
+                state = aimd.on_response("local", status, latency=time.monotonic() - start, retry_after=retry_after)
+                seen.append(state.concurrency)
+                cond.notify_all()
+
+    threads = [threading.Thread(target=client) for _ in range(workers)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return seen
+
+
+def test_concurrency_follows_the_server():
+    base_latency = 0.05
+    handler = _overloaded_handler(capacity=2, base_latency=base_latency)
+    server, base = serve(handler)
+    try:
+        aimd = AIMDController(start=16, max_concurrency=32, target_latency=base_latency * 3, cooldown=0.1)
+        # overloaded: 429s past 4 in flight, slower past 2
+        seen = _drive(aimd, handler, f"{base}/page", seconds=2.5)
+        assert aimd.state("local").throttled > 0
+        overloaded = seen[-1]
+        assert overloaded <= 6 and min(seen) <= 4  # from 16
+        # the server gets its capacity back, so concurrency climbs again
+        handler.capacity = 64
+        throttled = aimd.state("local").throttled
+        seen = _drive(aimd, handler, f"{base}/page", seconds=3)  # starts with the last Retry-After pause
+        assert seen[-1] >= 8 and seen[-1] > overloaded
+        assert aimd.state("local").throttled == throttled
+    finally:
+        server.shutdown()
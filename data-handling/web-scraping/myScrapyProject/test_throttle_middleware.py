@@ -0,0 +1,64 @@
+# MyscrapyprojectDownloaderMiddleware: Retry-After pauses and concurrency permits
+# python -m pytest data-handling/web-scraping/myScrapyProject
+
+from types import SimpleNamespace
+
+from scrapy import Request
+from scrapy.core.downloader import Slot
+from scrapy.http import Response
+
+from myScrapyProject.middlewares import MyscrapyprojectDownloaderMiddleware
+from myScrapyProject.throttle import AIMDController
+
+
+def _middleware(start=2):
+    slot = Slot(concurrency=start, delay=1.0, jitter=0.5)
+    crawler = SimpleNamespace(engine=SimpleNamespace(downloader=SimpleNamespace(slots={"example.com": slot})))
+    mw = MyscrapyprojectDownloaderMiddleware(throttle=AIMDController(start=start), crawler=crawler)
+    return mw, slot
+
+
+def _request(i):
+    return Request(f"https://example.com/{i}", meta={"download_slot": "example.com", "download_latency": 0.1})
+
+
+def _acquire(mw, request):
+    # process_request finishes without waiting when a permit is free, returns whether it did
+    coro = mw.process_request(request, None)
+    try:
+        coro.send(None)
+    except StopIteration:
+        return True
+    coro.close()
+    return False
+
+
+def test_retry_after_pause_without_jitter():
+    mw, slot = _middleware()
+    request = _request(0)
+    assert _acquire(mw, request)
+    mw.process_response(request, Response(request.url, status=429, headers={"Retry-After": "30"}), None)
+    assert slot.jitter == 0 and slot.delay >= 29
+    assert all(slot.download_delay() >= 29 for _ in range(100))
+
+    mw.throttle.domains["example.com"].paused_until = 0  # the pause is over
+    request = _request(1)
+    assert _acquire(mw, request)
+    mw.process_response(request, Response(request.url, status=200), None)
+    assert (slot.delay, slot.jitter) == (1.0, 0.5)
+
+
+def test_permit_released_when_a_later_middleware_answers():
+    # e.g. HttpCacheMiddleware returns the response from process_request, the request never
+    # reaches the downloader and request_left_downloader is never sent
+    mw, _ = _middleware(start=2)
+    first, second = _request(0), _request(1)
+    assert _acquire(mw, first) and _acquire(mw, second)
+    assert mw._in_flight["example.com"] == 2  # the limit, a third request would wait
+    mw.process_response(first, Response(first.url, status=200), None)
+    mw.process_exception(second, RuntimeError("ignored"), None)
+    assert mw._in_flight["example.com"] == 0
+    assert not mw._holders
+    # a late request_left_downloader for the same request doesn't release twice
+    mw.request_left_downloader(first, None)
+    assert mw._in_flight["example.com"] == 0
@@ -0,0 +1,102 @@
+# parsing stage for the scraper
+# BeautifulSoup is pure python and holds the GIL, once fetching is concurrent (async_fetcher.py)
+# the parser becomes the bottleneck, so we ship the raw bytes to a pool of worker processes
+#   - parser backend: 'html.parser' (stdlib) or 'lxml' (faster, pipenv install lxml)
+#   - only_tags=True parses just the target tags (SoupStrainer) instead of the whole tree
+#   - results come back in input order, and at most `max_pending` pages are in flight (backpressure)
+
+import asyncio
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from bs4 import BeautifulSoup, SoupStrainer
+
+PARSERS = ('html.parser', 'lxml')
+
+
+def parse_page(body, tag='h2', parser='html.parser', only_tags=True):
+    # runs inside the worker process, needs to stay a top level function so it can be pickled
+    parse_only = SoupStrainer(tag) if only_tags else None
+    soup = BeautifulSoup(body, parser, parse_only=parse_only)
+    return [title.text for title in soup.find_all(tag)]
+
+
+def _check_parser(parser):
+    if parser not in PARSERS:
+        raise ValueError(f"parser must be one of {PARSERS}, got {parser!r}")
+
+
+def parse_stream(bodies, workers=None, tag='h2', parser='html.parser', only_tags=True, max_pending=None):
+    # bodies: any iterable of html (bytes or str), consumed lazily
+    # yields [titles] per body in the same order as bodies
+    _check_parser(parser)
+    workers = workers or os.cpu_count()
+    max_pending = max_pending or workers * 4
+    pending = deque()
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for body in bodies:
+            pending.append(pool.submit(parse_page, body, tag, parser, only_tags))
+            if len(pending) >= max_pending:  # wait for the oldest one before reading more input
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+async def iter_titles_parallel(urls, workers=None, tag='h2', parser='html.parser', only_tags=True,
+                               max_pending=None, **fetch_kwargs):
+    # fetch with async_fetcher.iter_pages and parse in the process pool
+    # yields (url, [titles]) in the order the pages arrived
+    from async_fetcher import iter_pages
+
+    _check_parser(parser)
+    workers = workers or os.cpu_count()
+    max_pending = max_pending or workers * 4
+    loop = asyncio.get_running_loop()
+    pending = deque()
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        async for url, status, body in iter_pages(urls, **fetch_kwargs):
+            if status != 200:
+                continue
+            pending.append((url, loop.run_in_executor(pool, parse_page, body, tag, parser, only_tags)))
+            if len(pending) >= max_pending:  # stop pulling pages until the oldest parse is done
+                url, future = pending.popleft()
+                yield url, await future
+        while pending:
+            url, future = pending.popleft()
+            yield url, await future
+
+
+####### benchmark #######
+
+def _sample_page(n_blocks=500):
+    blocks = ''.join(
+        f'<div class="card"><h2>title {i}</h2><p>some <b>text</b> and <a href="/l/{i}">a link</a></p>'
+        f'<ul><li>one</li><li>two</li></ul></div>'
+        for i in range(n_blocks)
+    )
+    return f'<html><head><title>t</title></head><body>{blocks}</body></html>'.encode()
+
+
+def benchmark_parse(n_pages=200, worker_counts=(1, 2, 4, 8)):
+    pages = [_sample_page()] * n_pages
+
+    for parser in PARSERS:
+        for only_tags in (False, True):
+            start = time.perf_counter()
+            for body in pages:
+                parse_page(body, parser=parser, only_tags=only_tags)
+            inline = time.perf_counter() - start
+            print(f"{parser:11} only_tags={only_tags!s:5} in-process: {n_pages / inline:8.1f} pages/sec")
+
+            for workers in worker_counts:
+                start = time.perf_counter()
+                for _ in parse_stream(pages, workers=workers, parser=parser, only_tags=only_tags):
+                    pass
+                took = time.perf_counter() - start
+                print(f"{parser:11} only_tags={only_tags!s:5} workers={workers}: {n_pages / took:8.1f} pages/sec")
+
+# benchmark_parse()
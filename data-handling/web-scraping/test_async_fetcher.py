@@ -0,0 +1,47 @@
+# iter_pages / fetch_titles against a local http server
+# python -m pytest data-handling/web-scraping
+
+import asyncio
+
+import pytest
+
+from async_fetcher import _start_local_server, fetch_titles, iter_pages
+
+
+@pytest.fixture(scope='module')
+def base_url():
+    server = _start_local_server(latency=0.0, n_titles=3)
+    yield f'http://127.0.0.1:{server.server_address[1]}'
+    server.shutdown()
+
+
+def _collect(urls, **kwargs):
+    async def run():
+        return [item async for item in iter_pages(urls, **kwargs)]
+    return asyncio.run(asyncio.wait_for(run(), timeout=10))
+
+
+def test_fetch_titles(base_url):
+    urls = [f'{base_url}/page/{i}' for i in range(10)]
+    pages = fetch_titles(urls, concurrency=4)
+    assert set(pages) == set(urls)
+    assert pages[urls[0]] == ['title 0', 'title 1', 'title 2']
+
+
+def test_bad_urls_are_error_results(base_url):
+    # urlsplit raises ValueError on the first one, aiohttp on the second: neither may end a worker
+    urls = ['http://[::1/x', 'not a url', f'{base_url}/page/1']
+    items = {url: (status, body) for url, status, body in _collect(urls, concurrency=1)}
+    assert isinstance(items['http://[::1/x'][1], ValueError)
+    assert items['not a url'][0] is None and isinstance(items['not a url'][1], Exception)
+    assert items[f'{base_url}/page/1'][0] == 200
+
+
+def test_failing_url_iterable_is_reported(base_url):
+    def urls():
+        yield f'{base_url}/page/0'
+        raise RuntimeError("source broke")
+
+    items = _collect(urls(), concurrency=2)
+    assert [url for url, _, body in items if isinstance(body, RuntimeError)] == [None]
+    assert (f'{base_url}/page/0', 200) in [(url, status) for url, status, _ in items]
@@ -0,0 +1,85 @@
+# DriverPool with FakeDriver, no browser needed
+# python -m pytest data-handling/web-scraping
+
+import threading
+
+import pytest
+
+from driver_pool import DriverPool, FakeDriver, page_title
+
+URLS = [f'https://example.com/{i}' for i in range(20)]
+
+
+def _map_with_timeout(pool, urls, timeout=10):
+    # a hang is a test failure, not a stuck test run
+    out = {}
+    worker = threading.Thread(target=lambda: out.setdefault('results', pool.map(page_title, urls)), daemon=True)
+    worker.start()
+    worker.join(timeout)
+    assert not worker.is_alive(), "pool.map hung"
+    return out['results']
+
+
+def test_results_in_order_and_recycling():
+    FakeDriver.started = 0
+    crash = {URLS[5]}
+    with DriverPool(lambda: FakeDriver(crash_on=crash), size=2, max_pages=4) as pool:
+        results = _map_with_timeout(pool, URLS)
+        stats = pool.stats()
+
+    assert isinstance(results[5], RuntimeError)
+    assert all(r == f'title of {u}' for r, u in zip(results, URLS) if u not in crash)
+    assert sum(stats['pages_per_driver']) == len(URLS)
+    assert max(stats['pages_per_driver']) <= 4
+    assert FakeDriver.started == 2 + stats['recycled']
+
+
+class FlakyFactory:
+    # the first driver starts, then `failures` starts fail before chrome comes back (None = never)
+
+    def __init__(self, failures):
+        self.failures = failures
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        if self.calls > 1 and (self.failures is None or self.calls <= 1 + self.failures):
+            raise RuntimeError("chrome failed to start")
+        return FakeDriver()
+
+
+def test_restart_retried_with_backoff():
+    factory = FlakyFactory(failures=2)
+    with DriverPool(factory, size=1, max_pages=3, start_attempts=3, start_backoff=0.001) as pool:
+        results = _map_with_timeout(pool, URLS[:6])
+        stats = pool.stats()
+    assert results == [f'title of {u}' for u in URLS[:6]]
+    assert stats['start_failures'] == 2
+
+
+def test_restart_that_never_works_fails_leases_instead_of_hanging():
+    factory = FlakyFactory(failures=None)
+    with DriverPool(factory, size=1, max_pages=2, start_attempts=2, start_backoff=0.001) as pool:
+        results = _map_with_timeout(pool, URLS[:5])
+        assert len(pool._slots) == 1  # the empty slot is still in the pool
+    assert results[:2] == [f'title of {u}' for u in URLS[:2]]
+    assert all(isinstance(r, RuntimeError) for r in results[2:])
+
+
+def test_slot_comes_back_after_chrome_recovers():
+    factory = FlakyFactory(failures=2)
+    with DriverPool(factory, size=1, max_pages=1, start_attempts=1, start_backoff=0.001) as pool:
+        results = _map_with_timeout(pool, URLS[:4])
+    # driver 1 serves url 0, the restart after it fails, url 1's lease tries again and fails,
+    # the next lease gets chrome back
+    assert results[0] == f'title of {URLS[0]}'
+    assert isinstance(results[1], RuntimeError)
+    assert results[2:] == [f'title of {u}' for u in URLS[2:4]]
+
+
+def test_closed_pool():
+    pool = DriverPool(FakeDriver, size=1)
+    pool.close()
+    with pytest.raises(RuntimeError):
+        with pool.lease():
+            pass
@@ -0,0 +1,70 @@
+# parse_stream / iter_titles_parallel: order, only_tags, backpressure
+# python -m pytest data-handling/web-scraping
+
+import asyncio
+
+import pytest
+
+from async_fetcher import _start_local_server
+from parse_pool import PARSERS, _sample_page, iter_titles_parallel, parse_page, parse_stream
+
+
+def _page(i, n_titles):
+    return (f'<html><body><h1>page {i}</h1>'
+            + ''.join(f'<div><h2>{i}.{j}</h2><p>text</p></div>' for j in range(n_titles))
+            + '</body></html>').encode()
+
+
+def test_parse_stream_keeps_input_order():
+    # later pages are smaller, so they finish first if the order is not kept
+    bodies = [_page(i, 200 - i * 10) for i in range(20)]
+    results = list(parse_stream(bodies, workers=2, max_pending=4))
+    assert results == [[f'{i}.{j}' for j in range(200 - i * 10)] for i in range(20)]
+
+
+@pytest.mark.parametrize('parser', PARSERS)
+def test_only_tags_matches_full_tree(parser):
+    body = _sample_page(50)
+    full = parse_page(body, parser=parser, only_tags=False)
+    assert full == [f'title {i}' for i in range(50)]
+    assert parse_page(body, parser=parser, only_tags=True) == full
+    assert list(parse_stream([body] * 3, workers=2, parser=parser)) == [full] * 3
+
+
+def test_parse_stream_bounds_pending_pages():
+    consumed = 0
+
+    def bodies():
+        nonlocal consumed
+        for i in range(30):
+            consumed += 1
+            yield _page(i, 5)
+
+    received = 0
+    for titles in parse_stream(bodies(), workers=2, max_pending=3):
+        received += 1
+        assert titles[0] == f'{received - 1}.0'
+        assert consumed - received < 3  # never more than max_pending pages read ahead
+    assert (consumed, received) == (30, 30)
+
+
+def test_unknown_parser():
+    with pytest.raises(ValueError, match='parser must be one of'):
+        list(parse_stream([b''], parser='html5lib'))
+
+
+@pytest.mark.parametrize('only_tags', (True, False))
+def test_iter_titles_parallel(only_tags):
+    server = _start_local_server(latency=0.0, n_titles=3)
+    base = f'http://127.0.0.1:{server.server_address[1]}'
+    urls = [f'{base}/page/{i}' for i in range(12)]
+
+    async def run():
+        return [item async for item in iter_titles_parallel(urls, workers=2, only_tags=only_tags,
+                                                            max_pending=2, concurrency=4)]
+    try:
+        items = asyncio.run(asyncio.wait_for(run(), timeout=30))
+    finally:
+        server.shutdown()
+    assert sorted(url for url, _ in items) == sorted(urls)
+    assert all(titles == ['title 0', 'title 1', 'title 2'] for _, titles in items)